@@ -22,9 +22,11 @@ class Env:
 
         # create real/hypothetical index
         self.mode = mode
-        self.pg_client1 = pg.PGHypo(args.conf_load)
+        # : newly modified. for the what-if record / replay.
+        self.whatif_recording = pg.get_whatif_recording(args)
+        self.pg_client1 = pg.create_pg_client(args, self.whatif_recording)
         # only for `checkout()`
-        self.pg_client2 = pg.PGHypo(args.conf_load)
+        self.pg_client2 = pg.create_pg_client(args, self.whatif_recording)
 
         # [1265, 897, 643, 1190, 521, 1688, 778, 1999, 1690, 1433, 1796, 1266, 1046, 1353]
         # self._frequencies = frequency
@@ -81,6 +81,10 @@ def train_dqn(args):
         total_ind_cost += cost
     agent.envx.pg_client2.delete_indexes()
 
+    # : newly added. for the what-if record / replay.
+    if getattr(args, "whatif_record", None) is not None:
+        agent.envx.whatif_recording.save()
+
     data = {"workload": workload,
             "indexes": indexes,
             "no_cost": no_cost,
@@ -141,6 +145,10 @@ def get_dqn_res(args):
         total_ind_cost += cost
     agent.envx.pg_client2.delete_indexes()
 
+    # : newly added. for the what-if record / replay.
+    if getattr(args, "whatif_record", None) is not None:
+        agent.envx.whatif_recording.save()
+
     data = {"workload": workload,
             "indexes": indexes,
             "no_cost": no_cost,
@@ -39,6 +39,9 @@ def get_parser():
 
     parser.add_argument("--conf_load", type=str,
                         default="/data/wz/index/index_eab/eab_data/db_info_conf/local_db103_tpch_1gb.conf")
+    # : newly added. record the what-if answers of a live run / replay them without a database.
+    parser.add_argument("--whatif_record", type=str, default=None)
+    parser.add_argument("--whatif_replay", type=str, default=None)
     parser.add_argument("--work_load", type=str,
                         default="/data/wz/index/index_eab/eab_olap/bench_temp/tpch_template_18.sql")
     parser.add_argument("--cand_load", type=str,
@@ -1,11 +1,14 @@
 import os
 import time
+import itertools
 import pandas as pd
 import psycopg2 as pg
 
 from typing import List
 from configparser import ConfigParser
 
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import WhatIfRecording
+
 
 # conf_file = os.path.abspath('..') + '/configure.ini'
 
@@ -159,3 +162,106 @@ class PGHypo:
             info = str(attr[0]) + "#" + str(attr[1])
             attrs.append(info)
         return attrs
+
+
+# : newly added. for the what-if record / replay.
+class RecordingPGHypo(PGHypo):
+    """
+    Records the costs and the index sizes into `recording` (a `WhatIfRecording`),
+    the costs are stored as the plans `{"Total Cost": cost}`.
+    """
+
+    def __init__(self, db_conf, recording):
+        super(RecordingPGHypo, self).__init__(db_conf)
+
+        self.recording = recording
+        # {oid: table#col1,col2}
+        self.hypo_indexes = dict()
+
+    def execute_create_hypo(self, index):
+        oid = super(RecordingPGHypo, self).execute_create_hypo(index)
+        self.hypo_indexes[oid] = index
+
+        return oid
+
+    def execute_delete_hypo(self, oid):
+        self.hypo_indexes.pop(oid, None)
+
+        return super(RecordingPGHypo, self).execute_delete_hypo(oid)
+
+    def delete_indexes(self):
+        super(RecordingPGHypo, self).delete_indexes()
+        self.hypo_indexes = dict()
+
+    def get_queries_cost(self, query_list):
+        cost_list = super(RecordingPGHypo, self).get_queries_cost(query_list)
+
+        hypo_indexes = {index: None for index in self.hypo_indexes.values()}
+        for query, cost in zip(query_list, cost_list):
+            self.recording.put_plan(query, hypo_indexes, {"Total Cost": cost})
+
+        return cost_list
+
+    def get_storage_cost(self, oid_list):
+        costs = super(RecordingPGHypo, self).get_storage_cost(oid_list)
+
+        for oid, cost in zip([oid for oid in oid_list if oid != 0], costs):
+            if oid in self.hypo_indexes:
+                self.recording.put_size(self.hypo_indexes[oid], cost)
+
+        return costs
+
+
+class ReplayPGHypo(PGHypo):
+    """
+    Serves the costs and the index sizes of `recording` without a database.
+    """
+
+    def __init__(self, db_conf, recording):
+        self.recording = recording
+
+        self.oids = itertools.count(1 << 20)
+        self.hypo_indexes = dict()
+
+    def close(self):
+        pass
+
+    def execute_create_hypo(self, index):
+        oid = next(self.oids)
+        self.hypo_indexes[oid] = index
+
+        return oid
+
+    def execute_delete_hypo(self, oid):
+        return self.hypo_indexes.pop(oid, None) is not None
+
+    def delete_indexes(self):
+        self.hypo_indexes = dict()
+
+    def get_queries_cost(self, query_list):
+        hypo_indexes = {index: None for index in self.hypo_indexes.values()}
+
+        return [self.recording.get_plan(query, hypo_indexes)["Total Cost"] for query in query_list]
+
+    def get_storage_cost(self, oid_list):
+        return [self.recording.get_size(self.hypo_indexes[oid]) for oid in oid_list if oid != 0]
+
+    def execute_sql(self, sql):
+        raise NotImplementedError(f"The replay client cannot execute `{sql}`.")
+
+
+def get_whatif_recording(args):
+    recording_file = getattr(args, "whatif_replay", None) or getattr(args, "whatif_record", None)
+    if recording_file is None:
+        return None
+
+    return WhatIfRecording(recording_file)
+
+
+def create_pg_client(args, recording=None):
+    if recording is None:
+        return PGHypo(args.conf_load)
+    if getattr(args, "whatif_replay", None) is not None:
+        return ReplayPGHypo(args.conf_load, recording)
+
+    return RecordingPGHypo(args.conf_load, recording)
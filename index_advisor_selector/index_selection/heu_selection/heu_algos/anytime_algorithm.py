@@ -2,10 +2,14 @@ import math
 import time
 import logging
 import itertools
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from .selection_algorithm import DEFAULT_PARAMETER_VALUES, SelectionAlgorithm
 
-from index_advisor_selector.index_selection.heu_selection.heu_utils.index import Index, index_merge
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import RecordingMixin, \
+    ReplayDatabaseConnector
 from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import get_utilized_indexes, indexes_by_table, mb_to_b, b_to_mb
 from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import candidates_per_query, \
     syntactically_relevant_indexes, syntactically_relevant_indexes_dqn_rule, syntactically_relevant_indexes_openGauss
@@ -15,12 +19,84 @@ from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_ge
 # max_runtime_minutes: The algorithm is stopped either if all seeds are evaluated or
 #                      when max_runtime_minutes is exceeded. Whatever happens first.
 #                      In case of the latter, the current best solution is returned.
+# parallel_seeds: The number of processes (each with its own database session)
+#                 the seeds are explored by. See `_explore_seeds_parallel()`.
 DEFAULT_PARAMETERS = {
     "budget_MB": DEFAULT_PARAMETER_VALUES["budget_MB"],
     "max_index_width": DEFAULT_PARAMETER_VALUES["max_index_width"],
     "max_runtime_minutes": 10,
+    "parallel_seeds": 1,
 }
 
+# : newly added. the state of a seed worker process, see `_init_seed_worker()`.
+_SEED_WORKER = dict()
+
+
+def _seed_connector_spec(database_connector):
+    # The connections cannot be pickled, every worker opens its own session.
+    if isinstance(database_connector, ReplayDatabaseConnector):
+        return database_connector.clone()
+
+    return (database_connector.__class__, database_connector.config,
+            {"host": database_connector.host, "port": database_connector.port,
+             "db_name": database_connector.db_name, "user": database_connector.user,
+             "password": database_connector.password},
+            getattr(database_connector, "prepare_queries", False))
+
+
+def _init_seed_worker(connector_spec, parameters, algorithm_options, size_estimation,
+                      workload, candidates, best_cost, deadline):
+    if isinstance(connector_spec, tuple):
+        connector_class, config, connection_params, prepare_queries = connector_spec
+        connector = connector_class(config, autocommit=True, **connection_params)
+        if prepare_queries:
+            connector.enable_prepared_queries()
+    else:
+        connector = connector_spec
+
+    # `cand_gen`, `is_utilized` and `sel_oracle` of the parent, the seeds are explored with the same oracle.
+    _SEED_WORKER["algorithm"] = AnytimeAlgorithm(connector, parameters, **algorithm_options)
+    # The analytic sizes are calibrated by the parent (see `IndexSizeEstimator.validate()`).
+    size_estimator = _SEED_WORKER["algorithm"].cost_evaluation.what_if.size_estimator
+    if size_estimator is not None and size_estimation is not None:
+        size_estimator.load_snapshot(size_estimation)
+    _SEED_WORKER["workload"] = workload
+    _SEED_WORKER["candidates"] = candidates
+    _SEED_WORKER["best_cost"] = best_cost
+    _SEED_WORKER["deadline"] = deadline
+
+
+def _explore_seed_worker(seed_no, seed):
+    """
+    Explore one seed in a worker process.
+    :param seed_no:
+    :param seed:
+    :return: (seed_no, indexes, costs, counters), `indexes` is None if the time budget was exceeded before.
+    """
+    algorithm = _SEED_WORKER["algorithm"]
+    indexes, costs = None, None
+    if time.time() <= _SEED_WORKER["deadline"]:
+        indexes, costs = algorithm.explore_seed(_SEED_WORKER["workload"], seed, _SEED_WORKER["candidates"],
+                                                seed_no, best_cost=_SEED_WORKER["best_cost"])
+        with _SEED_WORKER["best_cost"].get_lock():
+            if costs < _SEED_WORKER["best_cost"].value:
+                _SEED_WORKER["best_cost"].value = costs
+
+    # The counters are transferred to the parent (and reset) per seed.
+    connector, cost_evaluation = algorithm.database_connector, algorithm.cost_evaluation
+    counters = {"cost_estimations": connector.cost_estimations,
+                "cost_estimation_duration": connector.cost_estimation_duration,
+                "simulated_indexes": connector.simulated_indexes,
+                "index_simulation_duration": connector.index_simulation_duration,
+                "cost_requests": cost_evaluation.cost_requests, "cache_hits": cost_evaluation.cache_hits,
+                "abandoned_seeds": algorithm.abandoned_seeds}
+    connector.cost_estimations, connector.cost_estimation_duration = 0, 0
+    connector.simulated_indexes, connector.index_simulation_duration = 0, 0
+    cost_evaluation.cost_requests, cost_evaluation.cache_hits = 0, 0
+    algorithm.abandoned_seeds = 0
+
+    return seed_no, indexes, costs, counters
+
 
 # This algorithm is related to the DTA Anytime algorithm employed in SQL server.
 # Details of the current version of the original algorithm are not published yet.
@@ -46,6 +122,10 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         self.max_indexes = self.parameters["max_indexes"]
         self.constraint = self.parameters["constraint"]
 
+        # : newly added. for the process-parallel exploration of the seeds.
+        self.parallel_seeds = self.parameters["parallel_seeds"] or 1
+        self.abandoned_seeds = 0
+
     def _calculate_best_indexes(self, workload, db_conf=None, columns=None):
         """
         1. Get the utilized hypothetical indexes (DB2Advis);
@@ -65,12 +145,14 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         # Generate syntactically relevant candidates
         # Multi-column indexes are considered from the start.
         # (0917): newly modified.
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -126,6 +208,11 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         if self.process:
             self.step["candidates"] = candidates
 
+        # : newly added. for the process-parallel exploration of the seeds.
+        if self._parallel_seeds_enabled():
+            indexes = self._explore_seeds_parallel(workload, sorted(list(seeds)), candidates)
+            return sorted(list(indexes))
+
         start_time = time.time()
         # (index, cost)
         best_configuration = (None, None)
@@ -138,13 +225,7 @@ class AnytimeAlgorithm(SelectionAlgorithm):
                 self.layer = 0
 
             logging.info(f"Seed {i + 1} from {len(seeds)}")
-            candidates_copy = candidates.copy()
-            candidates_copy -= seed
-            current_costs = self._simulate_and_evaluate_cost(workload, seed)
-            # workload, current_indexes, current_costs, candidate_indexes, number_indexes, seed_no
-            indexes, costs = self.enumerate_greedy(
-                workload, seed, current_costs, candidates_copy, math.inf, i
-            )
+            indexes, costs = self.explore_seed(workload, seed, candidates, i)
             if best_configuration[0] is None or costs < best_configuration[1]:
                 best_configuration = (indexes, costs)
 
@@ -159,21 +240,144 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         indexes = best_configuration[0]
         return sorted(list(indexes))
 
+    def explore_seed(self, workload, seed, candidates, seed_no, best_cost=None):
+        """
+        Enumerate the configuration greedily starting from `seed`.
+        :param workload:
+        :param seed:
+        :param candidates:
+        :param seed_no:
+        :param best_cost: the best-so-far cost shared by the seed workers (`multiprocessing.Value`).
+        :return: (indexes, costs)
+        """
+        candidates_copy = candidates.copy()
+        candidates_copy -= seed
+        current_costs = self._simulate_and_evaluate_cost(workload, seed)
+        # workload, current_indexes, current_costs, candidate_indexes, number_indexes, seed_no
+        return self.enumerate_greedy(
+            workload, seed, current_costs, candidates_copy, math.inf, seed_no, best_cost=best_cost
+        )
+
+    def _parallel_seeds_enabled(self):
+        if self.parallel_seeds <= 1:
+            return False
+        if self.process:
+            logging.warning("The seeds are explored serially for the process visualization.")
+            return False
+        if isinstance(self.database_connector, RecordingMixin):
+            logging.warning("The seeds are explored serially while recording the what-if answers.")
+            return False
+
+        return True
+
+    def _explore_seeds_parallel(self, workload, seeds, candidates):
+        """
+        Explore the seeds in `self.parallel_seeds` worker processes, each with its own database session.
+        The workers share the best cost found so far (to abandon hopeless seeds, see `_abandon_seed()`)
+        and the deadline of `max_runtime_minutes`: a seed is started only before the deadline.
+        The results are merged in the seed order, i.e., ties are resolved as in the serial exploration.
+        :param workload:
+        :param seeds:
+        :param candidates:
+        :return: the best configuration.
+        """
+        context = multiprocessing.get_context("spawn")
+        best_cost = context.Value("d", math.inf)
+        deadline = time.time() + self.max_runtime_minutes * 60
+
+        # Every worker is a single session, the worker processes must not share the (sqlite) cost cache.
+        parameters = {key: value for key, value in self.parameters.items()
+                      if key not in ["parallel_seeds", "parallel_sessions", "cost_cache_file"]}
+
+        size_estimator = self.cost_evaluation.what_if.size_estimator
+        size_estimation = size_estimator.snapshot() if size_estimator is not None else None
+
+        logging.info(f"Explore {len(seeds)} seeds in {self.parallel_seeds} processes.")
+        results = dict()
+        with ProcessPoolExecutor(max_workers=self.parallel_seeds, mp_context=context,
+                                 initializer=_init_seed_worker,
+                                 initargs=(_seed_connector_spec(self.database_connector), parameters,
+                                           {"cand_gen": self.cand_gen, "is_utilized": self.is_utilized,
+                                            "sel_oracle": self.sel_oracle},
+                                           size_estimation, workload, candidates, best_cost, deadline)) as executor:
+            futures = [executor.submit(_explore_seed_worker, seed_no, seed) for seed_no, seed in enumerate(seeds)]
+            for future in as_completed(futures):
+                seed_no, indexes, costs, counters = future.result()
+                self._transfer_seed_counters(counters)
+                if indexes is not None:
+                    results[seed_no] = (indexes, costs)
+
+        if len(results) < len(seeds):
+            logging.info(f"Stopping after {len(results)} seeds because of timing constraints.")
+        logging.info(f"{self.abandoned_seeds} seeds abandoned by the best-so-far bound.")
+
+        # (index, cost)
+        best_configuration = (None, None)
+        for seed_no in sorted(results.keys()):
+            indexes, costs = results[seed_no]
+            if best_configuration[0] is None or costs < best_configuration[1]:
+                best_configuration = (indexes, costs)
+
+        return best_configuration[0]
+
+    def _transfer_seed_counters(self, counters):
+        self.database_connector.cost_estimations += counters["cost_estimations"]
+        self.database_connector.cost_estimation_duration += counters["cost_estimation_duration"]
+        self.database_connector.simulated_indexes += counters["simulated_indexes"]
+        self.database_connector.index_simulation_duration += counters["index_simulation_duration"]
+        self.cost_evaluation.cost_requests += counters["cost_requests"]
+        self.cost_evaluation.cache_hits += counters["cache_hits"]
+        self.abandoned_seeds += counters["abandoned_seeds"]
+
+    def _abandon_seed(self, current_indexes, current_costs, improvement, candidate_indexes, best_cost):
+        """
+        Assuming diminishing returns (as the greedy enumeration does), every further step
+        improves the cost by at most the last `improvement`. The seed is abandoned
+        if it cannot beat the best cost of the other seeds even then.
+        :param current_indexes:
+        :param current_costs:
+        :param improvement:
+        :param candidate_indexes:
+        :param best_cost:
+        :return:
+        """
+        # The costs are not comparable for the other selection oracles.
+        if improvement is None or len(candidate_indexes) == 0 or self.sel_oracle is not None:
+            return False
+
+        steps = len(candidate_indexes)
+        if self.constraint == "number":
+            steps = min(steps, self.max_indexes - len(current_indexes))
+        elif self.constraint == "storage":
+            # The candidates without a (positive) size do not bound the number of steps.
+            candidate_sizes = [index.estimated_size for index in candidate_indexes
+                               if index.estimated_size is not None]
+            if len(candidate_sizes) == 0 or min(candidate_sizes) <= 0:
+                return False
+            remaining_size = self.disk_constraint - sum(index.estimated_size for index in current_indexes)
+            steps = min(steps, math.floor(remaining_size / min(candidate_sizes)))
+
+        if current_costs - max(steps, 0) * improvement >= best_cost.value:
+            self.abandoned_seeds += 1
+            return True
+
+        return False
+
     def _add_merged_indexes(self, indexes):
+        # : newly modified. memoized (and truncated), see `IndexRelations`.
+        self.index_relations.add(sorted(indexes))
         index_table_dict = indexes_by_table(indexes)
         for table in index_table_dict:
             for index1, index2 in itertools.permutations(index_table_dict[table], 2):
-                merged_index = index_merge(index1, index2)
-                if len(merged_index.columns) > self.max_index_width:
-                    new_columns = merged_index.columns[: self.max_index_width]
-                    merged_index = Index(new_columns)
+                merged_index = self.index_relations.merge(index1, index2, self.max_index_width)
                 if merged_index not in indexes:
                     self.cost_evaluation.estimate_size(merged_index)
                     indexes.add(merged_index)
 
     # based on AutoAdminAlgorithm
     def enumerate_greedy(
-            self, workload, current_indexes, current_costs, candidate_indexes, number_indexes, seed_no
+            self, workload, current_indexes, current_costs, candidate_indexes, number_indexes, seed_no,
+            best_cost=None, improvement=None
     ):
         assert (
                 current_indexes & candidate_indexes == set()
@@ -181,6 +385,11 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         if len(current_indexes) >= number_indexes:
             return current_indexes, current_costs
 
+        # : newly added. for the best-so-far bound shared by the seed workers.
+        if best_cost is not None and self._abandon_seed(current_indexes, current_costs, improvement,
+                                                        candidate_indexes, best_cost):
+            return current_indexes, current_costs
+
         # (index, cost)
         best_index = (None, None)
 
@@ -234,6 +443,7 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         if best_index[0] and best_index[1] < current_costs:
             current_indexes.add(best_index[0])
             candidate_indexes.remove(best_index[0])
+            improvement = current_costs - best_index[1]
             current_costs = best_index[1]
 
             logging.debug(f"Additional best index found: {best_index}")
@@ -250,7 +460,9 @@ class AnytimeAlgorithm(SelectionAlgorithm):
                 current_costs,
                 candidate_indexes,
                 number_indexes,
-                seed_no
+                seed_no,
+                best_cost=best_cost,
+                improvement=improvement
             )
         return current_indexes, current_costs
 
@@ -264,12 +476,14 @@ class AnytimeAlgorithm(SelectionAlgorithm):
         :param workload:
         :return:
         """
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
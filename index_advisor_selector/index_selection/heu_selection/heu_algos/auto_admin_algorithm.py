@@ -257,6 +257,12 @@ class AutoAdminAlgorithm(SelectionAlgorithm):
         if self.process and not is_seed:
             self.step[iter][self.layer] = list()
 
+        # : newly added. for the parallel candidate scoring, the candidates are still reduced in order below.
+        if self.cost_matrix is None:
+            self.cost_evaluation.prefetch_costs(workload.queries,
+                [current_indexes] + [current_indexes | {index} for index in sorted(list(candidate_indexes))],
+                store_size=True)
+
         # (0804): newly added. for reproduction.
         for index in sorted(list(candidate_indexes)):
             if self.sel_oracle is None:
@@ -319,7 +325,8 @@ class AutoAdminAlgorithm(SelectionAlgorithm):
         return current_indexes, current_costs
 
     def _simulate_and_evaluate_cost(self, workload, indexes):
-        cost = self.cost_evaluation.calculate_cost(workload, indexes, store_size=True)
+        # : newly modified. the cost matrix (if enabled) in place of the cost evaluation.
+        cost = self._cost_oracle().calculate_cost(workload, indexes, store_size=True)
         return round(cost, 2)
 
     def create_multicolumn_indexes(self, workload, indexes):
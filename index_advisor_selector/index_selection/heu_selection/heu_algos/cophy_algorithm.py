@@ -4,9 +4,10 @@ import logging
 import os
 import sys
 import time
-from typing import Dict, List, Set
+import hashlib
+from typing import Dict, List, Set, Tuple
 
-import amplpy as ampl
+import numpy as np
 
 from index_advisor_selector.index_selection.heu_selection.heu_utils.index import Index
 from index_advisor_selector.index_selection.heu_selection.heu_utils.workload import Workload
@@ -22,6 +23,9 @@ DEFAULT_PARAMETERS = {
     "enumeration": "query-based",  # full, query-based
     "output_folder": "benchmark_results/cophy",
     "overwrite": True,
+    "solver": "ampl",  # ampl, milp
+    "solver_time_limit": None,  # seconds, milp only
+    "solver_mip_gap": None,  # relative, milp only
 }
 
 
@@ -47,8 +51,23 @@ class CoPhyAlgorithm(SelectionAlgorithm):
         if self.constraint == "storage":
             self.max_indexes = 100
 
-        ampl_env = ampl.Environment(binary_directory=self.parameters["ampl_bin_path"])
-        self.ampl_instance = ampl.AMPL(environment=ampl_env)
+        # : newly modified. AMPL is only required by the `ampl` solver.
+        self.solver_info = dict()
+        # : newly added. {problem fingerprint: [selected index ids]} of the budgets solved by `solve_as_milp()`
+        # with this instance (e.g., along a budget sweep), the best one feasible for the next budget is its incumbent.
+        self.milp_solutions = dict()
+        if self.parameters["solver"] == "ampl":
+            import amplpy as ampl
+
+            ampl_env = ampl.Environment(binary_directory=self.parameters["ampl_bin_path"])
+            self.ampl_instance = ampl.AMPL(environment=ampl_env)
+
+    # : newly added. the runs of the budget sweep warm-start from the solutions of each other.
+    def _sweep_algorithm(self, budget_MB):
+        algorithm = super()._sweep_algorithm(budget_MB)
+        algorithm.milp_solutions = self.milp_solutions
+
+        return algorithm
 
     def init_query_costs_without_indexes(self, workload):
         for query in workload.queries:
@@ -96,18 +115,16 @@ class CoPhyAlgorithm(SelectionAlgorithm):
                 f"with {number_of_indexes_per_query} indexes per query:"
             )
             i = 0
-            for index_combination in itertools.combinations(
-                    candidate_indexes, number_of_indexes_per_query
+            # : newly modified. the query costs are evaluated per combination by `_combination_query_costs()`.
+            for index_combination, query_costs in self._combination_query_costs(
+                    workload, itertools.combinations(candidate_indexes, number_of_indexes_per_query)
             ):
                 i += 1
                 if i % 10000 == 0:
                     logging.info(f"  ... {i} / {number_of_index_combinations} done")
                 is_useful_combination = False
                 costs_per_query = {}
-                for query in workload.queries:
-                    query_cost = self.cost_evaluation.calculate_cost(
-                        Workload([query]), set(index_combination), store_size=True
-                    )
+                for query, query_cost in zip(workload.queries, query_costs):
                     # test if query_cost is lower than default cost
                     if query_cost < self.query_costs_without_indexes[query]:
                         is_useful_combination = True
@@ -160,16 +177,16 @@ class CoPhyAlgorithm(SelectionAlgorithm):
         number_of_index_combinations = len(index_combinations_for_workload)
         logging.info(f"Evaluate {number_of_index_combinations} index combinations ")
         i = 0
-        for index_combination in index_combinations_for_workload:
+        # : newly modified. the query costs are evaluated per combination by `_combination_query_costs()`.
+        for index_combination, query_costs in self._combination_query_costs(
+                workload, index_combinations_for_workload
+        ):
             i += 1
             if i % 10000 == 0:
                 logging.info(f"  ... {i} / {number_of_index_combinations} done")
             is_useful_combination = False
             costs_per_query = {}
-            for query in workload.queries:
-                query_cost = self.cost_evaluation.calculate_cost(
-                    Workload([query]), set(index_combination), store_size=True
-                )
+            for query, query_cost in zip(workload.queries, query_costs):
                 # test if query_cost is lower than default cost
                 if query_cost < self.query_costs_without_indexes[query]:
                     is_useful_combination = True
@@ -182,6 +199,34 @@ class CoPhyAlgorithm(SelectionAlgorithm):
 
         return useful_indexes, query_costs_for_index_combination
 
+    # : newly added. for the enumeration over the cost matrix.
+    def _combination_query_costs(self, workload, index_combinations, chunk_size=4096):
+        """
+        The (frequency-weighted) cost of every query under every index combination,
+        by vectorized reductions over the cost matrix (if enabled) or per query from the cost evaluation.
+        :param workload:
+        :param index_combinations:
+        :param chunk_size: the combinations evaluated by the cost matrix at once.
+        :return: a generator of (index_combination, [query_cost]).
+        """
+        if self.cost_matrix is None:
+            for index_combination in index_combinations:
+                yield index_combination, [self.cost_evaluation.calculate_cost(
+                    Workload([query]), set(index_combination), store_size=True
+                ) for query in workload.queries]
+            return
+
+        index_combinations = iter(index_combinations)
+        while True:
+            chunk = list(itertools.islice(index_combinations, chunk_size))
+            if len(chunk) == 0:
+                return
+            for index_combination in chunk:
+                self.cost_matrix.store_sizes(index_combination)
+            query_costs = self.cost_matrix.query_costs_batch(workload, chunk)
+            for index_combination, costs in zip(chunk, query_costs.tolist()):
+                yield index_combination, costs
+
     def _calculate_best_indexes(self, workload: Workload, db_conf=None, columns=None) -> List:
         logging.info("Creating input for CoPhy")
         logging.info("Parameters: " + str(self.parameters))
@@ -269,18 +314,28 @@ class CoPhyAlgorithm(SelectionAlgorithm):
                         }
                     )
 
-        output_as_ampl(cophy_dict, self.parameters["ampl_dat_path"])
+        # : newly added. the same binary program solved in-process (HiGHS via scipy).
+        if self.parameters["solver"] == "milp":
+            selected_id, self.solver_info = solve_as_milp(cophy_dict,
+                                                          time_limit=self.parameters["solver_time_limit"],
+                                                          mip_gap=self.parameters["solver_mip_gap"],
+                                                          solutions=self.milp_solutions)
+            logging.info(f"MILP solver: {self.solver_info}")
+            assert selected_id is not None, "Mathematical Solver Error Occur!"
+        else:
+            output_as_ampl(cophy_dict, self.parameters["ampl_dat_path"])
 
-        # Load your AMPL model file
-        self.ampl_instance.read(self.parameters["ampl_mod_path"])
+            # Load your AMPL model file
+            self.ampl_instance.read(self.parameters["ampl_mod_path"])
 
-        self.ampl_instance.readData(self.parameters["ampl_dat_path"])
-        self.ampl_instance.option["solver"] = self.parameters["ampl_solver"]
-        self.ampl_instance.solve()
+            self.ampl_instance.readData(self.parameters["ampl_dat_path"])
+            self.ampl_instance.option["solver"] = self.parameters["ampl_solver"]
+            self.ampl_instance.solve()
 
-        assert self.ampl_instance.get_value("solve_result") == "solved", "Mathematical Solver Error Occur!"
+            assert self.ampl_instance.get_value("solve_result") == "solved", "Mathematical Solver Error Occur!"
 
-        selected_id = [i for i, index in enumerate(self.ampl_instance.get_variable("x").to_pandas().values) if index == 1.]
+            selected_id = [i for i, index in enumerate(self.ampl_instance.get_variable("x").to_pandas().values)
+                           if index == 1.]
         selected_idx = [index for i, index in enumerate(sorted(useful_indexes)) if i in selected_id]
 
         if self.constraint == "storage":
@@ -353,6 +408,151 @@ def output_as_ampl(cophy_dict: Dict, file_path: str = None) -> None:
     return
 
 
+def milp_fingerprint(cophy_dict: Dict) -> str:
+    # Everything but the budget (and the statistics) of the program.
+    problem = {key: cophy_dict[key] for key in ["queries", "index_sizes", "index_combinations", "query_costs"]}
+    return hashlib.sha1(json.dumps(problem, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def milp_objective(cophy_dict: Dict, selected_ids: Set[int]) -> float:
+    """
+    The objective of the program for the (1-based) index ids `selected_ids`:
+    every query uses its cheapest combination of the selected indexes.
+    :param cophy_dict:
+    :param selected_ids:
+    :return:
+    """
+    combinations = {combi_dict["combination_id"]: {int(index_id) for index_id in combi_dict["index_ids"].split()}
+                    for combi_dict in cophy_dict["index_combinations"]}
+    query_costs = dict()
+    for query_costs_dict in cophy_dict["query_costs"]:
+        if combinations[query_costs_dict["combination_id"]] <= selected_ids:
+            query_number = query_costs_dict["query_number"]
+            query_costs[query_number] = min(query_costs.get(query_number, query_costs_dict["costs"]),
+                                            query_costs_dict["costs"])
+
+    return float(sum(query_costs.values()))
+
+
+def milp_feasible(cophy_dict: Dict, selected_ids: Set[int]) -> bool:
+    if cophy_dict["constraint"] == "storage":
+        return sum(index_size_dict["estimated_size"] for index_size_dict in cophy_dict["index_sizes"]
+                   if index_size_dict["index_id"] in selected_ids) <= cophy_dict["storage_budget"]
+    return len(selected_ids) <= cophy_dict["max_indexes"]
+
+
+def solve_as_milp(cophy_dict: Dict, time_limit: float = None, mip_gap: float = None,
+                  solutions: Dict = None) -> Tuple[List, Dict]:
+    """
+    Solve the program of `cophy_ampl_model_{storage, number}.mod` for `cophy_dict` with HiGHS (scipy.optimize.milp).
+    Variables: x (index is created), y (combination is applicable), z (combination is used for query),
+    the z of the (query, combination) without costs (default 99999999999999 in AMPL) are left out.
+
+    Warm start: the solutions of the former budgets of the same program (kept in `solutions`)
+    that are feasible for this budget bound the objective (cutoff), the best of them is returned
+    if the solver does not find a better one within `time_limit`.
+    :param cophy_dict:
+    :param time_limit:
+    :param mip_gap:
+    :param solutions: {problem fingerprint: [selected index ids]}, updated with this solution (None: no warm start).
+    :return: the selected (0-based) index positions (None if unsolved) and the solver statistics.
+    """
+    # scipy (>= 1.9 for `milp`) is only required by the `milp` solver.
+    from scipy.sparse import coo_matrix
+    from scipy.optimize import milp, Bounds, LinearConstraint
+
+    time_start = time.time()
+    if solutions is None:
+        solutions = dict()
+
+    index_num = cophy_dict["number_of_indexes"]
+    combinations = [(combi_dict["combination_id"], [int(index_id) for index_id in combi_dict["index_ids"].split()])
+                    for combi_dict in cophy_dict["index_combinations"]]
+    combination_pos = {combination_id: pos for pos, (combination_id, _) in enumerate(combinations)}
+    query_rows = {query_number: row for row, query_number in enumerate(cophy_dict["queries"])}
+    pairs = [(query_costs_dict["query_number"], query_costs_dict["combination_id"], query_costs_dict["costs"])
+             for query_costs_dict in cophy_dict["query_costs"]]
+
+    # variable order: x, y, z
+    y_start, z_start = index_num, index_num + len(combinations)
+    var_num = z_start + len(pairs)
+    objective = np.zeros(var_num)
+    objective[z_start:] = [cost for _, _, cost in pairs]
+
+    rows, cols, vals, lower, upper = list(), list(), list(), list(), list()
+
+    def add_row(entries, lb, ub):
+        for col, val in entries:
+            rows.append(len(lower))
+            cols.append(col)
+            vals.append(val)
+        lower.append(lb)
+        upper.append(ub)
+
+    # one_combination_per_query
+    query_entries = {query_number: list() for query_number in query_rows}
+    for pos, (query_number, _, _) in enumerate(pairs):
+        query_entries[query_number].append((z_start + pos, 1))
+    for query_number in cophy_dict["queries"]:
+        add_row(query_entries[query_number], 1, 1)
+    # applicable_combination
+    for pos, (_, index_ids) in enumerate(combinations):
+        add_row([(index_id - 1, 1) for index_id in index_ids] + [(y_start + pos, -len(index_ids))], 0, np.inf)
+    # usable_combination
+    for pos, (_, combination_id, _) in enumerate(pairs):
+        add_row([(z_start + pos, 1), (y_start + combination_pos[combination_id], -1)], -np.inf, 0)
+    # memory_consumption / number_of_indexes
+    if cophy_dict["constraint"] == "storage":
+        add_row([(index_size_dict["index_id"] - 1, index_size_dict["estimated_size"])
+                 for index_size_dict in cophy_dict["index_sizes"]], -np.inf, cophy_dict["storage_budget"])
+    else:
+        add_row([(index_id, 1) for index_id in range(index_num)], -np.inf, cophy_dict["max_indexes"])
+
+    # warm start: the best solution of the former budgets that is feasible for this one.
+    fingerprint = milp_fingerprint(cophy_dict)
+    incumbent, incumbent_objective = None, None
+    for selected_ids in solutions.get(fingerprint, list()):
+        if not milp_feasible(cophy_dict, selected_ids):
+            continue
+        selected_objective = milp_objective(cophy_dict, selected_ids)
+        if incumbent is None or selected_objective < incumbent_objective:
+            incumbent, incumbent_objective = selected_ids, selected_objective
+    if incumbent is not None:
+        add_row([(col, val) for col, val in enumerate(objective) if val != 0],
+                -np.inf, incumbent_objective * (1 + 1e-9) + 1e-6)
+
+    options = {"disp": False}
+    if time_limit is not None:
+        options["time_limit"] = time_limit
+    if mip_gap is not None:
+        options["mip_rel_gap"] = mip_gap
+    constraint_matrix = coo_matrix((vals, (rows, cols)), shape=(len(lower), var_num)).tocsr()
+    result = milp(objective, integrality=np.ones(var_num), bounds=Bounds(0, 1),
+                  constraints=LinearConstraint(constraint_matrix, lower, upper), options=options)
+
+    solver_info = {"solver": "milp", "status": int(result.status), "message": result.message,
+                   "variables": var_num, "constraints": len(lower),
+                   "warm_start_objective": incumbent_objective}
+    if result.x is not None:
+        selected_ids = {index_id + 1 for index_id in range(index_num) if result.x[index_id] > 0.5}
+        solver_info.update({"objective": float(result.fun),
+                            "dual_bound": getattr(result, "mip_dual_bound", None),
+                            "gap": getattr(result, "mip_gap", None)})
+    elif incumbent is not None:
+        # No better solution than the warm start (within the time limit).
+        selected_ids = incumbent
+        solver_info.update({"objective": incumbent_objective, "dual_bound": None, "gap": None})
+    else:
+        selected_ids = None
+    solver_info["time"] = time.time() - time_start
+
+    if selected_ids is None:
+        return None, solver_info
+
+    solutions.setdefault(fingerprint, list()).append(frozenset(selected_ids))
+    return sorted(index_id - 1 for index_id in selected_ids), solver_info
+
+
 def output_as_json(cophy_dict: Dict, json_path: str = None) -> None:
     if json_path is not None:
         folder = "/".join(json_path.split("/")[:-1])
@@ -58,16 +58,19 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
         :return:
         """
         logging.info("Calculating best indexes DB2Advis")
+        time_start = time.time()
         # (called by Relaxation, Anytime)
         # The chosen generator is similar to the original "BFI" and
         # uses all syntactically relevant indexes per query in the workload. return list, len(list) = workload size
 
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes,
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -89,6 +92,11 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
         index_benefits = self._calculate_index_benefits(utilized_indexes, query_details)
         index_benefits_subsumed = self._combine_subsumed(index_benefits)
 
+        # : newly added. for the multi-budget sweep, the ranking does not depend on the budget.
+        if self.record_trajectory:
+            self.trajectory.append({"index_benefits": index_benefits_subsumed, "workload": workload,
+                                    "time_duration": time.time() - time_start})
+
         # : newly added. for process visualization.
         if self.process:
             self.step["candidates"] = index_benefits_subsumed
@@ -102,6 +110,24 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
         #                                       "oracle": item.benefit})
         #     self.layer += 1
 
+        selected_index_benefits = self._select_first_fit(index_benefits_subsumed, self.disk_constraint)
+
+        # : to be explored.
+        if self.try_variations_seconds > 0:
+            selected_index_benefits = self._try_variations(
+                selected_index_benefits, index_benefits_subsumed, workload, self.disk_constraint
+            )
+
+        return [index_benefit.index for index_benefit in selected_index_benefits]
+
+    # : newly modified. shared by the selection and the multi-budget sweep.
+    def _select_first_fit(self, index_benefits_subsumed, disk_constraint):
+        """
+        Select the indexes in the order of `index_benefits_subsumed` while they fit the constraint.
+        :param index_benefits_subsumed: sorted.
+        :param disk_constraint: the storage budget in bytes.
+        :return:
+        """
         selected_index_benefits = []
         disk_usage = 0
         for no, index_benefit in enumerate(index_benefits_subsumed):
@@ -113,40 +139,55 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
                      "oracle": index_benefit.benefit}]
 
             if self.constraint == "storage":
-                if disk_usage + index_benefit.size() <= self.disk_constraint:
-                    selected_index_benefits.append(index_benefit)
-                    disk_usage += index_benefit.size()
-
-                    # : newly added. for process visualization.
-                    if self.process:
-                        for remain in index_benefits_subsumed[no + 1:]:
-                            self.step[self.layer] = [
-                                {"combination": [item.index for item in selected_index_benefits] + [remain.index],
-                                 "candidate": remain.index,
-                                 "oracle": remain.benefit}]
-                        self.step["selected"].append(no)
-                        self.layer += 1
+                fits = disk_usage + index_benefit.size() <= disk_constraint
             elif self.constraint == "number":
-                if len(selected_index_benefits) + 1 <= self.max_indexes:
-                    selected_index_benefits.append(index_benefit)
-
-                    # : newly added. for process visualization.
-                    if self.process:
-                        for remain in index_benefits_subsumed[no + 1:]:
-                            self.step[self.layer] = [
-                                {"combination": [item.index for item in selected_index_benefits] + [remain.index],
-                                 "candidate": remain.index,
-                                 "oracle": remain.benefit}]
-                        self.step["selected"].append(no)
-                        self.layer += 1
+                fits = len(selected_index_benefits) + 1 <= self.max_indexes
+            else:
+                fits = False
+            if not fits:
+                continue
+
+            selected_index_benefits.append(index_benefit)
+            disk_usage += index_benefit.size()
+
+            # : newly added. for process visualization.
+            if self.process:
+                for remain in index_benefits_subsumed[no + 1:]:
+                    self.step[self.layer] = [
+                        {"combination": [item.index for item in selected_index_benefits] + [remain.index],
+                         "candidate": remain.index,
+                         "oracle": remain.benefit}]
+                self.step["selected"].append(no)
+                self.layer += 1
+
+        return selected_index_benefits
+
+    # : newly added. for the multi-budget sweep.
+    def _trajectory_budget(self, budgets_MB):
+        return budgets_MB[-1]
+
+    def _select_from_trajectory(self, budget_MB):
+        """
+        The first-fit selection (and the TryVariations phase) over the ranking of the recorded run.
+        :param budget_MB:
+        :return:
+        """
+        if len(self.trajectory) == 0:
+            return None
+
+        time_start = time.time()
+        index_benefits_subsumed = self.trajectory[0]["index_benefits"]
+        disk_constraint = mb_to_b(budget_MB)
+
+        selected_index_benefits = self._select_first_fit(index_benefits_subsumed, disk_constraint)
 
-        # : to be explored.
         if self.try_variations_seconds > 0:
             selected_index_benefits = self._try_variations(
-                selected_index_benefits, index_benefits_subsumed, workload
+                selected_index_benefits, index_benefits_subsumed, self.trajectory[0]["workload"], disk_constraint
             )
 
-        return [index_benefit.index for index_benefit in selected_index_benefits]
+        return [index_benefit.index for index_benefit in selected_index_benefits], \
+            self.trajectory[0]["time_duration"] + time.time() - time_start
 
     def _calculate_index_benefits(self, candidates, query_results):
         """
@@ -209,36 +250,39 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
                 key=lambda index_benefit: index_benefit.benefit_size_ratio(),
             ), "the input of _combine_subsumed must be sorted"
 
-        index_benefits_to_remove = set()
+        # : newly modified. The indexes subsumed by an index are its prefixes (see `IndexRelations`),
+        # i.e., only the positions of the prefixes are tested instead of all the following elements.
+        positions = {index_benefit.index: pos for pos, index_benefit in enumerate(index_benefits)}
+        removed_positions = set()
         for high_ratio_pos, index_benefit_high_ratio in enumerate(index_benefits):
-            if index_benefit_high_ratio in index_benefits_to_remove:
+            if high_ratio_pos in removed_positions:
                 continue
-            # Test all following elements (with lower ratios) in the list
-            iteration_pos = high_ratio_pos + 1
-            for index_benefit_lower_ratio in index_benefits[iteration_pos:]:
-                if index_benefit_lower_ratio in index_benefits_to_remove:
+            # Test the following elements (with lower ratios) in the list subsumed by it
+            lower_ratio_positions = sorted(positions[prefix]
+                                           for prefix in self.index_relations.prefixes(index_benefit_high_ratio.index)
+                                           if positions.get(prefix, -1) > high_ratio_pos)
+            for lower_ratio_pos in lower_ratio_positions:
+                if lower_ratio_pos in removed_positions:
                     continue
-                if index_benefit_high_ratio.index.subsumes(
-                        index_benefit_lower_ratio.index
-                ):
-                    index_benefit_high_ratio.benefit += index_benefit_lower_ratio.benefit
-                    index_benefits_to_remove.add(index_benefit_lower_ratio)
+                index_benefit_high_ratio.benefit += index_benefits[lower_ratio_pos].benefit
+                removed_positions.add(lower_ratio_pos)
 
-        result_set = set(index_benefits) - index_benefits_to_remove
+        result_set = set(index_benefit for pos, index_benefit in enumerate(index_benefits)
+                         if pos not in removed_positions)
         # Sorting of a set results in a list
         return sorted(result_set, reverse=True)
 
-    def _try_variations(self, selected_index_benefits, index_benefits, workload):
+    # : newly modified. `disk_constraint` is given by the caller (the budget of the sweep).
+    def _try_variations(self, selected_index_benefits, index_benefits, workload, disk_constraint):
         logging.debug(f"Try variation for {self.try_variations_seconds} seconds")
         start_time = time.time()
 
         not_used_index_benefits = set(index_benefits) - set(selected_index_benefits)
 
         min_length = min(len(selected_index_benefits), len(not_used_index_benefits))
-        if self.try_variations_max_removals > min_length:
-            self.try_variations_max_removals = min_length
+        max_removals = min(self.try_variations_max_removals, min_length)
 
-        if self.try_variations_max_removals == 0:
+        if max_removals == 0:
             return selected_index_benefits
 
         current_cost = self._evaluate_workload(selected_index_benefits, workload)
@@ -247,8 +291,8 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
 
         while start_time + self.try_variations_seconds > time.time():
             number_of_exchanges = (
-                random.randrange(1, self.try_variations_max_removals)
-                if self.try_variations_max_removals > 1
+                random.randrange(1, max_removals)
+                if max_removals > 1
                 else 1
             )
             indexes_to_remove = frozenset(
@@ -265,7 +309,7 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
                 indexes_to_remove
             ), "_try_variations must remove the same number of indexes that are added."
             for index_benefit in indexes_to_add:
-                if index_benefit.size() + new_variation_size > self.disk_constraint:
+                if index_benefit.size() + new_variation_size > disk_constraint:
                     continue
                 new_variaton.add(index_benefit)
                 new_variation_size += index_benefit.size()
@@ -288,12 +332,14 @@ class DB2AdvisAlgorithm(SelectionAlgorithm):
         :param workload:
         :return:
         """
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes,
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -1,13 +1,18 @@
+import time
 import logging
 
 from .selection_algorithm import DEFAULT_PARAMETER_VALUES, SelectionAlgorithm
 
+from index_advisor_selector.index_selection.heu_selection.heu_utils.workload import Workload
 from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import mb_to_b, b_to_mb, get_utilized_indexes
 from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import candidates_per_query, \
     syntactically_relevant_indexes, syntactically_relevant_indexes_dqn_rule, syntactically_relevant_indexes_openGauss
 
 # max_indexes: The algorithm stops as soon as it has selected `#max_indexes` indexes
-DEFAULT_PARAMETERS = {"max_indexes": DEFAULT_PARAMETER_VALUES["max_indexes"]}
+# incremental: Track the queries utilizing every remaining index (from their plans)
+#              and re-cost only those queries when the index is dropped.
+DEFAULT_PARAMETERS = {"max_indexes": DEFAULT_PARAMETER_VALUES["max_indexes"],
+                      "incremental": False}
 
 
 # This algorithm is a reimplementation of the Drop heuristic proposed by Whang in 1985.
@@ -29,22 +34,28 @@ class DropAlgorithm(SelectionAlgorithm):
         self.constraint = self.parameters["constraint"]
         self.multi_column = self.parameters["multi_column"]
 
+        # : newly added. for the incremental cost maintenance.
+        self.incremental = self.parameters["incremental"]
+
     def _calculate_best_indexes(self, workload, db_conf=None, columns=None):
         assert (
                 self.max_indexes > 0
         ), "Calling the DropHeuristic with max_indexes < 1 does not make sense."
         logging.info("Calculating best indexes (drop heuristic)")
         logging.info("Parameters: " + str(self.parameters))
+        time_start = time.time()
 
         # remaining_indexes is initialized as a set of all potential indexes
         if self.multi_column:
             # (0917): newly added.
-            if self.cand_gen is None or self.cand_gen == "permutation":
+            if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
                 candidates_query = candidates_per_query(
                     workload,
                     self.parameters["max_index_width"],
                     candidate_generator=syntactically_relevant_indexes,
                 )
+                # : newly added. for the benefit upper-bound candidate pruning.
+                candidates_query = self._prune_candidates(workload, candidates_query)
 
             elif self.cand_gen == "dqn_rule":
                 candidates_query = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -75,6 +86,11 @@ class DropAlgorithm(SelectionAlgorithm):
                 # Obtain the utilized indexes considering every single query
                 candidates_query, _ = get_utilized_indexes(workload, [remaining_indexes], self.cost_evaluation)
 
+        # : newly added. for the warm start, drop from the repaired previous recommendation
+        # and the candidates of the affected queries.
+        if self.prior_indexes is not None:
+            remaining_indexes = self._warm_start_candidates(workload, remaining_indexes, self._fits)
+
         # (0804): newly added. for storage budget.
         if self.constraint == "storage":
             cost = self.cost_evaluation.calculate_cost(
@@ -82,8 +98,13 @@ class DropAlgorithm(SelectionAlgorithm):
                 , store_size=True  # newly added.
             )
 
+            # : newly added. for the multi-budget sweep, the candidates filtered by the budget.
+            candidate_sizes = [index.estimated_size for index in remaining_indexes]
+
             # (0917): newly added.
             remaining_indexes = set([index for index in remaining_indexes if index.estimated_size < self.budget])
+        else:
+            candidate_sizes = list()
 
         # (0918): newly modified.
         # if self.is_utilized:
@@ -124,6 +145,17 @@ class DropAlgorithm(SelectionAlgorithm):
             , store_size=True  # newly added.
         )
 
+        # : newly added. for the multi-budget sweep, every configuration down to the budget is recorded.
+        if self.record_trajectory:
+            self.trajectory.append({"indexes": set(remaining_indexes), "candidate_sizes": candidate_sizes,
+                                    "size": sum(index.estimated_size for index in remaining_indexes),
+                                    "time_duration": time.time() - time_start})
+
+        # : newly added. for the incremental cost maintenance,
+        # {query: cost} and {query: utilized_indexes} under `remaining_indexes`.
+        if self.incremental:
+            query_costs, query_utilized = self._query_utilization(workload.queries, remaining_indexes)
+
         while True:
             if self.constraint == "number":
                 if len(remaining_indexes) <= self.max_indexes:
@@ -142,8 +174,18 @@ class DropAlgorithm(SelectionAlgorithm):
             lowest_cost = None  # : initialized by `self.cost_evaluation.calculate_cost(workload, indexes=[])`
             index_to_drop = None  # : initialized by `[]`
             index_to_drop_no = None
+            # : newly added. Dropping an index changes the costs of the queries utilizing it only.
+            if self.incremental:
+                current_cost = sum(query_costs[query] * query.frequency for query in workload.queries)
+                index_users = dict()
+                for query in workload.queries:
+                    for utilized_index in query_utilized[query]:
+                        index_users.setdefault(utilized_index, list()).append(query)
             for no, index in enumerate(remaining_indexes):
-                if self.constraint == "number":
+                if self.incremental:
+                    cost = self._drop_cost(workload, remaining_indexes, index,
+                                           index_users.get(index, list()), query_costs)
+                elif self.constraint == "number":
                     cost = self.cost_evaluation.calculate_cost(
                         workload, remaining_indexes - set([index])
                         , store_size=True  # newly added.
@@ -159,10 +201,12 @@ class DropAlgorithm(SelectionAlgorithm):
                 if self.sel_oracle == "cost_per_sto":
                     cost = cost * b_to_mb(index.estimated_size)
                 elif self.sel_oracle == "benefit_per_sto":
-                    current_cost = self.cost_evaluation.calculate_cost(workload, remaining_indexes)
+                    if not self.incremental:
+                        current_cost = self.cost_evaluation.calculate_cost(workload, remaining_indexes)
                     cost = -1 * (current_cost - cost) / b_to_mb(index.estimated_size)
                 elif self.sel_oracle == "benefit_pure":
-                    current_cost = self.cost_evaluation.calculate_cost(workload, remaining_indexes)
+                    if not self.incremental:
+                        current_cost = self.cost_evaluation.calculate_cost(workload, remaining_indexes)
                     cost = -1 * (current_cost - cost)
 
                 if not lowest_cost or cost < lowest_cost:
@@ -174,6 +218,16 @@ class DropAlgorithm(SelectionAlgorithm):
                                                   "candidate": index,
                                                   "oracle": cost})
             remaining_indexes.remove(index_to_drop)
+            # : newly added. the plans of the queries that utilized the dropped index have changed.
+            if self.incremental:
+                costs, utilized = self._query_utilization(index_users.get(index_to_drop, list()),
+                                                          remaining_indexes)
+                query_costs.update(costs)
+                query_utilized.update(utilized)
+            if self.record_trajectory:
+                self.trajectory.append({"indexes": set(remaining_indexes),
+                                        "size": sum(index.estimated_size for index in remaining_indexes),
+                                        "time_duration": time.time() - time_start})
 
             # : newly added. for process visualization.
             if self.process:
@@ -188,3 +242,74 @@ class DropAlgorithm(SelectionAlgorithm):
             )
 
         return remaining_indexes
+
+    # : newly added. for the incremental cost maintenance.
+    def _query_utilization(self, queries, indexes):
+        """
+        :param queries:
+        :param indexes:
+        :return: ({query: cost}, {query: utilized_indexes}) of `queries` under `indexes`.
+        """
+        if len(queries) == 0:
+            return dict(), dict()
+
+        results = self.cost_evaluation.utilized_indexes_and_costs(Workload(list(queries)), indexes)
+
+        return {query: cost for query, (_, cost) in results.items()}, \
+               {query: utilized_indexes for query, (utilized_indexes, _) in results.items()}
+
+    def _drop_cost(self, workload, indexes, index, affected_queries, query_costs):
+        """
+        The cost of `workload` under `indexes` without `index`, the costs of the queries
+        not utilizing `index` are unchanged, the `affected_queries` are re-costed in one batch.
+        :param workload:
+        :param indexes:
+        :param index:
+        :param affected_queries: the queries utilizing `index` under `indexes`.
+        :param query_costs: {query: cost} under `indexes`.
+        :return:
+        """
+        costs = dict()
+        if len(affected_queries) != 0:
+            costs = dict(zip(affected_queries, self.cost_evaluation.calculate_query_costs(
+                Workload(affected_queries), indexes - set([index]), store_size=True)))
+
+        # Summed up in the order of the queries, as in `CostEvaluation.calculate_cost()`.
+        cost = 0
+        for query in workload.queries:
+            cost += costs.get(query, query_costs[query]) * query.frequency
+
+        return cost
+
+    # : newly added. for the warm start.
+    def _fits(self, indexes):
+        if self.constraint == "number":
+            return len(indexes) <= self.max_indexes
+        return sum(index.estimated_size for index in indexes) <= self.budget
+
+    # : newly added. for the multi-budget sweep.
+    def _trajectory_budget(self, budgets_MB):
+        return budgets_MB[0]
+
+    def _select_from_trajectory(self, budget_MB):
+        """
+        The order of the drops does not depend on the budget, the configuration for `budget_MB`
+        is the first one of the trajectory (of the smallest budget) within `budget_MB`,
+        if no further candidate passes the size filter of `budget_MB`.
+        :param budget_MB:
+        :return:
+        """
+        if len(self.trajectory) == 0:
+            return None
+        if self.constraint == "number":
+            return set(self.trajectory[-1]["indexes"]), self.trajectory[-1]["time_duration"]
+
+        budget = mb_to_b(budget_MB)
+        for size in self.trajectory[0]["candidate_sizes"]:
+            if self.budget <= size < budget:
+                return None
+        for step in self.trajectory:
+            if step["size"] <= budget:
+                return set(step["indexes"]), step["time_duration"]
+
+        return None
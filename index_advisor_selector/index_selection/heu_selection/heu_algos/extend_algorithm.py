@@ -1,4 +1,6 @@
 import copy
+import time
+import heapq
 import logging
 
 from .selection_algorithm import DEFAULT_PARAMETER_VALUES, SelectionAlgorithm
@@ -10,12 +12,15 @@ from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com impo
 # max_index_width: The number of columns an index can contain at maximum.
 # min_cost_improvement: The value of the relative improvement that must be realized by a
 #                       new configuration to be selected.
+# lazy_greedy: Re-evaluate only the most promising configurations per step (CELF),
+#              the ratios of the former steps are used as upper bounds.
 # The algorithm stops if either the budget is exceeded or no further beneficial
 # configurations can be found.
 DEFAULT_PARAMETERS = {
     "budget_MB": DEFAULT_PARAMETER_VALUES["budget_MB"],
     "max_index_width": DEFAULT_PARAMETER_VALUES["max_index_width"],
-    "min_cost_improvement": 1.003
+    "min_cost_improvement": 1.003,
+    "lazy_greedy": False
 }
 
 
@@ -37,6 +42,13 @@ class ExtendAlgorithm(SelectionAlgorithm):
         self.max_index_width = self.parameters["max_index_width"]
         self.workload = None
         self.min_cost_improvement = self.parameters["min_cost_improvement"]
+        # : newly added. for the lazy-greedy (CELF) evaluation.
+        self.lazy_greedy = self.parameters["lazy_greedy"]
+        self.lazy_evaluations = 0
+        self.lazy_skipped_evaluations = 0
+        # : newly added. for the multi-budget sweep, the smallest improving combination of the current step.
+        self.step_min_size = float("inf")
+        self.time_start = None
 
         # (0804): newly added. for number.
         self.max_indexes = self.parameters["max_indexes"]
@@ -57,6 +69,11 @@ class ExtendAlgorithm(SelectionAlgorithm):
             return list()
 
         self.workload = workload
+        self.time_start = time.time()
+
+        # : newly added. for the lazy-greedy (CELF) evaluation.
+        if self.lazy_greedy:
+            return self._calculate_best_indexes_lazy()
 
         # Single-column index (called in AutoAdmin)
         single_attribute_index_candidates = self.workload.potential_indexes()
@@ -69,6 +86,9 @@ class ExtendAlgorithm(SelectionAlgorithm):
         # Current index combination
         index_combination = []
         index_combination_size = 0
+        # : newly added. for the warm start, continue from the repaired previous recommendation.
+        if self.prior_indexes is not None:
+            index_combination, index_combination_size = self._warm_start_combination()
 
         # Best index combination during enumeration/evaluation step
         best = {"combination": [], "benefit_to_size_ratio": 0, "cost": None}
@@ -77,6 +97,7 @@ class ExtendAlgorithm(SelectionAlgorithm):
             self.workload, index_combination, store_size=True
         )
         self.initial_cost = current_cost
+        self._record_step(index_combination, index_combination_size)
 
         # Breaking when no cost improvement
         # : newly added. for process visualization.
@@ -90,10 +111,17 @@ class ExtendAlgorithm(SelectionAlgorithm):
             # (0804): newly added. for number.
             if self.constraint == "number" and len(index_combination) >= self.max_indexes:
                 break
+            self.step_min_size = float("inf")
 
             single_attribute_index_candidates = self._get_candidates_within_budget(
                 index_combination_size, single_attribute_index_candidates
             )
+            # : newly added. for the parallel candidate scoring, the candidates are still reduced in order below.
+            self.cost_evaluation.prefetch_costs(
+                self.workload.queries,
+                self._step_combinations(index_combination, single_attribute_index_candidates,
+                                        extension_attribute_candidates), store_size=True)
+
             # 1. single-column index.
             for candidate in single_attribute_index_candidates:
                 # Only single column index generation
@@ -114,6 +142,10 @@ class ExtendAlgorithm(SelectionAlgorithm):
                 # attaching columns to existing indexes
                 self._attach_to_indexes(index_combination, attribute, best, current_cost)
 
+            # : newly added. for the multi-budget sweep.
+            if self.record_trajectory:
+                self.trajectory[-1]["next_min_size"] = self.step_min_size
+
             # (1216): no useful index, no useful single-column index -> exit.
             if best["benefit_to_size_ratio"] <= 0:
                 break
@@ -137,9 +169,187 @@ class ExtendAlgorithm(SelectionAlgorithm):
 
             best["benefit_to_size_ratio"] = 0
             current_cost = best["cost"]
+            self._record_step(index_combination, index_combination_size)
+
+        return index_combination
+
+    # : newly added. for the lazy-greedy (CELF) evaluation.
+    def _calculate_best_indexes_lazy(self):
+        """
+        The same greedy steps as `_calculate_best_indexes()`, but the benefit-to-size ratio
+        of a step (adding a single-column index / appending a column to a selected index)
+        is assumed not to increase after other indexes were added. The ratios of the former
+        steps are thus upper bounds: the steps are re-evaluated from the highest bound on,
+        until the highest one has been evaluated in the current step.
+        :return:
+        """
+        single_attribute_index_candidates = self.workload.potential_indexes()
+        extension_attribute_candidates = single_attribute_index_candidates.copy()
+
+        if self.process:
+            self.step["candidates"] = single_attribute_index_candidates
+            self.layer = 0
+
+        index_combination = []
+        index_combination_size = 0
+        if self.prior_indexes is not None:
+            index_combination, index_combination_size = self._warm_start_combination()
+
+        current_cost = self.cost_evaluation.calculate_cost(
+            self.workload, index_combination, store_size=True
+        )
+        self.initial_cost = current_cost
+        self._record_step(index_combination, index_combination_size)
+
+        # {move: ratio}, move: (candidate, None) or (attribute, index to be extended).
+        upper_bounds = dict()
+        while True:
+            if self.process:
+                self.step[self.layer] = list()
+
+            if self.constraint == "number" and len(index_combination) >= self.max_indexes:
+                break
+
+            single_attribute_index_candidates = self._get_candidates_within_budget(
+                index_combination_size, single_attribute_index_candidates
+            )
+
+            # The moves of the current step in the order of the exact evaluation (for the ties).
+            moves = list()
+            for candidate in single_attribute_index_candidates:
+                if candidate not in index_combination:
+                    moves.append((candidate, None))
+            for attribute in extension_attribute_candidates:
+                for index in index_combination:
+                    if len(index.columns) < self.max_index_width and index.appendable_by(attribute) \
+                            and Index(index.columns + attribute.columns) not in index_combination:
+                        moves.append((attribute, index))
+
+            heap = [(-upper_bounds.get(move, float("inf")), order, False, move)
+                    for order, move in enumerate(moves)]
+            heapq.heapify(heap)
+
+            best = None
+            while len(heap) != 0:
+                _, order, evaluated, move = heapq.heappop(heap)
+                if evaluated:
+                    best = move
+                    break
+
+                new_combination, old_index_size = self._apply_move(index_combination, move)
+                ratio, cost = self._combination_ratio(new_combination, current_cost, old_index_size)
+                self.lazy_evaluations += 1
+                upper_bounds[move] = ratio
+
+                if self.process:
+                    self.step[self.layer].append({"combination": new_combination,
+                                                  "candidate": new_combination[-1],
+                                                  "oracle": ratio})
+
+                total_size = sum(index.estimated_size for index in new_combination)
+                if cost is not None and ratio > 0 and total_size <= self.budget:
+                    heapq.heappush(heap, (-ratio, order, True, (move, new_combination, cost)))
+            # The entries left with a bound of a former step were not evaluated in this step.
+            self.lazy_skipped_evaluations += sum(1 for entry in heap if not entry[2])
+
+            if best is None:
+                # All the moves were evaluated, none of them fits into the budget.
+                if self.record_trajectory:
+                    self.trajectory[-1]["next_min_size"] = float("inf")
+                break
+            (candidate, _), index_combination, cost = best
+
+            if self.process:
+                self.step["selected"].append([item["combination"] for item in
+                                              self.step[self.layer]].index(index_combination))
+                self.layer += 1
+
+            index_combination_size = sum(
+                index.estimated_size for index in index_combination
+            )
+            logging.debug(
+                "Add index. Current cost savings: "
+                f"{(1 - cost / current_cost) * 100:.3f}, "
+                f"initial {(1 - cost / self.initial_cost) * 100:.3f}. "
+                f"Current storage: {index_combination_size:.2f}"
+            )
+            current_cost = cost
+            # The moves not re-evaluated might fit into a smaller budget.
+            if self.record_trajectory:
+                self.trajectory[-1]["next_min_size"] = 0
+            self._record_step(index_combination, index_combination_size)
+
+        logging.info(f"Lazy greedy: {self.lazy_evaluations} configurations evaluated, "
+                     f"{self.lazy_skipped_evaluations} evaluations skipped.")
 
         return index_combination
 
+    # : newly added. for the warm start.
+    def _warm_start_combination(self):
+        prior_indexes = [index for index in self.prior_indexes if len(index.columns) <= self.max_index_width]
+        index_combination = self._repair_indexes(self.workload, prior_indexes, self._fits)
+        index_combination_size = sum(index.estimated_size for index in index_combination)
+
+        return index_combination, index_combination_size
+
+    def _fits(self, index_combination):
+        if self.constraint == "number" and len(index_combination) > self.max_indexes:
+            return False
+        return sum(index.estimated_size for index in index_combination) <= self.budget
+
+    # : newly added. for the multi-budget sweep.
+    def _record_step(self, index_combination, index_combination_size):
+        """
+        Record the combination of a greedy step, `next_min_size` is set to the size of
+        the smallest improving combination of the next step (the next step of a run
+        with a smaller budget either picks one of them or stops).
+        :param index_combination:
+        :param index_combination_size:
+        :return:
+        """
+        if not self.record_trajectory:
+            return
+        self.trajectory.append({"indexes": list(index_combination), "size": index_combination_size,
+                                "time_duration": time.time() - self.time_start,
+                                "next_min_size": float("inf")})
+
+    def _trajectory_budget(self, budgets_MB):
+        return budgets_MB[-1]
+
+    def _select_from_trajectory(self, budget_MB):
+        """
+        The longest prefix of the trajectory (of the largest budget) within `budget_MB`,
+        if none of the improving combinations of its next step fits into `budget_MB`.
+        :param budget_MB:
+        :return:
+        """
+        budget = mb_to_b(budget_MB)
+        if self.constraint == "storage" and budget == 0:
+            return list(), 0
+
+        selected = None
+        for step in self.trajectory:
+            if step["size"] > budget:
+                break
+            selected = step
+        if selected is None or selected["next_min_size"] <= budget:
+            return None
+
+        return list(selected["indexes"]), selected["time_duration"]
+
+    @staticmethod
+    def _apply_move(index_combination, move):
+        attribute, index = move
+        if index is None:
+            return index_combination + [attribute], 0
+
+        position = index_combination.index(index)
+        new_combination = copy.deepcopy(index_combination)
+        del new_combination[position]
+        new_combination.append(Index(index.columns + attribute.columns))
+
+        return new_combination, index_combination[position].estimated_size
+
     def _attach_to_indexes(self, index_combination, attribute, best, current_cost):
         assert (
                 attribute.is_single_column() is True
@@ -180,6 +390,27 @@ class ExtendAlgorithm(SelectionAlgorithm):
                                                   "candidate": new_index,
                                                   "oracle": ratio})
 
+    def _step_combinations(self, index_combination, single_candidates, extension_candidates):
+        """
+        The combinations evaluated by one (exact) step, see `_attach_to_indexes()`.
+        :param index_combination:
+        :param single_candidates:
+        :param extension_candidates:
+        :return:
+        """
+        combinations = [index_combination + [candidate] for candidate in single_candidates
+                        if candidate not in index_combination]
+        for attribute in extension_candidates:
+            for position, index in enumerate(index_combination):
+                if len(index.columns) >= self.max_index_width or not index.appendable_by(attribute):
+                    continue
+                new_index = Index(index.columns + attribute.columns)
+                if new_index in index_combination:
+                    continue
+                combinations.append(index_combination[:position] + index_combination[position + 1:] + [new_index])
+
+        return combinations
+
     def _get_candidates_within_budget(self, index_combination_size, candidates):
         if self.constraint == "storage":
             new_candidates = list()
@@ -194,6 +425,31 @@ class ExtendAlgorithm(SelectionAlgorithm):
     def _evaluate_combination(
             self, index_combination, best, current_cost, old_index_size=0
     ):
+        # : newly modified. the ratio is computed by `_combination_ratio()`.
+        ratio, cost = self._combination_ratio(index_combination, current_cost, old_index_size)
+        if cost is None:
+            return ratio
+
+        total_size = sum(index.estimated_size for index in index_combination)
+        # : newly added. for the multi-budget sweep.
+        if ratio > 0:
+            self.step_min_size = min(self.step_min_size, total_size)
+        if ratio > best["benefit_to_size_ratio"] and total_size <= self.budget:
+            logging.debug(f"new best cost and size: {cost}\t" f"{b_to_mb(total_size):.2f}MB")
+            best["combination"] = index_combination
+            best["benefit_to_size_ratio"] = ratio
+            best["cost"] = cost
+
+        # : newly added.
+        return ratio
+
+    def _combination_ratio(self, index_combination, current_cost, old_index_size=0):
+        """
+        :param index_combination:
+        :param current_cost:
+        :param old_index_size:
+        :return: (ratio, cost), `(-1, None)` if the cost improvement is not sufficient.
+        """
         cost = self.cost_evaluation.calculate_cost(
             self.workload, index_combination, store_size=True
         )
@@ -202,7 +458,7 @@ class ExtendAlgorithm(SelectionAlgorithm):
         if (cost * self.min_cost_improvement) >= current_cost:
             # : newly modified. return -> return -1
             # return
-            return -1
+            return -1, None
         benefit = current_cost - cost
         new_index = index_combination[-1]  # the candidate input.
 
@@ -234,12 +490,4 @@ class ExtendAlgorithm(SelectionAlgorithm):
         elif self.sel_oracle == "benefit_pure":
             ratio = benefit
 
-        total_size = sum(index.estimated_size for index in index_combination)
-        if ratio > best["benefit_to_size_ratio"] and total_size <= self.budget:
-            logging.debug(f"new best cost and size: {cost}\t" f"{b_to_mb(total_size):.2f}MB")
-            best["combination"] = index_combination
-            best["benefit_to_size_ratio"] = ratio
-            best["cost"] = cost
-
-        # : newly added.
-        return ratio
+        return ratio, cost
@@ -3,7 +3,6 @@ import logging
 
 from .selection_algorithm import DEFAULT_PARAMETER_VALUES, SelectionAlgorithm
 
-from index_advisor_selector.index_selection.heu_selection.heu_utils.index import Index, index_merge, index_split
 from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import get_utilized_indexes, indexes_by_table, mb_to_b, b_to_mb
 from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import candidates_per_query, \
     syntactically_relevant_indexes, syntactically_relevant_indexes_dqn_rule, syntactically_relevant_indexes_openGauss
@@ -73,12 +72,14 @@ class RelaxationAlgorithm(SelectionAlgorithm):
 
         # Generate syntactically relevant candidates
         # (0917): newly added.
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes,
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -105,15 +106,24 @@ class RelaxationAlgorithm(SelectionAlgorithm):
                 , store_size=True  # newly added.
             )
 
+        # : newly added. for the warm start, relax the repaired previous recommendation
+        # and the candidates of the affected queries.
+        if self.prior_indexes is not None:
+            candidates = self._warm_start_candidates(workload, candidates, self._fits)
+
         # : newly added. for process visualization.
         if self.process:
             self.step["candidates"] = candidates.copy()
 
+        # : newly added. the relaxed indexes equal to a candidate share its object (and size).
+        self.index_relations.add(sorted(candidates))
+
         # CP in Figure 5
         # (0804): newly added. for reproduction.
         cp = sorted(list(candidates.copy()))
         cp_size = sum(index.estimated_size for index in cp)
-        cp_cost = self.cost_evaluation.calculate_cost(workload, cp, store_size=True)
+        # : newly modified. the cost matrix (if enabled) in place of the cost evaluation.
+        cp_cost = self._cost_oracle().calculate_cost(workload, cp, store_size=True)
         while True:
             # (0804): newly added. for storage budget/number.
             if self.constraint == "storage" and cp_size <= self.disk_constraint:
@@ -143,7 +153,7 @@ class RelaxationAlgorithm(SelectionAlgorithm):
             for transformation in self.transformations:
                 for (relaxed, relaxed_storage_savings) \
                         in self._configurations_by_transformation(cp, cp_by_table, transformation):
-                    relaxed_cost = self.cost_evaluation.calculate_cost(workload, relaxed, store_size=True)
+                    relaxed_cost = self._cost_oracle().calculate_cost(workload, relaxed, store_size=True)
                     # Note, some transformations could also decrease the cost,
                     # indicated by a negative value.
                     relaxed_cost_increase = relaxed_cost - cp_cost
@@ -217,6 +227,12 @@ class RelaxationAlgorithm(SelectionAlgorithm):
         # (0804): newly added. for reproduction.
         return sorted(list(cp))
 
+    # : newly added. for the warm start.
+    def _fits(self, indexes):
+        if self.constraint == "number":
+            return len(indexes) <= self.max_indexes
+        return sum(index.estimated_size for index in indexes) <= self.disk_constraint
+
     def _configurations_by_transformation(
             self, input_configuration, input_configuration_by_table, transformation
     ):
@@ -224,7 +240,8 @@ class RelaxationAlgorithm(SelectionAlgorithm):
         if transformation == "prefixing":
             # (0804): newly added. for reproduction.
             for index in sorted(list(input_configuration)):
-                for prefix in index.prefixes():
+                # : newly modified. memoized, see `IndexRelations`.
+                for prefix in self.index_relations.prefixes(index):
                     relaxed = set(input_configuration.copy())
                     relaxed.remove(index)
                     relaxed_storage_savings = index.estimated_size
@@ -248,10 +265,8 @@ class RelaxationAlgorithm(SelectionAlgorithm):
                         input_configuration_by_table[table], 2
                 ):
                     relaxed = set(input_configuration.copy())
-                    merged_index = index_merge(index1, index2)
-                    if len(merged_index.columns) > self.max_index_width:
-                        new_columns = merged_index.columns[: self.max_index_width]
-                        merged_index = Index(new_columns)
+                    # : newly modified. memoized (and truncated), see `IndexRelations`.
+                    merged_index = self.index_relations.merge(index1, index2, self.max_index_width)
 
                     relaxed -= {index1, index2}
                     relaxed_storage_savings = (
@@ -270,7 +285,8 @@ class RelaxationAlgorithm(SelectionAlgorithm):
                         input_configuration_by_table[table], 2
                 ):
                     relaxed = set(input_configuration.copy())
-                    indexes_by_splitting = index_split(index1, index2)
+                    # : newly modified. memoized, see `IndexRelations`.
+                    indexes_by_splitting = self.index_relations.split(index1, index2)
                     if indexes_by_splitting is None:
                         # no splitting for index permutation possible
                         continue
@@ -290,12 +306,14 @@ class RelaxationAlgorithm(SelectionAlgorithm):
         :return:
         """
         # Generate syntactically relevant candidates
-        if self.cand_gen is None or self.cand_gen == "permutation":
+        if self.cand_gen is None or self.cand_gen in ["permutation", "permutation_bound"]:
             candidates = candidates_per_query(
                 workload,
                 self.parameters["max_index_width"],
                 candidate_generator=syntactically_relevant_indexes,
             )
+            # : newly added. for the benefit upper-bound candidate pruning.
+            candidates = self._prune_candidates(workload, candidates)
 
         elif self.cand_gen == "dqn_rule":
             candidates = [syntactically_relevant_indexes_dqn_rule(db_conf, [query.text], columns,
@@ -1,7 +1,17 @@
 import time
 import logging
+import itertools
 
 from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_evaluation import CostEvaluation
+from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_cache import PersistentCostCache
+from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_matrix import CostMatrix
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index import Index
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index_relations import IndexRelations
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index_size_estimator import IndexSizeEstimator
+from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import \
+    prune_candidates_by_benefit_bound
+from index_advisor_selector.index_selection.heu_selection.heu_utils.workload_compression import compress_workload
+from index_advisor_selector.index_selection.heu_selection.heu_utils.what_if_session_pool import WhatIfSessionPool
 
 # If not specified by the user,
 # algorithms should use these default parameter values to
@@ -33,6 +43,40 @@ class SelectionAlgorithm:
         if "cost_estimation" in self.parameters:
             estimation = self.parameters["cost_estimation"]
             self.cost_evaluation.cost_estimation = estimation
+        # : newly added. for the utilization-aware cost inference.
+        self.cost_evaluation.utilization_inference = self.parameters.get("utilization_inference", False)
+        # : newly added. for the atomic-configuration cost derivation.
+        self.cost_evaluation.cost_derivation = self.parameters.get("cost_derivation", False)
+        self.cost_evaluation.derivation_max_atomic = self.parameters.get("derivation_max_atomic", 32)
+        self.cost_evaluation.derivation_validation = self.parameters.get("derivation_validation", False)
+        # : newly added. for the parallel candidate scoring over the what-if sessions.
+        self.cost_evaluation.parallel_scoring = self.parameters.get("parallel_scoring", False)
+        # : newly added. for the analytic index sizes (without a hypopg round trip per index).
+        if self.parameters.get("analytic_size", False):
+            self.cost_evaluation.what_if.size_estimator = IndexSizeEstimator(database_connector)
+
+        # : newly added. for the cost evaluation shared by several algorithms, see `share_cost_evaluation()`.
+        self.shared_cost_evaluation = False
+
+        # : newly added. for the workload compression ahead of the selection, see `_compress_workload()`.
+        self.compression_info = None
+
+        # : newly added. for the warm start from a previous recommendation, see `_load_warm_start()`.
+        # The (still relevant) indexes of the previous recommendation, the queries not in its snapshot.
+        self.prior_indexes = None
+        self.affected_queries = None
+
+        # : newly added. the memoized prefix / merge / split relations of the indexes.
+        self.index_relations = IndexRelations()
+
+        # : newly added. for the multi-budget sweep, see `calculate_best_indexes_sweep()`.
+        self.record_trajectory = False
+        self.trajectory = list()
+
+        # : newly added. for the enumeration over the query x atomic-configuration cost matrix.
+        self.cost_matrix = None
+        if self.parameters.get("cost_matrix", False):
+            self.cost_matrix = CostMatrix(self.cost_evaluation, self.parameters.get("matrix_max_atoms", 64))
 
         # : newly added. for process visualization.
         self.process = process
@@ -44,7 +88,67 @@ class SelectionAlgorithm:
         self.is_utilized = is_utilized
         self.sel_oracle = sel_oracle
 
-    def calculate_best_indexes(self, workload, overhead=False, db_conf=None, columns=None):
+    # : newly added. for the cost evaluation shared by several algorithms.
+    def share_cost_evaluation(self, cost_evaluation):
+        """
+        Reuse the cache and the simulated indexes of `cost_evaluation`
+        (of another algorithm on the same workload and database).
+        The shared cost evaluation is not completed by the algorithm but by its owner.
+        :param cost_evaluation:
+        :return:
+        """
+        if cost_evaluation.cost_estimation != self.cost_evaluation.cost_estimation:
+            logging.warning(f"The cost evaluation is not shared: `{self.cost_evaluation.cost_estimation}` "
+                            f"instead of `{cost_evaluation.cost_estimation}`.")
+            return
+
+        if cost_evaluation is not self.cost_evaluation:
+            self.cost_evaluation.complete_cost_estimation()
+            self.cost_evaluation = cost_evaluation
+            if self.cost_matrix is not None:
+                self.cost_matrix = CostMatrix(cost_evaluation, self.cost_matrix.max_atoms)
+        self.shared_cost_evaluation = True
+
+    # : newly added. for the persistent cost cache and the what-if session pool.
+    def _open_cost_backends(self):
+        """
+        Open the persistent cost cache (`cost_cache_file`) and the what-if session pool (`parallel_sessions`)
+        of the cost evaluation on the first run, unless the (shared) cost evaluation already holds them,
+        i.e., the algorithms replaced by `share_cost_evaluation()` do not open any session.
+        :return:
+        """
+        if self.parameters.get("cost_cache_file", None) is not None \
+                and self.cost_evaluation.persistent_cache is None:
+            self.cost_evaluation.persistent_cache = PersistentCostCache(
+                self.database_connector, self.parameters["cost_cache_file"],
+                max_entries=self.parameters.get("cost_cache_max_entries", 1000000))
+        if self.parameters.get("parallel_sessions", None) is not None \
+                and self.parameters["parallel_sessions"] > 1 and self.cost_evaluation.session_pool is None:
+            self.cost_evaluation.session_pool = WhatIfSessionPool(self.database_connector,
+                                                                  self.parameters["parallel_sessions"])
+        if self.cost_evaluation.parallel_scoring and self.cost_evaluation.session_pool is None:
+            logging.warning("The parallel candidate scoring requires `parallel_sessions` > 1.")
+
+    # : newly added. for the enumeration over the cost matrix.
+    def _cost_oracle(self):
+        """
+        The cost matrix (if enabled) in place of the cost evaluation during the enumeration,
+        both provide `calculate_cost(workload, indexes, store_size)`.
+        :return:
+        """
+        if self.cost_matrix is not None:
+            return self.cost_matrix
+        return self.cost_evaluation
+
+    def calculate_best_indexes(self, workload, overhead=False, db_conf=None, columns=None, warm_start=None):
+        """
+        :param workload:
+        :param overhead:
+        :param db_conf:
+        :param columns:
+        :param warm_start: the snapshot of a previous run, see `warm_start_snapshot()`.
+        :return:
+        """
         assert self.did_run is False, "Selection algorithm can only run once."
         self.did_run = True
 
@@ -54,7 +158,23 @@ class SelectionAlgorithm:
         simulation_num_bef = self.database_connector.simulated_indexes
         simulation_duration_bef = self.database_connector.index_simulation_duration
 
+        # : newly added. the counters of a shared cost evaluation are accumulated over the algorithms.
+        counters_bef = self._cost_evaluation_counters()
+
+        # : newly added. the persistent cost cache and the session pool are opened lazily.
+        self._open_cost_backends()
+
         time_start = time.time()
+        # : newly added. for the workload compression.
+        if self.parameters.get("compression_max_loss", None) is not None:
+            workload = self._compress_workload(workload)
+        # : newly added. for the warm start.
+        if warm_start is not None:
+            self._load_warm_start(warm_start, workload)
+        # : newly added. for the analytic index sizes.
+        if self.cost_evaluation.what_if.size_estimator is not None \
+                and self.cost_evaluation.what_if.size_estimator.validation is None:
+            self._validate_size_estimator(workload)
         indexes = self._calculate_best_indexes(workload, db_conf=db_conf, columns=columns)
         time_end = time.time()
 
@@ -71,10 +191,16 @@ class SelectionAlgorithm:
         # )
 
         # : newly added. for selection runtime
-        cache_hits = self.cost_evaluation.cache_hits
-        cost_requests = self.cost_evaluation.cost_requests
+        counters_aft = self._cost_evaluation_counters()
+        cache_hits, cost_requests, persistent_cache_hits, inferred_hits, derived_hits, warm_start_hits = \
+            [aft - bef for aft, bef in zip(counters_aft, counters_bef)]
+        if warm_start is not None:
+            logging.info(f"Warm start: {warm_start_hits} what-if calls answered by the snapshot.")
+        if self.cost_evaluation.derivation_validation:
+            logging.info(f"Cost derivation error: {self.cost_evaluation.derivation_error_summary()}")
 
-        self.cost_evaluation.complete_cost_estimation()
+        if not self.shared_cost_evaluation:
+            self.cost_evaluation.complete_cost_estimation()
 
         # : newly added.
         if self.process:
@@ -84,7 +210,10 @@ class SelectionAlgorithm:
                                  "estimation_num": estimation_num_aft - estimation_num_bef,
                                  "estimation_duration": estimation_duration_aft - estimation_duration_bef,
                                  "simulation_num": simulation_num_aft - simulation_num_bef,
-                                 "simulation_duration": simulation_duration_aft - simulation_duration_bef}
+                                 "simulation_duration": simulation_duration_aft - simulation_duration_bef,
+                                 "persistent_cache_hits": persistent_cache_hits,
+                                 "inferred_hits": inferred_hits, "derived_hits": derived_hits,
+                                 "warm_start_hits": warm_start_hits}
             else:
                 return indexes, {"step": self.step, "cache_hits": cache_hits, "cost_requests": cost_requests}
         elif overhead:
@@ -93,17 +222,222 @@ class SelectionAlgorithm:
                              "estimation_num": estimation_num_aft - estimation_num_bef,
                              "estimation_duration": estimation_duration_aft - estimation_duration_bef,
                              "simulation_num": simulation_num_aft - simulation_num_bef,
-                             "simulation_duration": simulation_duration_aft - simulation_duration_bef}
+                             "simulation_duration": simulation_duration_aft - simulation_duration_bef,
+                             "persistent_cache_hits": persistent_cache_hits,
+                             "inferred_hits": inferred_hits, "derived_hits": derived_hits,
+                             "warm_start_hits": warm_start_hits}
         else:
             return indexes
 
+    # : newly added. for the multi-budget sweep.
+    def calculate_best_indexes_sweep(self, workload, budgets_MB, db_conf=None, columns=None):
+        """
+        Select the indexes for every budget of `budgets_MB` with one run recording the trajectory
+        (see `_trajectory_budget()` / `_select_from_trajectory()` of the greedy algorithms).
+        The budgets the trajectory cannot answer exactly (e.g., a step would have been skipped for size)
+        are selected by a fallback re-run. All the runs share the cost evaluation of this algorithm.
+        :param workload:
+        :param budgets_MB:
+        :param db_conf:
+        :param columns:
+        :return: [{"budget_MB", "indexes", "cost", "time_duration", "rerun"}] in the order of `budgets_MB`.
+        """
+        assert self.did_run is False, "Selection algorithm can only run once."
+        self.did_run = True
+
+        # : newly added. the persistent cost cache and the session pool are opened lazily.
+        self._open_cost_backends()
+
+        # The workload is compressed once for all the runs (the representatives are the cache keys).
+        if self.parameters.get("compression_max_loss", None) is not None:
+            workload = self._compress_workload(workload)
+
+        budgets = sorted(set(budgets_MB))
+        runner, trajectory_duration = None, 0
+        trajectory_budget = self._trajectory_budget(budgets)
+        if trajectory_budget is not None:
+            runner = self._sweep_algorithm(trajectory_budget)
+            runner.record_trajectory = True
+            time_start = time.time()
+            runner.calculate_best_indexes(workload, db_conf=db_conf, columns=columns)
+            trajectory_duration = time.time() - time_start
+            # The budgets closer to the trajectory are more likely to be answered by it
+            # (or by the trajectory of the latest re-run).
+            budgets = sorted(budgets, key=lambda budget: abs(budget - trajectory_budget))
+
+        results = dict()
+        for budget in budgets:
+            selected = runner._select_from_trajectory(budget) if runner is not None else None
+            if selected is not None:
+                indexes, time_duration = selected
+                rerun = False
+            else:
+                logging.info(f"Re-run for the budget of {budget}MB.")
+                algorithm = self._sweep_algorithm(budget)
+                algorithm.record_trajectory = runner is not None
+                time_start = time.time()
+                indexes = algorithm.calculate_best_indexes(workload, db_conf=db_conf, columns=columns)
+                time_duration = time.time() - time_start
+                rerun = True
+                if runner is not None:
+                    runner = algorithm
+
+            results[budget] = {"budget_MB": budget, "indexes": sorted(list(indexes)),
+                               "cost": self.cost_evaluation.calculate_cost(workload, indexes),
+                               "time_duration": time_duration, "rerun": rerun}
+        logging.info(f"Sweep over {len(budgets)} budgets: trajectory in {trajectory_duration:.2f}s, "
+                     f"{sum(result['rerun'] for result in results.values())} re-runs.")
+
+        if not self.shared_cost_evaluation:
+            self.cost_evaluation.complete_cost_estimation()
+
+        return [results[budget] for budget in budgets_MB]
+
+    def _sweep_algorithm(self, budget_MB):
+        # The shared cost evaluation already holds the session pool / the persistent cache.
+        parameters = {key: value for key, value in self.parameters.items()
+                      if key not in ["parallel_sessions", "cost_cache_file", "compression_max_loss"]}
+        parameters["budget_MB"] = budget_MB
+        algorithm = self.__class__(self.database_connector, parameters, process=False,
+                                   cand_gen=self.cand_gen, is_utilized=self.is_utilized,
+                                   sel_oracle=self.sel_oracle)
+        algorithm.share_cost_evaluation(self.cost_evaluation)
+
+        return algorithm
+
+    def _trajectory_budget(self, budgets_MB):
+        """
+        :param budgets_MB: sorted.
+        :return: the budget of the run recording the trajectory, None if not supported.
+        """
+        return None
+
+    def _select_from_trajectory(self, budget_MB):
+        """
+        :param budget_MB:
+        :return: (indexes, time_duration) of the recorded trajectory,
+                 None if it does not answer `budget_MB` exactly.
+        """
+        return None
+
+    def _cost_evaluation_counters(self):
+        return (self.cost_evaluation.cache_hits, self.cost_evaluation.cost_requests,
+                self.cost_evaluation.persistent_cache_hits, self.cost_evaluation.inferred_hits,
+                self.cost_evaluation.derived_hits, self.cost_evaluation.snapshot_hits)
+
+    # : newly added. for the benefit upper-bound candidate pruning.
+    def _prune_candidates(self, workload, candidates):
+        """
+        :param workload:
+        :param candidates: [[index]] per query.
+        :return: the candidates with a benefit bound of at least `bound_fraction` of the best one
+                 if `cand_gen` is `permutation_bound`.
+        """
+        if self.cand_gen != "permutation_bound":
+            return candidates
+
+        return prune_candidates_by_benefit_bound(workload, candidates, self.cost_evaluation,
+                                                 self.parameters.get("bound_fraction", 0.1))
+
+    # : newly added. for the analytic index sizes.
+    def _validate_size_estimator(self, workload):
+        """
+        Validate (and calibrate) the analytic sizes against `hypopg_relation_size`
+        on a sample of the single- and two-column indexes of `workload`, see `IndexSizeEstimator.validate()`.
+        :param workload:
+        :return:
+        """
+        indexable_columns = workload.indexable_columns()
+        indexes = [Index([column]) for column in indexable_columns]
+        indexes.extend(Index([column_1, column_2])
+                       for column_1, column_2 in itertools.permutations(indexable_columns, 2)
+                       if column_1.table == column_2.table)
+
+        self.cost_evaluation.what_if.size_estimator.validate(
+            indexes, self.parameters.get("size_validation_samples", 20))
+
+    # : newly added. for the workload compression.
+    def _compress_workload(self, workload):
+        """
+        Replace the clusters of similar queries by weighted representatives, see `compress_workload()`.
+        The queries are compared by their what-if cost profiles (the costs are kept in the cache).
+        :param workload:
+        :return:
+        """
+        cost_evaluation = self.cost_evaluation if self.cost_evaluation.cost_estimation == "whatif" else None
+        compressed_workload, self.compression_info = compress_workload(
+            workload, self.parameters["compression_max_loss"], cost_evaluation=cost_evaluation)
+        self.cost_evaluation.alias_queries({members[0]: representative for representative, members
+                                            in self.compression_info["clusters"].items()})
+
+        return compressed_workload
+
+    # : newly added. for the warm start from a previous recommendation.
+    def warm_start_snapshot(self, indexes):
+        """
+        The recommendation `indexes` and the cost snapshot of this run (JSON-serializable),
+        to be passed as `warm_start` to the next run on the (drifted) workload.
+        :param indexes:
+        :return:
+        """
+        return {"indexes": sorted(str(index) for index in indexes),
+                **self.cost_evaluation.cost_snapshot()}
+
+    def _load_warm_start(self, warm_start, workload):
+        self.prior_indexes, self.affected_queries = self.cost_evaluation.load_snapshot(warm_start, workload)
+
+    def _repair_indexes(self, workload, indexes, fits):
+        """
+        Repair the previous recommendation for the current workload: drop the index whose removal
+        increases the cost least, as long as the configuration does not `fits()` the constraint
+        or the removal does not increase the cost at all (the index is not utilized anymore).
+        :param workload:
+        :param indexes:
+        :param fits: configuration -> bool.
+        :return:
+        """
+        indexes = sorted(indexes)
+        current_cost = self.cost_evaluation.calculate_cost(workload, indexes, store_size=True)
+        while len(indexes) != 0:
+            costs = [self.cost_evaluation.calculate_cost(workload, indexes[:position] + indexes[position + 1:],
+                                                         store_size=True)
+                     for position in range(len(indexes))]
+            position = costs.index(min(costs))
+            if fits(indexes) and costs[position] > current_cost:
+                break
+            logging.debug(f"Repair: drop the index {indexes[position]}.")
+            current_cost = costs[position]
+            del indexes[position]
+
+        return indexes
+
+    def _warm_start_candidates(self, workload, candidates, fits):
+        """
+        The candidates of the algorithms relaxing / dropping from a superset:
+        the repaired previous recommendation and the candidates relevant to the affected queries.
+        :param workload:
+        :param candidates:
+        :param fits: configuration -> bool.
+        :return:
+        """
+        affected_candidates = set()
+        for query in self.affected_queries:
+            affected_candidates |= self.cost_evaluation._relevant_indexes(query, candidates)
+        logging.info(f"Warm start: {len(affected_candidates)} candidates of the affected queries.")
+
+        return set(self._repair_indexes(workload, self.prior_indexes, fits)) | affected_candidates
+
     def _calculate_best_indexes(self, workload):
         raise NotImplementedError("_calculate_best_indexes(self, " "workload) missing")
 
     def _log_cache_hits(self):
         hits = self.cost_evaluation.cache_hits
         requests = self.cost_evaluation.cost_requests
+        if self.cost_matrix is not None:
+            logging.debug(f"Cost matrix requests:\t{self.cost_matrix.requests} "
+                          f"({self.cost_matrix.atom_evaluations} atomic configurations)")
         logging.debug(f"Total cost cache hits:\t{hits}")
+        logging.debug(f"Total inferred hits:\t{self.cost_evaluation.inferred_hits}")
         logging.debug(f"Total cost requests:\t\t{requests}")
         if requests == 0:
             return
@@ -0,0 +1,524 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: heu_bench
+# @Author: Wei Zhou
+# @Time: 2024/1/10 11:05
+
+import os
+import re
+import json
+import time
+import random
+import itertools
+import logging
+import tempfile
+import tracemalloc
+import configparser
+
+import numpy as np
+
+from index_advisor_selector.index_selection.heu_selection.heu_utils import heu_com
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index import Index, index_merge, index_split
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index_relations import IndexRelations
+from index_advisor_selector.index_selection.heu_selection.heu_utils.workload import Workload
+from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import get_parser
+from index_advisor_selector.index_selection.heu_selection.heu_utils.postgres_dbms import PostgresDatabaseConnector
+from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_evaluation import CostEvaluation
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import create_whatif_connector, \
+    save_whatif_recording
+from index_advisor_selector.index_selection.heu_selection.heu_algos.extend_algorithm import ExtendAlgorithm
+from index_advisor_selector.index_selection.heu_selection.heu_algos.anytime_algorithm import AnytimeAlgorithm
+from index_advisor_selector.index_selection.heu_selection.heu_algos.drop_algorithm import DropAlgorithm
+
+
+def get_bench_parser():
+    parser = get_parser()
+
+    parser.add_argument("--bench", type=str, default="prepared_queries",
+                        choices=list(BENCHMARKS.keys()))
+    parser.add_argument("--bench_repeat", type=int, default=5)
+    parser.add_argument("--bench_configs", type=int, default=20000)
+    parser.add_argument("--bench_cores", type=str, default="1,2,4,8")
+    parser.add_argument("--bench_runtime_minutes", type=float, default=1)
+    parser.add_argument("--bench_candidates", type=int, default=2000)
+
+    return parser
+
+
+def get_connector(args):
+    db_conf = configparser.ConfigParser()
+    db_conf.read(args.db_conf_file)
+
+    connector = create_whatif_connector(PostgresDatabaseConnector, db_conf,
+                                        whatif_record=args.whatif_record, whatif_replay=args.whatif_replay,
+                                        autocommit=True, host=args.host, port=args.port,
+                                        db_name=args.db_name, user=args.user, password=args.password)
+
+    return connector
+
+
+def get_workload(args, work_list):
+    _, columns = heu_com.get_columns_from_schema(args.schema_file)
+    workload = Workload(heu_com.read_row_query(work_list, dict(), columns, type="",
+                                               varying_frequencies=args.varying_frequencies, seed=args.seed))
+
+    return workload
+
+
+def summarize_latency(latencies):
+    latencies = np.array(latencies) * 1000
+
+    return {"num": len(latencies), "mean_ms": float(np.mean(latencies)),
+            "median_ms": float(np.median(latencies)), "p95_ms": float(np.percentile(latencies, 95))}
+
+
+def bench_prepared_queries(args, workload):
+    """
+    Compare the planning latency of `EXPLAIN <query>` (the current path)
+    with `EXPLAIN EXECUTE <prepared query>`, under the empty configuration and
+    the configuration of all the single-column indexes of the workload.
+    The first round (PREPARE included) is reported separately as the warm-up.
+    :param args:
+    :param workload:
+    :return:
+    """
+    configurations = {"empty": list(), "single_column": workload.potential_indexes()}
+
+    res = dict()
+    for mode in ["plain", "prepared"]:
+        connector = get_connector(args)
+        if mode == "prepared" and not connector.enable_prepared_queries():
+            connector.close()
+            continue
+
+        res[mode] = dict()
+        for config_name, indexes in configurations.items():
+            connector.drop_hypo_indexes()
+            connector.simulate_indexes(indexes)
+
+            latencies, costs = list(), list()
+            for _ in range(args.bench_repeat):
+                latencies.append(list())
+                costs = list()
+                for query in workload.queries:
+                    start_time = time.perf_counter()
+                    plan = connector._get_plan(query)
+                    latencies[-1].append(time.perf_counter() - start_time)
+                    costs.append(plan["Total Cost"])
+
+            res[mode][config_name] = {"warm_up": summarize_latency(latencies[0]),
+                                      "steady": summarize_latency(sum(latencies[1:], list())),
+                                      "costs": costs}
+        connector.drop_hypo_indexes()
+        connector.close()
+
+    if "prepared" in res:
+        for config_name in configurations.keys():
+            plain, prepared = res["plain"][config_name], res["prepared"][config_name]
+            res[config_name] = {"speedup": plain["steady"]["mean_ms"] / prepared["steady"]["mean_ms"],
+                                "identical_costs": plain["costs"] == prepared["costs"]}
+            logging.info(f"Prepared queries ({config_name}): {res[config_name]['speedup']:.2f}x, "
+                         f"identical costs: {res[config_name]['identical_costs']}")
+
+    return res
+
+
+def _relevant_indexes_legacy(query, indexes, relevant_indexes_cache):
+    # The former `CostEvaluation._relevant_indexes` with its `(query, frozenset(indexes))` cache.
+    q_i_hash = (query, frozenset(indexes))
+    if q_i_hash not in relevant_indexes_cache:
+        relevant_indexes_cache[q_i_hash] = frozenset(
+            x for x in indexes if any(c in query.columns for c in x.columns))
+
+    return relevant_indexes_cache[q_i_hash]
+
+
+def _relevant_indexes_mask(query, indexes):
+    query_mask = query.column_mask
+    return frozenset(x for x in indexes if x.column_mask & query_mask)
+
+
+def bench_relevance_filter(args, workload):
+    """
+    Replay the relevance filtering of a long (SWIRL-like) run, i.e., every query
+    against `bench_configs` random configurations that rarely repeat,
+    with the former frozenset-keyed cache and with the column bitmasks.
+    No database is required.
+    :param args:
+    :param workload:
+    :return:
+    """
+    random.seed(args.seed)
+    candidates = workload.potential_indexes()
+    configurations = [random.sample(candidates, random.randint(1, min(len(candidates), args.max_indexes)))
+                      for _ in range(args.bench_configs)]
+
+    res = dict()
+    for mode in ["legacy", "mask"]:
+        relevant_indexes_cache = dict()
+        relevant_indexes = list()
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        for indexes in configurations:
+            for query in workload.queries:
+                if mode == "legacy":
+                    relevant_indexes.append(_relevant_indexes_legacy(query, indexes, relevant_indexes_cache))
+                else:
+                    relevant_indexes.append(_relevant_indexes_mask(query, indexes))
+        duration = time.perf_counter() - start_time
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        res[mode] = {"duration_s": duration, "peak_memory_mb": peak_memory / 1024 / 1024,
+                     "cache_entries": len(relevant_indexes_cache), "relevant_indexes": relevant_indexes}
+
+    res["identical"] = res["legacy"].pop("relevant_indexes") == res["mask"].pop("relevant_indexes")
+    res["speedup"] = res["legacy"]["duration_s"] / res["mask"]["duration_s"]
+    logging.info(f"Relevance filter: {res['speedup']:.2f}x, "
+                 f"peak memory {res['legacy']['peak_memory_mb']:.1f}MB -> {res['mask']['peak_memory_mb']:.1f}MB, "
+                 f"identical: {res['identical']}")
+
+    return res
+
+
+def bench_object_model(args, workload):
+    """
+    Replay the hashing / sorting pattern of the cost caches without a database:
+    per configuration, the set differences of `_prepare_cost_calculation`,
+    the `(query, relevant_indexes)` cache lookups and the sorting of the candidates.
+    Run it before and after a change of `index.py` / `workload.py` to compare.
+    :param args:
+    :param workload:
+    :return:
+    """
+    random.seed(args.seed)
+    indexable_columns = set(workload.indexable_columns())
+    candidates = workload.potential_indexes()
+    for index in workload.potential_indexes():
+        for column in index.table().columns:
+            if column in indexable_columns and column not in index.columns:
+                candidates.append(Index(index.columns + (column,)))
+    configurations = [random.sample(candidates, random.randint(1, min(len(candidates), args.max_indexes)))
+                      for _ in range(args.bench_configs)]
+
+    res = dict()
+    for _ in range(args.bench_repeat):
+        cache, current_indexes = dict(), set()
+
+        start_time = time.perf_counter()
+        for indexes in configurations:
+            current_indexes = (current_indexes - (current_indexes - set(indexes))) | set(indexes)
+            for query in workload.queries:
+                relevant_indexes = _relevant_indexes_mask(query, indexes)
+                if (query, relevant_indexes) not in cache:
+                    cache[(query, relevant_indexes)] = len(relevant_indexes)
+        cache_duration = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(100):
+            random.shuffle(candidates)
+            sorted(candidates)
+        sort_duration = time.perf_counter() - start_time
+
+        res.setdefault("cache_duration_s", list()).append(cache_duration)
+        res.setdefault("sort_duration_s", list()).append(sort_duration)
+
+    res = {key: float(np.median(value)) for key, value in res.items()}
+    res["candidates"] = len(candidates)
+    logging.info(f"Object model: cache {res['cache_duration_s']:.3f}s, sort {res['sort_duration_s']:.3f}s.")
+
+    return res
+
+
+def bench_index_relations(args, workload):
+    """
+    Replay the index transformations of Relaxation / DB2Advis / Anytime without a database:
+    the subsumption test of every candidate pair (`DB2AdvisAlgorithm._combine_subsumed()`) and
+    `bench_repeat` rounds of the prefixes and the merges / splits of every same-table pair,
+    with the `Index` methods and with the memoized `IndexRelations`.
+    The candidates are the column permutations (up to `max_index_width`, at least 3 columns)
+    of the workload, at most `bench_candidates` of them.
+    :param args:
+    :param workload:
+    :return:
+    """
+    random.seed(args.seed)
+    max_index_width = max(args.max_index_width or 3, 3)
+    columns_per_table = dict()
+    for column in workload.indexable_columns():
+        columns_per_table.setdefault(column.table, list()).append(column)
+    candidates = list()
+    for width in range(1, max_index_width + 1):
+        for table_columns in columns_per_table.values():
+            candidates.extend(Index(columns) for columns in itertools.permutations(table_columns, width))
+    candidates = sorted(random.sample(candidates, min(len(candidates), args.bench_candidates)))
+    candidate_set = set(candidates)
+    candidates_per_table = dict()
+    for index in candidates:
+        candidates_per_table.setdefault(index.table(), list()).append(index)
+
+    res = dict()
+    for mode in ["index", "relations"]:
+        index_relations = IndexRelations()
+        index_relations.add(candidates)
+
+        start_time = time.perf_counter()
+        subsumed = list()
+        for index_1 in candidates:
+            if mode == "index":
+                subsumed.append(sum(index_1.subsumes(index_2) for index_2 in candidates))
+            else:
+                subsumed.append(1 + sum(1 for prefix in index_relations.prefixes(index_1) if prefix in candidate_set))
+        subsumption_duration = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        transformed = list()
+        for _ in range(args.bench_repeat):
+            transformed = list()
+            for table_candidates in candidates_per_table.values():
+                for index_1 in table_candidates:
+                    if mode == "index":
+                        transformed.append(tuple(index_1.prefixes()))
+                    else:
+                        transformed.append(tuple(index_relations.prefixes(index_1)))
+                for index_1, index_2 in itertools.permutations(table_candidates, 2):
+                    if mode == "index":
+                        merged_index = index_merge(index_1, index_2)
+                        if len(merged_index.columns) > max_index_width:
+                            merged_index = Index(merged_index.columns[:max_index_width])
+                        transformed.append((merged_index, index_split(index_1, index_2)))
+                    else:
+                        transformed.append((index_relations.merge(index_1, index_2, max_index_width),
+                                            index_relations.split(index_1, index_2)))
+        transformation_duration = time.perf_counter() - start_time
+
+        res[mode] = {"subsumption_duration_s": subsumption_duration,
+                     "transformation_duration_s": transformation_duration,
+                     "subsumed": subsumed, "transformed": transformed}
+
+    res["identical"] = res["index"].pop("subsumed") == res["relations"].pop("subsumed") \
+                       and res["index"].pop("transformed") == res["relations"].pop("transformed")
+    res["candidates"] = len(candidates)
+    res["subsumption_speedup"] = res["index"]["subsumption_duration_s"] / res["relations"]["subsumption_duration_s"]
+    res["transformation_speedup"] = res["index"]["transformation_duration_s"] \
+                                    / res["relations"]["transformation_duration_s"]
+    logging.info(f"Index relations ({len(candidates)} candidates): subsumption {res['subsumption_speedup']:.2f}x, "
+                 f"transformations {res['transformation_speedup']:.2f}x, identical: {res['identical']}")
+
+    return res
+
+
+def bench_lazy_greedy(args, workload):
+    """
+    Compare the exact and the lazy-greedy (CELF) evaluation of Extend:
+    the configurations evaluated, the what-if calls and the selected indexes.
+    :param args:
+    :param workload:
+    :return:
+    """
+    res = dict()
+    for mode in ["exact", "lazy"]:
+        connector = get_connector(args)
+        connector.drop_hypo_indexes()
+
+        parameters = {"budget_MB": args.budget_MB, "max_indexes": args.max_indexes, "constraint": args.constraint,
+                      "lazy_greedy": mode == "lazy"}
+        if args.max_index_width is not None:
+            parameters["max_index_width"] = args.max_index_width
+        algorithm = ExtendAlgorithm(connector, parameters)
+
+        indexes, sel_info = algorithm.calculate_best_indexes(workload, overhead=True)
+        final_cost = sum(connector.get_ind_costs([query.text for query in workload.queries],
+                                                 [f"{index.table()}#{index.joined_column_names()}"
+                                                  for index in indexes]))
+        res[mode] = {"indexes": sorted(str(index) for index in indexes), "final_cost": final_cost,
+                     "cost_requests": sel_info["cost_requests"], "estimation_num": sel_info["estimation_num"],
+                     "time_duration": sel_info["time_duration"]}
+        connector.close()
+
+    res["identical"] = res["exact"]["indexes"] == res["lazy"]["indexes"]
+    res["estimation_reduction"] = 1 - res["lazy"]["estimation_num"] / max(res["exact"]["estimation_num"], 1)
+    res["cost_deviation"] = res["lazy"]["final_cost"] / res["exact"]["final_cost"] - 1
+    logging.info(f"Lazy greedy: {res['estimation_reduction'] * 100:.1f}% fewer what-if calls, "
+                 f"cost deviation {res['cost_deviation'] * 100:.2f}%, identical: {res['identical']}")
+
+    return res
+
+
+def bench_incremental_drop(args, workload):
+    """
+    Compare the full and the incremental (utilization-tracked) re-costing of Drop:
+    the what-if calls, the duration and the selected indexes.
+    :param args:
+    :param workload:
+    :return:
+    """
+    res = dict()
+    for mode in ["full", "incremental"]:
+        connector = get_connector(args)
+        connector.drop_hypo_indexes()
+
+        parameters = {"budget_MB": args.budget_MB, "max_indexes": args.max_indexes, "constraint": args.constraint,
+                      "multi_column": args.multi_column, "incremental": mode == "incremental"}
+        if args.max_index_width is not None:
+            parameters["max_index_width"] = args.max_index_width
+        algorithm = DropAlgorithm(connector, parameters, cand_gen=args.cand_gen, is_utilized=args.is_utilized)
+
+        indexes, sel_info = algorithm.calculate_best_indexes(workload, overhead=True)
+        final_cost = sum(connector.get_ind_costs([query.text for query in workload.queries],
+                                                 [f"{index.table()}#{index.joined_column_names()}"
+                                                  for index in indexes]))
+        res[mode] = {"indexes": sorted(str(index) for index in indexes), "final_cost": final_cost,
+                     "cost_requests": sel_info["cost_requests"], "estimation_num": sel_info["estimation_num"],
+                     "time_duration": sel_info["time_duration"]}
+        connector.close()
+
+    res["identical"] = res["full"]["indexes"] == res["incremental"]["indexes"]
+    res["estimation_reduction"] = 1 - res["incremental"]["estimation_num"] / max(res["full"]["estimation_num"], 1)
+    logging.info(f"Incremental drop: {res['estimation_reduction'] * 100:.1f}% fewer what-if calls, "
+                 f"identical: {res['identical']}")
+
+    return res
+
+
+def bench_parallel_seeds(args, workload):
+    """
+    The quality of Anytime as a function of the processes exploring the seeds,
+    at the fixed time budget of `bench_runtime_minutes`.
+    :param args:
+    :param workload:
+    :return:
+    """
+    res = dict()
+    for cores in map(int, args.bench_cores.split(",")):
+        connector = get_connector(args)
+        connector.drop_hypo_indexes()
+
+        parameters = {"budget_MB": args.budget_MB, "max_indexes": args.max_indexes, "constraint": args.constraint,
+                      "max_runtime_minutes": args.bench_runtime_minutes, "parallel_seeds": cores}
+        if args.max_index_width is not None:
+            parameters["max_index_width"] = args.max_index_width
+        algorithm = AnytimeAlgorithm(connector, parameters)
+
+        indexes, sel_info = algorithm.calculate_best_indexes(workload, overhead=True)
+        final_cost = sum(connector.get_ind_costs([query.text for query in workload.queries],
+                                                 [f"{index.table()}#{index.joined_column_names()}"
+                                                  for index in indexes]))
+        res[cores] = {"indexes": sorted(str(index) for index in indexes), "final_cost": final_cost,
+                      "abandoned_seeds": algorithm.abandoned_seeds, "estimation_num": sel_info["estimation_num"],
+                      "time_duration": sel_info["time_duration"]}
+        connector.close()
+
+        logging.info(f"Parallel seeds ({cores} processes): final cost {final_cost:,.2f}, "
+                     f"{sel_info['estimation_num']} what-if calls in {sel_info['time_duration']:.1f}s.")
+
+    return res
+
+
+def _record_replay_run(connector, args, workload):
+    """
+    The what-if answers the cost evaluation of a run depends on: the selection of Extend
+    (with the utilization inference) and of Drop (incremental), the evaluation of `heu_run`
+    (the cost-only answers of `get_ind_costs()`), the utilized indexes and the plans of the selected configuration.
+    :param connector:
+    :param args:
+    :param workload:
+    :return:
+    """
+    query_texts = [query.text for query in workload.queries]
+
+    res = dict()
+    for algorithm_class, parameters in [(ExtendAlgorithm, {"utilization_inference": True}),
+                                        (DropAlgorithm, {"multi_column": args.multi_column, "incremental": True})]:
+        connector.drop_hypo_indexes()
+
+        parameters = {"budget_MB": args.budget_MB, "max_indexes": args.max_indexes,
+                      "constraint": args.constraint, **parameters}
+        if args.max_index_width is not None:
+            parameters["max_index_width"] = args.max_index_width
+        algorithm = algorithm_class(connector, parameters)
+
+        indexes = algorithm.calculate_best_indexes(workload)
+        index_definitions = [f"{index.table()}#{index.joined_column_names()}" for index in indexes]
+        no_costs = connector.get_ind_costs(query_texts, "")
+        ind_costs = connector.get_ind_costs(query_texts, index_definitions)
+
+        cost_evaluation = CostEvaluation(connector)
+        utilization = cost_evaluation.utilized_indexes_and_costs(workload, indexes)
+        cost_evaluation.complete_cost_estimation()
+        # The hypopg oids differ between the sessions.
+        plans = [re.sub(r"<\d+>btree_\w*", "<hypo>",
+                        json.dumps(connector.get_ind_plan(query_text, index_definitions), sort_keys=True))
+                 for query_text in query_texts]
+
+        res[algorithm_class.__name__] = {
+            "indexes": sorted(str(index) for index in indexes), "no_costs": no_costs, "ind_costs": ind_costs,
+            "utilized_indexes": [sorted(str(index) for index in utilization[query][0]) for query in workload.queries],
+            "costs": [utilization[query][1] for query in workload.queries], "plans": plans}
+
+    return res
+
+
+def bench_record_replay(args, workload):
+    """
+    Record the what-if answers of a live run (into `whatif_record` or a temporary file) and replay them:
+    the replayed run has to reproduce the selected indexes, the costs, the utilized indexes and the plans.
+    :param args:
+    :param workload:
+    :return:
+    """
+    db_conf = configparser.ConfigParser()
+    db_conf.read(args.db_conf_file)
+    recording_file = args.whatif_record
+    if recording_file is None:
+        recording_file = os.path.join(tempfile.mkdtemp(), "whatif_recording.pkl.gz")
+
+    connector = create_whatif_connector(PostgresDatabaseConnector, db_conf, whatif_record=recording_file,
+                                        autocommit=True, host=args.host, port=args.port,
+                                        db_name=args.db_name, user=args.user, password=args.password)
+    live = _record_replay_run(connector, args, workload)
+    save_whatif_recording(connector)
+    connector.close()
+
+    connector = create_whatif_connector(PostgresDatabaseConnector, db_conf, whatif_replay=recording_file)
+    replay = _record_replay_run(connector, args, workload)
+    connector.close()
+
+    mismatches = [f"{algorithm}.{key}" for algorithm in live for key in live[algorithm]
+                  if live[algorithm][key] != replay[algorithm][key]]
+    res = {"live": live, "replay": replay, "mismatches": mismatches, "identical": len(mismatches) == 0,
+           "replay_misses": connector.recording.misses}
+    logging.info(f"Record / replay: identical: {res['identical']}, mismatches: {mismatches}.")
+
+    return res
+
+
+BENCHMARKS = {
+    "prepared_queries": bench_prepared_queries,
+    "relevance_filter": bench_relevance_filter,
+    "object_model": bench_object_model,
+    "index_relations": bench_index_relations,
+    "lazy_greedy": bench_lazy_greedy,
+    "incremental_drop": bench_incremental_drop,
+    "parallel_seeds": bench_parallel_seeds,
+    "record_replay": bench_record_replay
+}
+
+if __name__ == "__main__":
+    parser = get_bench_parser()
+    args = parser.parse_args()
+
+    if args.work_file.endswith(".sql"):
+        with open(args.work_file, "r") as rf:
+            work_list = rf.readlines()
+    elif args.work_file.endswith(".json"):
+        with open(args.work_file, "r") as rf:
+            work_list = json.load(rf)
+
+    workload = get_workload(args, work_list)
+    data = BENCHMARKS[args.bench](args, workload)
+
+    if args.res_save is not None:
+        with open(args.res_save, "w") as wf:
+            json.dump(data, wf, indent=2)
@@ -4,6 +4,7 @@
 # @Author: Wei Zhou
 # @Time: 2023/8/16 14:42
 
+import os
 import json
 import configparser
 from tqdm import tqdm
@@ -13,6 +14,9 @@ from index_advisor_selector.index_selection.heu_selection.heu_utils.index import
 from index_advisor_selector.index_selection.heu_selection.heu_utils.workload import Workload
 from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import get_parser
 from index_advisor_selector.index_selection.heu_selection.heu_utils.postgres_dbms import PostgresDatabaseConnector
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import create_whatif_connector, \
+    save_whatif_recording
+from index_advisor_selector.index_selection.heu_selection.heu_utils.what_if_session_pool import WhatIfSessionPool
 
 from index_advisor_selector.index_selection.heu_selection.heu_algos.auto_admin_algorithm import AutoAdminAlgorithm
 from index_advisor_selector.index_selection.heu_selection.heu_algos.db2advis_algorithm import DB2AdvisAlgorithm, IndexBenefit
@@ -32,6 +36,9 @@ ALGORITHMS = {
     "cophy": CoPhyAlgorithm
 }
 
+# : newly added. the algorithms repairing the previous recommendation, see `--warm_start_file`.
+WARM_START_ALGORITHMS = ["db2advis", "drop", "extend", "relaxation"]
+
 
 class IndexEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -67,8 +74,37 @@ def get_heu_result(args, algos, work_list):
 
     _, columns = heu_com.get_columns_from_schema(args.schema_file)
 
-    connector = PostgresDatabaseConnector(db_conf, autocommit=True, host=args.host, port=args.port,
-                                          db_name=args.db_name, user=args.user, password=args.password)
+    # : newly modified. for the what-if record / replay.
+    connector = create_whatif_connector(PostgresDatabaseConnector, db_conf,
+                                        whatif_record=getattr(args, "whatif_record", None),
+                                        whatif_replay=getattr(args, "whatif_replay", None),
+                                        autocommit=True, host=args.host, port=args.port,
+                                        db_name=args.db_name, user=args.user, password=args.password)
+    # : newly added. PREPARE the queries once and cost them with `EXPLAIN EXECUTE`.
+    if "prepared_queries" in args and args.prepared_queries:
+        connector.enable_prepared_queries()
+
+    # : newly added. for the cost evaluation shared across the algorithms / configurations
+    # (the same workload objects are required, the cache is keyed by the query objects).
+    share_cost_cache = "share_cost_cache" in args and args.share_cost_cache
+    shared_cost_evaluation, shared_workload = None, None
+    # `get_ind_cost()` resets the hypothetical indexes of its session,
+    # the selected indexes are therefore evaluated in another session.
+    eval_connector = WhatIfSessionPool.clone_connector(connector) if share_cost_cache else connector
+
+    # : newly added. for the batched evaluation of the selected indexes (optionally over several sessions).
+    # The costs of the empty / a selected configuration are computed once per run,
+    # {query text: cost} and {frozenset(indexes): {query text: cost}}.
+    eval_pool = None
+    if "parallel_sessions" in args and args.parallel_sessions is not None and args.parallel_sessions > 1:
+        eval_pool = WhatIfSessionPool(eval_connector, args.parallel_sessions)
+    evaluator = eval_pool if eval_pool is not None else eval_connector
+    baseline_costs, configuration_costs = dict(), dict()
+
+    # : newly added. for the multi-budget sweep.
+    sweep_budgets = None
+    if "sweep_budgets" in args and args.sweep_budgets is not None:
+        sweep_budgets = [float(budget) for budget in args.sweep_budgets.split(",")]
 
     res_data = dict()
     for algo in tqdm(algos):
@@ -81,12 +117,19 @@ def get_heu_result(args, algos, work_list):
         configs = heu_com.find_parameter_list(exp_config["algorithms"][0],
                                                 params=args.sel_params)
         # (0824): newly modified.
-        workload = Workload(heu_com.read_row_query(work_list, exp_config, columns, type="",
-                                                     varying_frequencies=args.varying_frequencies, seed=args.seed))
+        if shared_workload is not None:
+            workload = shared_workload
+        else:
+            workload = Workload(heu_com.read_row_query(work_list, exp_config, columns, type="",
+                                                         varying_frequencies=args.varying_frequencies, seed=args.seed))
+            if share_cost_cache:
+                shared_workload = workload
 
         data = list()
         for config in tqdm(configs):
-            connector.drop_hypo_indexes()
+            # : newly modified. the simulated indexes of the shared cost evaluation are kept.
+            if not share_cost_cache:
+                connector.drop_hypo_indexes()
 
             # (0818): newly added.
             if args.constraint is not None:
@@ -104,88 +147,189 @@ def get_heu_result(args, algos, work_list):
             if algo == "drop" and "multi_column" in args:
                 config["parameters"]["multi_column"] = args.multi_column
 
+            # : newly added. for the cross-run (disk-backed) cost cache.
+            if "cost_cache_file" in args and args.cost_cache_file is not None:
+                config["parameters"]["cost_cache_file"] = args.cost_cache_file
+                config["parameters"]["cost_cache_max_entries"] = args.cost_cache_max_entries
+            # : newly added. for the parallel cost estimation over several what-if sessions.
+            if "parallel_sessions" in args and args.parallel_sessions is not None:
+                config["parameters"]["parallel_sessions"] = args.parallel_sessions
+                # : newly added. for the parallel candidate scoring.
+                config["parameters"]["parallel_scoring"] = "parallel_scoring" in args and args.parallel_scoring
+            # : newly added. for the utilization-aware cost inference.
+            if "utilization_inference" in args and args.utilization_inference:
+                config["parameters"]["utilization_inference"] = True
+            # : newly added. for the atomic-configuration cost derivation.
+            if "cost_derivation" in args and args.cost_derivation:
+                config["parameters"]["cost_derivation"] = True
+                config["parameters"]["derivation_max_atomic"] = args.derivation_max_atomic
+                config["parameters"]["derivation_validation"] = args.derivation_validation
+
+            # : newly added. for the lazy-greedy (CELF) evaluation of Extend.
+            if algo == "extend" and "lazy_greedy" in args and args.lazy_greedy:
+                config["parameters"]["lazy_greedy"] = True
+            # : newly added. for the incremental cost maintenance of Drop.
+            if algo == "drop" and "incremental_drop" in args and args.incremental_drop:
+                config["parameters"]["incremental"] = True
+            # : newly added. for the enumeration over the cost matrix (AutoAdmin, Relaxation and CoPhy).
+            if "cost_matrix" in args and args.cost_matrix:
+                config["parameters"]["cost_matrix"] = True
+                config["parameters"]["matrix_max_atoms"] = args.matrix_max_atoms
+            # : newly added. for the analytic index size estimation.
+            if "analytic_size" in args and args.analytic_size:
+                config["parameters"]["analytic_size"] = True
+                config["parameters"]["size_validation_samples"] = args.size_validation_samples
+            # : newly added. for the benefit upper-bound candidate pruning (`permutation_bound`).
+            if "bound_fraction" in args and args.bound_fraction is not None:
+                config["parameters"]["bound_fraction"] = args.bound_fraction
+            # : newly added. for the workload compression ahead of the selection.
+            if "compression_max_loss" in args and args.compression_max_loss is not None:
+                config["parameters"]["compression_max_loss"] = args.compression_max_loss
+            # : newly added. for the process-parallel exploration of the seeds of Anytime.
+            if algo == "anytime" and "parallel_seeds" in args and args.parallel_seeds is not None:
+                config["parameters"]["parallel_seeds"] = args.parallel_seeds
+
             # (1211): newly added. for `cophy`
             if algo == "cophy":
                 config["parameters"]["ampl_bin_path"] = args.ampl_bin_path
                 config["parameters"]["ampl_mod_path"] = args.ampl_mod_path
                 config["parameters"]["ampl_dat_path"] = args.ampl_dat_path
                 config["parameters"]["ampl_solver"] = args.ampl_solver
+                # : newly added. for the in-process MILP solver.
+                if "cophy_solver" in args:
+                    config["parameters"]["solver"] = args.cophy_solver
+                    config["parameters"]["solver_time_limit"] = args.solver_time_limit
+                    config["parameters"]["solver_mip_gap"] = args.solver_mip_gap
+
+            # : newly added. for the warm start from the recommendation (and the costs) of the previous run.
+            warm_start, warm_start_file = None, None
+            if "warm_start_file" in args and args.warm_start_file is not None and algo in WARM_START_ALGORITHMS:
+                warm_start_file = args.warm_start_file.format(algo)
+                if os.path.exists(warm_start_file):
+                    with open(warm_start_file, "r") as rf:
+                        warm_start = json.load(rf)
 
             algorithm = ALGORITHMS[algo](connector, config["parameters"], args.process,
                                          args.cand_gen, args.is_utilized, args.sel_oracle)
+            # : newly added. for the cost evaluation shared across the algorithms / configurations.
+            if share_cost_cache:
+                if shared_cost_evaluation is None:
+                    shared_cost_evaluation = algorithm.cost_evaluation
+                algorithm.share_cost_evaluation(shared_cost_evaluation)
 
             # return algorithm.get_index_candidates(workload, db_conf=db_conf, columns=columns)
 
-            if not args.process and not args.overhead:
+            if sweep_budgets is not None:
+                # : newly added. for the multi-budget sweep, one entry per budget.
+                selections = [({**config["parameters"], "budget_MB": result["budget_MB"]}, result["indexes"],
+                               {"cost": result["cost"], "time_duration": result["time_duration"],
+                                "rerun": result["rerun"]})
+                              for result in algorithm.calculate_best_indexes_sweep(workload, sweep_budgets,
+                                                                                   db_conf=db_conf,
+                                                                                   columns=columns)]
+            elif not args.process and not args.overhead:
                 sel_info = ""
                 indexes = algorithm.calculate_best_indexes(workload, overhead=args.overhead,
-                                                           db_conf=db_conf, columns=columns)
+                                                           db_conf=db_conf, columns=columns,
+                                                           warm_start=warm_start)
+                selections = [(config["parameters"], indexes, sel_info)]
             else:
                 indexes, sel_info = algorithm.calculate_best_indexes(workload, overhead=args.overhead,
-                                                                     db_conf=db_conf, columns=columns)
-
-            indexes = [str(ind) for ind in indexes]
-            cols = [ind.split(",") for ind in indexes]
-            cols = [list(map(lambda x: x.split(".")[-1], col)) for col in cols]
-            indexes = [f"{ind.split('.')[0]}#{','.join(col)}" for ind, col in zip(indexes, cols)]
-
-            no_cost, ind_cost = list(), list()
-            total_no_cost, total_ind_cost = 0, 0
-
-            # # (0916): newly added.
-            # freq_list = [1 for _ in work_list]
-            # if isinstance(work_list[0], list):
-            #     work_list = [item[1] for item in work_list]
-            #     if args.varying_frequencies:
-            #         freq_list = [item[-1] for item in work_list]
-            #
-            # # (0916): newly modified.
-            # for sql, freq in zip(work_list, freq_list):
-            #     no_cost_ = connector.get_ind_cost(sql, "") * freq
-            #     total_no_cost += no_cost_
-            #     no_cost.append(no_cost_)
-            #
-            #     ind_cost_ = connector.get_ind_cost(sql, indexes) * freq
-            #     total_ind_cost += ind_cost_
-            #     ind_cost.append(ind_cost_)
-
-            # (0916): newly modified.
-            freq_list = list()
-            for query in workload.queries:
-                no_cost_ = connector.get_ind_cost(query.text, "") * query.frequency
-                total_no_cost += no_cost_
-                no_cost.append(no_cost_)
-
-                ind_cost_ = connector.get_ind_cost(query.text, indexes) * query.frequency
-                total_ind_cost += ind_cost_
-                ind_cost.append(ind_cost_)
-
-                freq_list.append(query.frequency)
-
-            # (0916): newly added.
-            if args.varying_frequencies:
-                data.append({"config": config["parameters"],
-                             "workload": [work_list, freq_list],
-                             "indexes": indexes,
-                             "no_cost": no_cost,
-                             "total_no_cost": total_no_cost,
-                             "ind_cost": ind_cost,
-                             "total_ind_cost": total_ind_cost,
-                             "sel_info": sel_info})
-            else:
-                data.append({"config": config["parameters"],
-                             "workload": work_list,
-                             "indexes": indexes,
-                             "no_cost": no_cost,
-                             "total_no_cost": total_no_cost,
-                             "ind_cost": ind_cost,
-                             "total_ind_cost": total_ind_cost,
-                             "sel_info": sel_info})
+                                                                     db_conf=db_conf, columns=columns,
+                                                                     warm_start=warm_start)
+                selections = [(config["parameters"], indexes, sel_info)]
+
+            # : newly added. the snapshot to warm-start the next run from.
+            if warm_start_file is not None and sweep_budgets is None:
+                with open(warm_start_file, "w") as wf:
+                    json.dump(algorithm.warm_start_snapshot(indexes), wf)
+
+            for parameters, indexes, sel_info in selections:
+                indexes = [str(ind) for ind in indexes]
+                cols = [ind.split(",") for ind in indexes]
+                cols = [list(map(lambda x: x.split(".")[-1], col)) for col in cols]
+                indexes = [f"{ind.split('.')[0]}#{','.join(col)}" for ind, col in zip(indexes, cols)]
+
+                no_cost, ind_cost = list(), list()
+                total_no_cost, total_ind_cost = 0, 0
+
+                # # (0916): newly added.
+                # freq_list = [1 for _ in work_list]
+                # if isinstance(work_list[0], list):
+                #     work_list = [item[1] for item in work_list]
+                #     if args.varying_frequencies:
+                #         freq_list = [item[-1] for item in work_list]
+                #
+                # # (0916): newly modified.
+                # for sql, freq in zip(work_list, freq_list):
+                #     no_cost_ = connector.get_ind_cost(sql, "") * freq
+                #     total_no_cost += no_cost_
+                #     no_cost.append(no_cost_)
+                #
+                #     ind_cost_ = connector.get_ind_cost(sql, indexes) * freq
+                #     total_ind_cost += ind_cost_
+                #     ind_cost.append(ind_cost_)
+
+                # : newly modified. batched, the costs are only computed once per configuration.
+                query_texts = [query.text for query in workload.queries]
+                missing_texts = [text for text in query_texts if text not in baseline_costs]
+                if len(missing_texts) != 0:
+                    baseline_costs.update(zip(missing_texts, evaluator.get_ind_costs(missing_texts, "")))
+                if frozenset(indexes) not in configuration_costs:
+                    configuration_costs[frozenset(indexes)] = dict()
+                selected_costs = configuration_costs[frozenset(indexes)]
+                missing_texts = [text for text in query_texts if text not in selected_costs]
+                if len(missing_texts) != 0:
+                    selected_costs.update(zip(missing_texts, evaluator.get_ind_costs(missing_texts, indexes)))
+
+                # (0916): newly modified.
+                freq_list = list()
+                for query in workload.queries:
+                    no_cost_ = baseline_costs[query.text] * query.frequency
+                    total_no_cost += no_cost_
+                    no_cost.append(no_cost_)
+
+                    ind_cost_ = selected_costs[query.text] * query.frequency
+                    total_ind_cost += ind_cost_
+                    ind_cost.append(ind_cost_)
+
+                    freq_list.append(query.frequency)
+
+                # (0916): newly added.
+                if args.varying_frequencies:
+                    data.append({"config": parameters,
+                                 "workload": [work_list, freq_list],
+                                 "indexes": indexes,
+                                 "no_cost": no_cost,
+                                 "total_no_cost": total_no_cost,
+                                 "ind_cost": ind_cost,
+                                 "total_ind_cost": total_ind_cost,
+                                 "sel_info": sel_info})
+                else:
+                    data.append({"config": parameters,
+                                 "workload": work_list,
+                                 "indexes": indexes,
+                                 "no_cost": no_cost,
+                                 "total_no_cost": total_no_cost,
+                                 "ind_cost": ind_cost,
+                                 "total_ind_cost": total_ind_cost,
+                                 "sel_info": sel_info})
 
         if len(data) == 1:
             data = data[0]
 
         res_data[algo] = data
+
+    if shared_cost_evaluation is not None:
+        shared_cost_evaluation.complete_cost_estimation()
+    if eval_pool is not None:
+        eval_pool.close()
+    if eval_connector is not connector:
+        eval_connector.close()
+
+    # : newly added. for the what-if record / replay.
+    save_whatif_recording(connector)
+
     return res_data
 
 
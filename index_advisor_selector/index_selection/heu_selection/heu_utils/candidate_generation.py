@@ -6,6 +6,7 @@ import itertools
 import logging
 
 from .index import Index
+from .workload import Workload
 from .postgres_dbms import PostgresDatabaseConnector
 
 import index_advisor_selector.index_selection.dqn_selection.dqn_utils.Encoding as en
@@ -48,6 +49,44 @@ def syntactically_relevant_indexes(query, max_index_width):
     return sorted([Index(p) for p in possible_column_combinations])
 
 
+# : newly added. for the benefit upper-bound candidate pruning (`permutation_bound`).
+def prune_candidates_by_benefit_bound(workload, candidates, cost_evaluation, min_bound_fraction=0.1):
+    """
+    Cost every query once per table with all its candidates on the table simulated at the same time.
+    Adding indexes does not increase the what-if cost, hence the cost reduction observed is
+    an (optimistic) upper bound of the benefit of every single candidate on the table for the query.
+    The bound of a candidate sums them up over the queries it was generated for,
+    the candidates whose bound is below `min_bound_fraction` of the best bound are discarded.
+    :param workload:
+    :param candidates: [[index]] per query, see `candidates_per_query()`.
+    :param cost_evaluation:
+    :param min_bound_fraction:
+    :return: [[index]] per query.
+    """
+    bounds = dict()
+    for query, query_candidates in zip(workload.queries, candidates):
+        candidates_per_table = dict()
+        for index in query_candidates:
+            candidates_per_table.setdefault(index.columns[0].table, list()).append(index)
+        if len(candidates_per_table) == 0:
+            continue
+
+        cost_without_indexes = cost_evaluation.calculate_cost(Workload([query]), [])
+        for table_candidates in candidates_per_table.values():
+            cost = cost_evaluation.calculate_cost(Workload([query]), table_candidates, store_size=True)
+            for index in table_candidates:
+                bounds[index] = bounds.get(index, 0) + max(cost_without_indexes - cost, 0)
+
+    best_bound = max(bounds.values(), default=0)
+    pruned_candidates = [[index for index in query_candidates
+                          if bounds[index] > 0 and bounds[index] >= min_bound_fraction * best_bound]
+                         for query_candidates in candidates]
+    logging.info(f"Prune the candidates by the benefit bound: {len(bounds)} -> "
+                 f"{len(set(itertools.chain.from_iterable(pruned_candidates)))}.")
+
+    return pruned_candidates
+
+
 # (0917): newly added. index candidates generation rules by `DQN`.
 def syntactically_relevant_indexes_dqn_rule(db_conf, query_texts, columns, max_index_width):
     result_column_combinations = list()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: cost_cache
+# @Author: Wei Zhou
+# @Time: 2024/1/8 10:21
+
+import sys
+import json
+import zlib
+import time
+import sqlite3
+import hashlib
+import logging
+
+from collections import OrderedDict
+
+# Planner-relevant state that makes a cached what-if cost stale:
+# the size estimates of every relation (pg_class), the column statistics
+# collected by ANALYZE (pg_stats) and the planner GUCs (cost constants,
+# enable_* switches, join collapse limits, ...).
+STATS_FINGERPRINT_QUERIES = [
+    "select n.nspname, c.relname, c.relkind, c.relpages, c.reltuples "
+    "from pg_class c join pg_namespace n on n.oid = c.relnamespace "
+    "where c.relkind in ('r', 'i', 'm', 'p') "
+    "and n.nspname not in ('pg_catalog', 'information_schema') "
+    "and n.nspname not like 'pg_toast%' "
+    "order by n.nspname, c.relname",
+    "select md5(string_agg(concat_ws('|', schemaname, tablename, attname, null_frac, avg_width, "
+    "n_distinct, correlation, most_common_vals::text, most_common_freqs::text, histogram_bounds::text), "
+    "',' order by schemaname, tablename, attname)) "
+    "from pg_stats where schemaname not in ('pg_catalog', 'information_schema')",
+    "select name, setting from pg_settings "
+    "where category like 'Query Tuning%' or name = 'server_version_num' "
+    "order by name"
+]
+
+
+def normalize_query_text(query_text):
+    """
+    Collapse the whitespace and the trailing semicolon of a query,
+    so that the same statement read from different files shares one cache key.
+    :param query_text:
+    :return:
+    """
+    return " ".join(query_text.split()).rstrip(";").strip()
+
+
+def get_stats_fingerprint(db_connector):
+    """
+    Hash the planner-relevant database state (see `STATS_FINGERPRINT_QUERIES`).
+    Only `exec_fetch` is used, so that every copy of the `DatabaseConnector` is supported.
+    :param db_connector:
+    :return:
+    """
+    digest = hashlib.sha1()
+    for statement in STATS_FINGERPRINT_QUERIES:
+        digest.update(repr(db_connector.exec_fetch(statement, one=False)).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class PersistentCostCache:
+    """
+    A disk-backed (SQLite) what-if cost/plan cache shared across runs, algorithms and processes.
+
+    Entries are keyed by the normalized query text, the relevant (hypothetical) index set
+    and the fingerprint of the database statistics, so that the costs are
+    invalidated automatically once the data, the statistics or the planner settings change.
+    The number of entries is bounded by `max_entries`, the least recently used ones are evicted first.
+    The entries of other fingerprints (e.g., of other databases sharing the cache file) are kept,
+    they are reclaimed by the eviction once they are not used anymore.
+    """
+
+    def __init__(self, db_connector, cache_file, max_entries=1000000,
+                 drop_stale=False, commit_interval=500):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.commit_interval = commit_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pending = 0
+        # {key: last_used} of the hits, written in `commit()`.
+        self._touched = dict()
+
+        self.fingerprint = get_stats_fingerprint(db_connector)
+
+        self.conn = sqlite3.connect(cache_file, timeout=60)
+        self.conn.execute("create table if not exists what_if_cost ("
+                          "key text primary key, "
+                          "fingerprint text not null, "
+                          "cost real not null, "
+                          "plan text, "
+                          "last_used real not null)")
+        self.conn.execute("create index if not exists what_if_cost_fingerprint "
+                          "on what_if_cost (fingerprint)")
+        self.conn.execute("create index if not exists what_if_cost_last_used "
+                          "on what_if_cost (last_used)")
+        self.conn.commit()
+
+        if drop_stale:
+            self.invalidate()
+
+    def _key(self, query_text, indexes):
+        index_string = ";".join(sorted(str(index) for index in indexes))
+        key_string = f"{self.fingerprint}\n{normalize_query_text(query_text)}\n{index_string}"
+
+        return hashlib.sha1(key_string.encode("utf-8")).hexdigest()
+
+    def get(self, query_text, indexes, with_plan=False):
+        """
+        :param query_text:
+        :param indexes: the relevant indexes of the query.
+        :param with_plan: return `(cost, plan)` instead of `cost`.
+        :return: None if the entry does not exist (or its plan is not stored).
+        """
+        key = self._key(query_text, indexes)
+        row = self.conn.execute("select cost, plan from what_if_cost where key = ?", (key,)).fetchone()
+        if row is None or (with_plan and row[1] is None):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time()
+
+        if with_plan:
+            return row[0], json.loads(row[1])
+        return row[0]
+
+    def put(self, query_text, indexes, cost, plan=None):
+        key = self._key(query_text, indexes)
+        plan = None if plan is None else json.dumps(plan)
+        self.conn.execute("insert or replace into what_if_cost "
+                          "(key, fingerprint, cost, plan, last_used) values (?, ?, ?, ?, ?)",
+                          (key, self.fingerprint, cost, plan, time.time()))
+        self._maybe_commit()
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        if len(self._touched) != 0:
+            self.conn.executemany("update what_if_cost set last_used = ? where key = ?",
+                                  [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched = dict()
+        self.evict()
+        self.conn.commit()
+        self._pending = 0
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond `max_entries`.
+        :return: the number of evicted entries.
+        """
+        if self.max_entries is None:
+            return 0
+
+        size = self.conn.execute("select count(*) from what_if_cost").fetchone()[0]
+        if size <= self.max_entries:
+            return 0
+
+        evicted = size - self.max_entries
+        self.conn.execute("delete from what_if_cost where key in "
+                          "(select key from what_if_cost order by last_used limit ?)", (evicted,))
+        self.evictions += evicted
+        logging.info(f"Evict {evicted} entries from the persistent cost cache `{self.cache_file}`.")
+
+        return evicted
+
+    def invalidate(self, everything=False):
+        """
+        Drop the entries that were collected under other database statistics
+        (or all the entries if `everything` is set).
+        :param everything:
+        :return: the number of deleted entries.
+        """
+        if everything:
+            cursor = self.conn.execute("delete from what_if_cost")
+        else:
+            cursor = self.conn.execute("delete from what_if_cost where fingerprint != ?", (self.fingerprint,))
+        self.conn.commit()
+
+        if cursor.rowcount > 0:
+            logging.info(f"Invalidate {cursor.rowcount} entries of the persistent cost cache `{self.cache_file}`.")
+        return cursor.rowcount
+
+    def refresh_fingerprint(self, db_connector, drop_stale=False):
+        """
+        Re-read the database statistics, e.g., after `ANALYZE` was run during the session.
+        :param db_connector:
+        :param drop_stale:
+        :return:
+        """
+        self.commit()
+        self.fingerprint = get_stats_fingerprint(db_connector)
+        if drop_stale:
+            self.invalidate()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": self.conn.execute("select count(*) from what_if_cost").fetchone()[0]}
+
+    def close(self):
+        if self.conn is None:
+            return
+
+        self.commit()
+        self.conn.close()
+        self.conn = None
+
+
+class BoundedCostCache:
+    """
+    An in-memory drop-in for the dict `CostEvaluation.cache`
+    ({(query, relevant_indexes): cost or (cost, plan)}) with a bounded
+    number of entries and an (approximate) byte budget.
+
+    The least recently used entries are evicted first. The plans can be stored
+    zlib-compressed, they are decompressed (into a fresh dict) on every access.
+    """
+
+    # The approximate overhead of an entry (the key tuple, the frozenset
+    # of the relevant indexes and the slots of the `OrderedDict`).
+    ENTRY_OVERHEAD = 400
+
+    def __init__(self, max_entries=None, max_bytes=None, compress_plans=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compress_plans = compress_plans
+
+        # {key: (cost, plan or compressed plan or None, number of bytes, stored as a (cost, plan) tuple)}
+        self._entries = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pack(self, value):
+        if not isinstance(value, tuple):
+            return value, None, self.ENTRY_OVERHEAD, False
+
+        cost, plan = value
+        if plan is None:
+            return cost, None, self.ENTRY_OVERHEAD, True
+        if self.compress_plans:
+            plan = zlib.compress(json.dumps(plan).encode("utf-8"))
+            return cost, plan, self.ENTRY_OVERHEAD + len(plan), True
+
+        # A rough estimate of the size of the plan dict, i.e., the size of its JSON text.
+        return cost, plan, self.ENTRY_OVERHEAD + sys.getsizeof(json.dumps(plan)), True
+
+    def _unpack(self, entry):
+        cost, plan, _, with_plan = entry
+        if not with_plan:
+            return cost
+        if plan is not None and self.compress_plans:
+            plan = json.loads(zlib.decompress(plan).decode("utf-8"))
+
+        return cost, plan
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        entry = self._entries[key]
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return self._unpack(entry)
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        return self[key]
+
+    def __setitem__(self, key, value):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[2]
+        else:
+            self.misses += 1
+
+        entry = self._pack(value)
+        self._entries[key] = entry
+        self.bytes += entry[2]
+
+        self._evict()
+
+    def __delitem__(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def _evict(self):
+        while len(self._entries) > 1 and \
+                ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                 or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry[2]
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def keys(self):
+        return self._entries.keys()
+
+    def items(self):
+        # Used for pickling the caches, hence neither counted as hits nor reordered.
+        for key, entry in self._entries.items():
+            yield key, self._unpack(entry)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self.bytes}
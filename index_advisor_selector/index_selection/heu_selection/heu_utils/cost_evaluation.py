@@ -1,8 +1,11 @@
 import numpy as np
 
 import logging
+import itertools
 
+from .index import Index
 from .workload import Workload
+from .cost_cache import normalize_query_text
 from .what_if_index_creation import WhatIfIndexCreation
 
 from index_advisor_selector.index_benefit_estimation.tree_model.tree_cost_infer import load_model_tree, get_tree_est_res
@@ -27,13 +30,62 @@ class CostEvaluation:
         # It is not necessary to drop hypothetical indexes during __init__().
         # These are only created per connection. Hence, non should be present.
 
-        self.relevant_indexes_cache = {}
+        # : newly added. for the cross-run (disk-backed) cost cache, see `cost_cache.py`.
+        self.persistent_cache = None
+        self.persistent_cache_hits = 0
+
+        # : newly added. for the parallel cost estimation, see `what_if_session_pool.py`.
+        self.session_pool = None
+
+        # : newly added. for the utilization-aware cost inference.
+        # If a query is costed under the relevant indexes R and its plan utilizes U,
+        # the cost under any relevant indexes S with U <= S <= R is the same
+        # (the indexes in R - S were not chosen by the optimizer anyway).
+        # {query_object: [(utilized_indexes, relevant_indexes, cost)]}
+        self.utilization_inference = False
+        self.plan_utilization = {}
+        self.inferred_hits = 0
+
+        # : newly added. for the atomic-configuration cost derivation.
+        # The cost under a configuration with several relevant indexes per table is derived
+        # as the minimum over its maximal atomic sub-configurations (one index per table),
+        # unless there are more than `derivation_max_atomic` of them.
+        self.cost_derivation = False
+        self.derivation_max_atomic = 32
+        self.derivation_validation = False
+        self.derived_hits = 0
+        # [(query_text, derived_cost, actual_cost)], filled if `derivation_validation`.
+        self.derivation_errors = list()
+
+        # : newly added. {index: estimated_size} of the simulated indexes, the index objects of
+        # an algorithm sharing this cost evaluation are equal to (not the same as) the simulated ones.
+        self.index_sizes = {}
+
+        # : newly added. for the parallel candidate scoring, see `prefetch_costs()`.
+        self.parallel_scoring = False
+        # {(query_object, frozenset(indexes)): utilized_indexes}, see `prefetch_utilized_indexes()`.
+        self.prefetched_utilization = {}
+
+        # : newly added. for the warm start from the snapshot of a previous run, see `load_snapshot()`.
+        # {(query_object, frozenset(indexes)): utilized_indexes} of `which_indexes_utilized_and_cost()`.
+        self.utilization_log = {}
+        self.warm_started = False
+        # The cache entries / utilized indexes taken from the snapshot and not requested yet.
+        self.snapshot_keys = set()
+        self.snapshot_utilization = {}
+        # The what-if calls answered by the snapshot.
+        self.snapshot_hits = 0
 
         # self.model = load_model_tree()
         # self.model = load_model_lib()
         # self.model = load_model_former()
 
     def estimate_size(self, index):
+        # : newly added. for the analytic size estimation, no hypothetical index is created.
+        if self.what_if.size_estimator is not None:
+            self._store_analytic_sizes([index])
+            return
+
         # : Refactor: It is currently too complicated to compute
         # We must search in current indexes to get an index object with .hypopg_oid
         result = None
@@ -44,11 +96,28 @@ class CostEvaluation:
         if result:
             # Index does currently exist and size can be queried
             if not index.estimated_size:
-                index.estimated_size = self.what_if.estimate_index_size(result.hypopg_oid)
+                index.estimated_size = self.index_sizes.get(index, None) \
+                                       or self.what_if.estimate_index_size(result.hypopg_oid)
         else:
             self._simulate_or_create_index(index, store_size=True)
+        self.index_sizes[index] = index.estimated_size
 
     def which_indexes_utilized_and_cost(self, query, indexes):
+        # : newly added. for the warm start.
+        if (query, frozenset(indexes)) in self.snapshot_utilization:
+            utilized_indexes = self.snapshot_utilization.pop((query, frozenset(indexes)))
+            self.snapshot_hits += 1
+            cost = self.calculate_cost(Workload([query]), indexes, store_size=True)
+            self.utilization_log[(query, frozenset(indexes))] = utilized_indexes
+            return set(index for index in indexes if index in utilized_indexes), cost
+
+        # : newly added. for the parallel candidate scoring.
+        if (query, frozenset(indexes)) in self.prefetched_utilization:
+            utilized_indexes = self.prefetched_utilization.pop((query, frozenset(indexes)))
+            cost = self.calculate_cost(Workload([query]), indexes, store_size=True)
+            self.utilization_log[(query, frozenset(indexes))] = utilized_indexes
+            return set(index for index in indexes if index in utilized_indexes), cost
+
         # simulate hypothetical indexes all together.
         self._prepare_cost_calculation(indexes, store_size=True)
 
@@ -81,23 +150,86 @@ class CostEvaluation:
             if index.hypopg_name not in plan_str:
                 continue
             recommended_indexes.add(index)
+        self.utilization_log[(query, frozenset(indexes))] = frozenset(recommended_indexes)
 
         return recommended_indexes, cost
 
+    # : newly added. for the incremental cost maintenance of Drop.
+    def utilized_indexes_and_costs(self, workload, indexes):
+        """
+        `which_indexes_utilized_and_cost()` of every query of `workload` under `indexes`,
+        the plans are retrieved in one batch (or in parallel over `self.session_pool`).
+        The queries with views (and the actual runtimes) are treated as utilizing all their relevant indexes.
+        :param workload:
+        :param indexes:
+        :return: {query: (utilized_indexes, cost)}, the costs are not weighted by the frequencies.
+        """
+        indexes = set(indexes)
+        self._prepare_cost_calculation(indexes, store_size=True)
+
+        results = dict()
+        if self.cost_estimation == "whatif":
+            queries = [query for query in workload.queries if "create view" not in query.text]
+            if len(queries) == 0:
+                plan_results = list()
+            elif self.session_pool is not None:
+                plan_results = self.session_pool.cost_queries(list(indexes), queries, with_utilization=True)
+            else:
+                plan_results = [(plan["Total Cost"], self._utilized_indexes(plan))
+                                for plan in self.db_connector.get_plans(queries)]
+
+            for query, (cost, utilized_indexes) in zip(queries, plan_results):
+                relevant_indexes = self._relevant_indexes(query, indexes)
+                utilized_indexes = frozenset(utilized_indexes) & relevant_indexes
+                if (query, relevant_indexes) not in self.cache:
+                    self.cache[(query, relevant_indexes)] = cost
+                    if self.utilization_inference:
+                        self._record_utilization(query, relevant_indexes, utilized_indexes, cost)
+                self.utilization_log[(query, frozenset(indexes))] = utilized_indexes
+                results[query] = (utilized_indexes, self.cache[(query, relevant_indexes)])
+
+        for query in workload.queries:
+            if query not in results:
+                results[query] = (self._relevant_indexes(query, indexes), self._request_cache(query, indexes))
+
+        return results
+
     def calculate_cost(self, workload, indexes, store_size=False):
         # calculate_cost
         assert (
                 self.completed is False
         ), "Cost Evaluation is completed and cannot be reused."
-        self._prepare_cost_calculation(indexes, store_size=store_size)
+
+        # : newly added. for the atomic-configuration cost derivation.
+        derived_queries = list()
+        if self.cost_derivation and self.cost_estimation == "whatif":
+            derived_queries = self._derive_costs(workload.queries, indexes, store_size=store_size)
+
+        # : newly added. for the parallel candidate scoring,
+        # the configuration is not simulated if its costs have been prefetched.
+        if not self._is_prefetched(workload.queries, indexes, store_size=store_size):
+            self._prepare_cost_calculation(indexes, store_size=store_size)
         total_cost = 0
 
+        if self.derivation_validation and len(derived_queries) != 0:
+            self._validate_derived_costs(derived_queries, indexes)
+
+        # : newly added. for the batched / parallel cost estimation.
+        # The cache misses are costed in one go beforehand,
+        # the total cost is still summed up in the order of the queries.
+        prefetched_costs = dict()
+        if self.cost_estimation == "whatif":
+            prefetched_costs = self._request_cache_batch(workload.queries, indexes)
+
         # : Make query cost higher for queries which are running often
         for query in workload.queries:
             self.cost_requests += 1
             # total_cost += self._request_cache(query, indexes)
             # (0824): newly modified.
-            total_cost += self._request_cache(query, indexes) * query.frequency
+            if query in prefetched_costs:
+                total_cost += prefetched_costs.pop(query) * query.frequency
+            else:
+                total_cost += self._request_cache(query, indexes) * query.frequency
 
             # if "insert" in query.text.lower():
             #     total_cost += 0 * query.frequency
@@ -106,6 +238,158 @@ class CostEvaluation:
 
         return total_cost
 
+    # : newly added. for the cost matrix, see `cost_matrix.py`.
+    def calculate_query_costs(self, workload, indexes, store_size=False):
+        """
+        The cost of every query of `workload` under `indexes` (not weighted by the frequencies).
+        :param workload:
+        :param indexes:
+        :param store_size:
+        :return: the costs in the order of `workload.queries`.
+        """
+        self.calculate_cost(workload, indexes, store_size=store_size)
+
+        return [self.cache[(query, self._relevant_indexes(query, indexes))] for query in workload.queries]
+
+    # : newly added. for the parallel candidate scoring.
+    def calculate_costs(self, workload, configurations, store_size=False):
+        """
+        `calculate_cost()` of every configuration in `configurations`,
+        the cache misses are scored in parallel beforehand, see `prefetch_costs()`.
+        :param workload:
+        :param configurations:
+        :param store_size:
+        :return: the costs in the order of `configurations`.
+        """
+        self.prefetch_costs(workload.queries, configurations, store_size=store_size)
+
+        return [self.calculate_cost(workload, indexes, store_size=store_size)
+                for indexes in configurations]
+
+    def _parallel_scoring_enabled(self):
+        return self.parallel_scoring and self.session_pool is not None \
+               and self.cost_estimation == "whatif" and not self.cost_derivation
+
+    def prefetch_costs(self, queries, configurations, store_size=False):
+        """
+        Score the candidate configurations of a greedy step in parallel
+        over the what-if sessions of `self.session_pool` and fill the cache with the costs (and sizes).
+        The algorithm still calls `calculate_cost()` per candidate in its own order,
+        so the reduction (e.g., the first best candidate) is the same as in the serial scoring.
+        :param queries:
+        :param configurations: the candidate configurations (iterables of indexes).
+        :param store_size:
+        :return:
+        """
+        if not self._parallel_scoring_enabled():
+            return
+
+        tasks, requested_keys = list(), set()
+        for indexes in configurations:
+            indexes = list(indexes)
+            missed_keys = list()
+            for query in queries:
+                relevant_indexes = self._relevant_indexes(query, indexes)
+                if (query, relevant_indexes) in self.cache or (query, relevant_indexes) in requested_keys \
+                        or "create view" in query.text:
+                    continue
+
+                cost = self._infer_cost(query, relevant_indexes)
+                if cost is None and self.persistent_cache is not None:
+                    cost = self.persistent_cache.get(query.text, relevant_indexes)
+                    if cost is not None:
+                        self.persistent_cache_hits += 1
+                if cost is not None:
+                    self.cache[(query, relevant_indexes)] = cost
+                    continue
+
+                requested_keys.add((query, relevant_indexes))
+                missed_keys.append((query, relevant_indexes))
+
+            # : newly added. for the analytic size estimation.
+            if store_size:
+                self._store_analytic_sizes(indexes)
+            missed_sizes = store_size and any(index.estimated_size is None and index not in self.index_sizes
+                                              for index in indexes)
+            if len(missed_keys) != 0 or missed_sizes:
+                tasks.append((indexes, missed_keys))
+
+        results = self.session_pool.cost_configurations(
+            [(indexes, [query for query, _ in missed_keys]) for indexes, missed_keys in tasks],
+            with_utilization=self.utilization_inference,
+            store_size=store_size and self.what_if.size_estimator is None)
+        for (indexes, missed_keys), (costs, sizes) in zip(tasks, results):
+            for (query, relevant_indexes), cost in zip(missed_keys, costs):
+                if self.utilization_inference:
+                    cost, utilized_indexes = cost
+                    self._record_utilization(query, relevant_indexes, utilized_indexes, cost)
+                self.cache[(query, relevant_indexes)] = cost
+                if self.persistent_cache is not None:
+                    self.persistent_cache.put(query.text, relevant_indexes, cost)
+            if sizes is not None:
+                self._store_prefetched_sizes(indexes, sizes)
+
+    def prefetch_utilized_indexes(self, queries, indexes_per_query):
+        """
+        `which_indexes_utilized_and_cost()` of every query under its own configuration,
+        in parallel over the what-if sessions of `self.session_pool`.
+        :param queries:
+        :param indexes_per_query:
+        :return:
+        """
+        if not self._parallel_scoring_enabled():
+            return
+
+        tasks = [(list(indexes), [query]) for query, indexes in zip(queries, indexes_per_query)
+                 if "create view" not in query.text]
+        # : newly added. the analytic sizes take precedence over the ones of the sessions.
+        for indexes, _ in tasks:
+            self._store_analytic_sizes(indexes)
+        results = self.session_pool.cost_configurations(tasks, with_utilization=True, store_size=True)
+        for (indexes, (query,)), (((cost, utilized_indexes),), sizes) in zip(tasks, results):
+            relevant_indexes = self._relevant_indexes(query, indexes)
+            if (query, relevant_indexes) not in self.cache:
+                self.cache[(query, relevant_indexes)] = cost
+                if self.utilization_inference:
+                    self._record_utilization(query, relevant_indexes, utilized_indexes, cost)
+            self._store_prefetched_sizes(indexes, sizes)
+            self.prefetched_utilization[(query, frozenset(indexes))] = utilized_indexes
+
+    def _store_prefetched_sizes(self, indexes, sizes):
+        for index in indexes:
+            if index not in self.index_sizes:
+                self.index_sizes[index] = sizes[index]
+            if index.estimated_size is None:
+                index.estimated_size = self.index_sizes[index]
+
+    # : newly added. for the analytic size estimation, see `index_size_estimator.py`.
+    def _store_analytic_sizes(self, indexes):
+        if self.what_if.size_estimator is None:
+            return
+
+        for index in indexes:
+            if not index.estimated_size:
+                index.estimated_size = self.index_sizes.get(index, None) \
+                                       or self.what_if.size_estimator.estimate(index)
+            self.index_sizes[index] = index.estimated_size
+
+    def _is_prefetched(self, queries, indexes, store_size=False):
+        # : newly modified. the configurations costed by the snapshot are not simulated either.
+        if not (self.parallel_scoring or self.warm_started) \
+                or self.cost_estimation != "whatif" or self.derivation_validation:
+            return False
+
+        if store_size:
+            self._store_analytic_sizes(indexes)
+            for index in indexes:
+                if index.estimated_size is None:
+                    index.estimated_size = self.index_sizes.get(index, None)
+                if index.estimated_size is None:
+                    return False
+
+        return all((query, self._relevant_indexes(query, indexes)) in self.cache
+                   for query in queries)
+
     def calculate_cost_without_interaction(self, workload, indexes, store_size=False):
         # calculate_cost_without_interaction
         # without index interaction
@@ -149,12 +433,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -186,12 +465,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -229,12 +503,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -256,10 +525,27 @@ class CostEvaluation:
     # missing indexes and unsimulating/dropping indexes
     # that exist but are not in the combination.
     def _prepare_cost_calculation(self, indexes, store_size=False):
-        for index in set(indexes) - self.current_indexes:
-            self._simulate_or_create_index(index, store_size=store_size)
-        for index in self.current_indexes - set(indexes):
-            self._unsimulate_or_drop_index(index)
+        # : newly modified. The whole delta is simulated / dropped in one round trip.
+        if self.cost_estimation == "whatif":
+            added_indexes = list(set(indexes) - self.current_indexes)
+            dropped_indexes = list(self.current_indexes - set(indexes))
+            if len(added_indexes) != 0 or len(dropped_indexes) != 0:
+                self.what_if.simulate_indexes(added_indexes, dropped_indexes, store_size=store_size)
+                self.current_indexes -= set(dropped_indexes)
+                self.current_indexes |= set(added_indexes)
+
+            # : newly added. the sizes of the indexes simulated before (e.g., by another algorithm).
+            if store_size:
+                for index in added_indexes:
+                    self.index_sizes[index] = index.estimated_size
+                for index in indexes:
+                    if index.estimated_size is None:
+                        index.estimated_size = self.index_sizes.get(index, None)
+        else:
+            for index in set(indexes) - self.current_indexes:
+                self._simulate_or_create_index(index, store_size=store_size)
+            for index in self.current_indexes - set(indexes):
+                self._unsimulate_or_drop_index(index)
 
         assert self.current_indexes == set(indexes)
 
@@ -284,6 +570,81 @@ class CostEvaluation:
             runtime = self.db_connector.exec_query(query)[0]
             return runtime
 
+    def _get_costs(self, queries, indexes):
+        if len(queries) == 0:
+            return list()
+        if self.session_pool is not None:
+            return self.session_pool.cost_queries(indexes, queries)
+
+        return [plan["Total Cost"] for plan in self.db_connector.get_plans(queries)]
+
+    def _get_costs_recorded(self, missed_keys, indexes):
+        """
+        `_get_costs` that also records the plan utilization of the (query, relevant_indexes) in `missed_keys`.
+        :param missed_keys:
+        :param indexes:
+        :return:
+        """
+        queries = [query for query, _ in missed_keys]
+        if not self.utilization_inference:
+            return self._get_costs(queries, indexes)
+        if len(queries) == 0:
+            return list()
+
+        if self.session_pool is not None:
+            results = self.session_pool.cost_queries(indexes, queries, with_utilization=True)
+        else:
+            results = [(plan["Total Cost"], self._utilized_indexes(plan))
+                       for plan in self.db_connector.get_plans(queries)]
+
+        costs = list()
+        for (query, relevant_indexes), (cost, utilized_indexes) in zip(missed_keys, results):
+            self._record_utilization(query, relevant_indexes, utilized_indexes, cost)
+            costs.append(cost)
+
+        return costs
+
+    def _get_cost_recorded(self, query, relevant_indexes):
+        if not self.utilization_inference or self.cost_estimation != "whatif":
+            return self._get_cost(query)
+
+        plan = self.db_connector.get_plan(query)
+        cost = plan["Total Cost"]
+        self._record_utilization(query, relevant_indexes, self._utilized_indexes(plan), cost)
+
+        return cost
+
+    def _utilized_indexes(self, plan):
+        # Same as `which_indexes_utilized_and_cost`, the simulated indexes
+        # whose hypopg_name appears in the plan are utilized.
+        plan_str = str(plan)
+
+        return frozenset(index for index in self.current_indexes
+                         if index.hypopg_name in plan_str)
+
+    def _record_utilization(self, query, relevant_indexes, utilized_indexes, cost):
+        utilized_indexes = utilized_indexes & relevant_indexes
+        if query not in self.plan_utilization:
+            self.plan_utilization[query] = list()
+        self.plan_utilization[query].append((utilized_indexes, relevant_indexes, cost))
+
+    def _infer_cost(self, query, relevant_indexes):
+        """
+        Answer the cost of `query` under `relevant_indexes` from the plan utilization recorded so far.
+        :param query:
+        :param relevant_indexes:
+        :return: None if the cost cannot be inferred.
+        """
+        if not self.utilization_inference or query not in self.plan_utilization:
+            return None
+
+        for utilized_indexes, recorded_indexes, cost in self.plan_utilization[query]:
+            if utilized_indexes <= relevant_indexes <= recorded_indexes:
+                self.inferred_hits += 1
+                return cost
+
+        return None
+
     def complete_cost_estimation(self):
         self.completed = True
 
@@ -292,27 +653,288 @@ class CostEvaluation:
 
         assert self.current_indexes == set()
 
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+            self.persistent_cache = None
+        if self.session_pool is not None:
+            self.session_pool.close()
+            self.session_pool = None
+
     def _request_cache(self, query, indexes):
-        q_i_hash = (query, frozenset(indexes))
-        if q_i_hash in self.relevant_indexes_cache:
-            relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-        else:
-            relevant_indexes = self._relevant_indexes(query, indexes)
-            self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+        relevant_indexes = self._relevant_indexes(query, indexes)
 
         # Check if query and corresponding relevant indexes in cache
         if (query, relevant_indexes) in self.cache:
             self.cache_hits += 1
+            # : newly added. for the warm start.
+            if (query, relevant_indexes) in self.snapshot_keys:
+                self.snapshot_keys.remove((query, relevant_indexes))
+                self.snapshot_hits += 1
             return self.cache[(query, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost = self._get_cost(query)
+            # : newly added. for the utilization-aware cost inference.
+            cost = self._infer_cost(query, relevant_indexes)
+            if cost is None:
+                cost = self._request_persistent_cache(query, relevant_indexes)
+            self.cache[(query, relevant_indexes)] = cost
+            return cost
+
+    # : newly added. for the workload compression, see `workload_compression.py`.
+    def alias_queries(self, aliases):
+        """
+        Share the cached costs of the queries with their aliases (e.g., the weighted representatives),
+        the costs are not weighted by the frequencies.
+        :param aliases: {query: alias}.
+        :return:
+        """
+        for (query, relevant_indexes), cost in list(self.cache.items()):
+            if query in aliases:
+                self.cache[(aliases[query], relevant_indexes)] = cost
+
+    # : newly added. for the warm start from a previous run.
+    def cost_snapshot(self):
+        """
+        The what-if costs, the index sizes and the utilized indexes collected so far,
+        keyed by the normalized query texts and the index strings (JSON-serializable).
+        The snapshot assumes unchanged database statistics, see `PersistentCostCache` otherwise.
+        :return:
+        """
+        costs = dict()
+        for (query, relevant_indexes), cost in self.cache.items():
+            index_strings = tuple(sorted(str(index) for index in relevant_indexes))
+            costs[(normalize_query_text(query.text), index_strings)] = cost
+        utilization = dict()
+        for (query, indexes), utilized_indexes in self.utilization_log.items():
+            index_strings = tuple(sorted(str(index) for index in indexes))
+            utilization[(normalize_query_text(query.text), index_strings)] = \
+                sorted(str(index) for index in utilized_indexes)
+
+        return {"cost_estimation": self.cost_estimation,
+                "costs": [[text, list(index_strings), cost] for (text, index_strings), cost in costs.items()],
+                "sizes": {str(index): size for index, size in self.index_sizes.items() if size is not None},
+                "utilization": [[text, list(index_strings), utilized]
+                                for (text, index_strings), utilized in utilization.items()]}
+
+    def load_snapshot(self, snapshot, workload):
+        """
+        Seed the cache with the costs of `snapshot` (see `cost_snapshot()`) for the queries of `workload`
+        with the same text, the other (affected) queries are costed as usual.
+        The indexes are resolved by the (table-qualified) column names of the queries.
+        :param snapshot:
+        :param workload:
+        :return: (the indexes of `snapshot["indexes"]` relevant to `workload`, the affected queries).
+        """
+        columns = {str(column): column for query in workload.queries for column in query.columns}
+        resolved_indexes = dict()
+
+        def resolve(index_strings):
+            indexes = list()
+            for index_string in index_strings:
+                if index_string not in resolved_indexes:
+                    index_columns = [columns.get(column) for column in index_string.split(",")]
+                    resolved_indexes[index_string] = None if None in index_columns else Index(index_columns)
+                if resolved_indexes[index_string] is None:
+                    return None
+                indexes.append(resolved_indexes[index_string])
+            return indexes
+
+        queries_by_text = dict()
+        for query in workload.queries:
+            queries_by_text.setdefault(normalize_query_text(query.text), list()).append(query)
+
+        for index_string, size in snapshot.get("sizes", dict()).items():
+            index = resolve([index_string])
+            if index is not None:
+                self.index_sizes[index[0]] = size
+
+        known_texts = set()
+        # The costs of another cost estimation are not comparable.
+        snapshot_costs = snapshot.get("costs", list())
+        if snapshot.get("cost_estimation", "whatif") != self.cost_estimation:
+            logging.warning(f"The snapshot costs of `{snapshot.get('cost_estimation')}` are ignored.")
+            snapshot_costs = list()
+        for text, index_strings, cost in snapshot_costs:
+            known_texts.add(text)
+            indexes = resolve(index_strings)
+            if indexes is None:
+                continue
+            for query in queries_by_text.get(text, list()):
+                relevant_indexes = self._relevant_indexes(query, indexes)
+                if len(relevant_indexes) != len(indexes) or (query, relevant_indexes) in self.cache:
+                    continue
+                self.cache[(query, relevant_indexes)] = cost
+                self.snapshot_keys.add((query, relevant_indexes))
+
+        for text, index_strings, utilized_strings in snapshot.get("utilization", list()):
+            indexes, utilized_indexes = resolve(index_strings), resolve(utilized_strings)
+            if indexes is None or utilized_indexes is None:
+                continue
+            for query in queries_by_text.get(text, list()):
+                self.snapshot_utilization[(query, frozenset(indexes))] = frozenset(utilized_indexes)
+
+        prior_indexes = list()
+        for index_string in snapshot.get("indexes", list()):
+            index = resolve([index_string])
+            if index is not None:
+                index[0].estimated_size = self.index_sizes.get(index[0], None)
+                prior_indexes.append(index[0])
+        affected_queries = [query for query in workload.queries
+                            if normalize_query_text(query.text) not in known_texts]
+
+        self.warm_started = True
+        logging.info(f"Warm start: {len(self.snapshot_keys)} costs from the snapshot, "
+                     f"{len(affected_queries)} of {len(workload.queries)} queries affected.")
+
+        return prior_indexes, affected_queries
+
+    def _request_cache_batch(self, queries, indexes):
+        """
+        Cost all the cache misses of `queries` under `indexes` at once,
+        i.e., with batched EXPLAINs or in parallel over the what-if sessions of `self.session_pool`.
+        Queries with views are left to the (serial) `_request_cache`.
+        :param queries:
+        :param indexes:
+        :return: {query: cost} of the queries that were not cached before.
+        """
+        costs, missed_queries, missed_keys = dict(), list(), list()
+        for query in queries:
+            relevant_indexes = self._relevant_indexes(query, indexes)
+            if (query, relevant_indexes) in self.cache or query in costs \
+                    or query in missed_queries or "create view" in query.text:
+                continue
+
+            cost = self._infer_cost(query, relevant_indexes)
+            if cost is not None:
+                self.cache[(query, relevant_indexes)] = cost
+                costs[query] = cost
+                continue
+
+            if self.persistent_cache is not None:
+                cost = self.persistent_cache.get(query.text, relevant_indexes)
+                if cost is not None:
+                    self.persistent_cache_hits += 1
+                    self.cache[(query, relevant_indexes)] = cost
+                    costs[query] = cost
+                    continue
+
+            missed_queries.append(query)
+            missed_keys.append((query, relevant_indexes))
+
+        missed_costs = self._get_costs_recorded(missed_keys, indexes)
+        for (query, relevant_indexes), cost in zip(missed_keys, missed_costs):
             self.cache[(query, relevant_indexes)] = cost
+            if self.persistent_cache is not None:
+                self.persistent_cache.put(query.text, relevant_indexes, cost)
+            costs[query] = cost
+
+        return costs
+
+    def _request_persistent_cache(self, query, relevant_indexes):
+        # The persistent cache is only valid for the what-if costs.
+        if self.persistent_cache is None or self.cost_estimation != "whatif":
+            return self._get_cost_recorded(query, relevant_indexes)
+
+        cost = self.persistent_cache.get(query.text, relevant_indexes)
+        if cost is not None:
+            self.persistent_cache_hits += 1
             return cost
 
+        cost = self._get_cost_recorded(query, relevant_indexes)
+        self.persistent_cache.put(query.text, relevant_indexes, cost)
+        return cost
+
+    def _atomic_configurations(self, relevant_indexes):
+        """
+        The maximal atomic sub-configurations (exactly one index per table) of `relevant_indexes`.
+        Adding an index never increases the what-if cost, hence the minimum over
+        the maximal ones equals the minimum over all the atomic sub-configurations.
+        :param relevant_indexes:
+        :return: None if `relevant_indexes` is atomic itself or
+                 has more than `derivation_max_atomic` atomic sub-configurations.
+        """
+        table_indexes = dict()
+        for index in sorted(relevant_indexes):
+            table_indexes.setdefault(index.table(), list()).append(index)
+
+        atomic_num = 1
+        for indexes in table_indexes.values():
+            atomic_num *= len(indexes)
+        if atomic_num == 1 or atomic_num > self.derivation_max_atomic:
+            return None
+
+        return [frozenset(atomic) for atomic in itertools.product(*table_indexes.values())]
+
+    def _derive_costs(self, queries, indexes, store_size=False):
+        """
+        Cost the atomic sub-configurations of the relevant indexes of `queries`
+        (grouped by configuration, so that every one is simulated once)
+        and cache the derived costs under the relevant indexes.
+        :param queries:
+        :param indexes:
+        :param store_size: the atomic configurations are subsets of `indexes`,
+                           their sizes are stored right away.
+        :return: the queries whose costs were derived.
+        """
+        derivations, atomic_requests = dict(), dict()
+        for query in queries:
+            relevant_indexes = self._relevant_indexes(query, indexes)
+            if (query, relevant_indexes) in self.cache or query in derivations:
+                continue
+
+            atomic_configurations = self._atomic_configurations(relevant_indexes)
+            if atomic_configurations is None:
+                continue
+
+            derivations[query] = (relevant_indexes, atomic_configurations)
+            for atomic in atomic_configurations:
+                if (query, atomic) not in self.cache:
+                    atomic_requests.setdefault(atomic, list()).append(query)
+
+        for atomic, atomic_queries in atomic_requests.items():
+            self._prepare_cost_calculation(atomic, store_size=store_size)
+            costs = self._request_cache_batch(atomic_queries, atomic)
+            for query in atomic_queries:
+                if query not in costs:
+                    self._request_cache(query, atomic)
+
+        for query, (relevant_indexes, atomic_configurations) in derivations.items():
+            self.cache[(query, relevant_indexes)] = min(self.cache[(query, atomic)]
+                                                        for atomic in atomic_configurations)
+            self.derived_hits += 1
+
+        return list(derivations.keys())
+
+    def _validate_derived_costs(self, queries, indexes):
+        # The actual costs are requested from the database system directly,
+        # so that the cache keeps the derived ones.
+        queries = [query for query in queries if "create view" not in query.text]
+        actual_costs = self._get_costs(queries, indexes)
+        for query, actual_cost in zip(queries, actual_costs):
+            derived_cost = self.cache[(query, self._relevant_indexes(query, indexes))]
+            self.derivation_errors.append((query.text, derived_cost, actual_cost))
+            if actual_cost != 0 and abs(derived_cost - actual_cost) / actual_cost > 0.01:
+                logging.info(f"The derived cost ({derived_cost:.2f}) of query {query.nr} "
+                             f"deviates from the actual cost ({actual_cost:.2f}).")
+
+    def derivation_error_summary(self):
+        """
+        :return: the number of validated derivations and
+                 the mean / max relative error of the derived costs.
+        """
+        errors = [abs(derived - actual) / actual
+                  for _, derived, actual in self.derivation_errors if actual != 0]
+        if len(errors) == 0:
+            return {"validated": 0, "mean_error": 0., "max_error": 0.}
+
+        return {"validated": len(errors), "mean_error": float(np.mean(errors)),
+                "max_error": float(np.max(errors))}
+
     @staticmethod
     def _relevant_indexes(query, indexes):
+        # : newly modified. A bitwise AND of the column masks, see `workload.py`.
+        query_mask = query.column_mask
         relevant_indexes = [
-            x for x in indexes if any(c in query.columns for c in x.columns)
+            x for x in indexes if x.column_mask & query_mask
         ]
         return frozenset(relevant_indexes)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: cost_matrix
+# @Author: Wei Zhou
+# @Time: 2024/1/12 10:26
+
+import logging
+import itertools
+
+import numpy as np
+
+from .workload import Workload
+
+
+class CostMatrix:
+    """
+    A query x atomic-configuration cost matrix, filled from the what-if layer
+    (the `CostEvaluation`) once per (query, atomic configuration).
+
+    An atomic configuration of a query holds at most one relevant index per table.
+    As for the atomic-configuration cost derivation of `CostEvaluation`, the cost of a query
+    under a configuration is the minimum over the atomic configurations it contains
+    (and the cost without indexes), i.e., a configuration is costed by vectorized min / sum
+    reductions without simulating it. The queries with more than `max_atoms`
+    atomic configurations are costed by the `CostEvaluation` instead.
+
+    The queries and indexes are added on demand, `calculate_cost()` has
+    the signature of `CostEvaluation.calculate_cost()`.
+    """
+
+    def __init__(self, cost_evaluation, max_atoms=64):
+        self.cost_evaluation = cost_evaluation
+        self.max_atoms = max_atoms
+
+        # {query_object: row}, {index: column}, {frozenset(columns): atom}
+        self.queries, self.query_ids = list(), dict()
+        self.indexes, self.index_ids = list(), dict()
+        self.atoms, self.atom_ids = list(), dict()
+
+        # the relevant index columns of every row, the rows costed by `self.cost_evaluation`.
+        self.relevant_indexes = list()
+        self.exact_rows = set()
+        # {(row, atom): cost}, the costs are not weighted by the frequencies.
+        self.atom_costs = dict()
+        self.base_costs = list()
+
+        # {atom: [row]} to be costed, every atomic configuration is simulated once for all its rows.
+        self._pending = dict()
+
+        # The numpy arrays are rebuilt if queries / indexes / atoms were added.
+        self._dirty = True
+        self._costs = None
+        self._masks = None
+        self._base_costs = None
+
+        self.requests = 0
+        self.atom_evaluations = 0
+
+    def _add_queries(self, queries):
+        new_queries = list()
+        for query in queries:
+            if query not in self.query_ids and query not in new_queries:
+                new_queries.append(query)
+        if len(new_queries) == 0:
+            return
+
+        base_costs = self.cost_evaluation.calculate_query_costs(Workload(new_queries), [])
+        for query, base_cost in zip(new_queries, base_costs):
+            self.query_ids[query] = len(self.queries)
+            self.queries.append(query)
+            self.relevant_indexes.append(set())
+            self.base_costs.append(base_cost)
+            # The indexes known so far.
+            self._add_relevant_indexes(self.query_ids[query], self.indexes)
+        self._dirty = True
+
+    def _add_indexes(self, indexes):
+        new_indexes = list()
+        for index in sorted(set(indexes)):
+            if index not in self.index_ids:
+                self.index_ids[index] = len(self.indexes)
+                self.indexes.append(index)
+                new_indexes.append(index)
+        if len(new_indexes) == 0:
+            return
+
+        for row in range(len(self.queries)):
+            self._add_relevant_indexes(row, new_indexes)
+        self._dirty = True
+
+    def _add_relevant_indexes(self, row, indexes):
+        query = self.queries[row]
+        new_columns = [self.index_ids[index] for index in indexes
+                       if index.column_mask & query.column_mask]
+        if len(new_columns) == 0:
+            return
+
+        old_columns = set(self.relevant_indexes[row])
+        self.relevant_indexes[row] |= set(new_columns)
+        if row in self.exact_rows:
+            return
+
+        table_columns = dict()
+        for column in sorted(self.relevant_indexes[row]):
+            table_columns.setdefault(self.indexes[column].table(), list()).append(column)
+        atom_num = 1
+        for columns in table_columns.values():
+            atom_num *= len(columns) + 1
+        if atom_num - 1 > self.max_atoms:
+            logging.debug(f"Query {query.nr} has more than {self.max_atoms} atomic configurations.")
+            self.exact_rows.add(row)
+            return
+
+        # The atomic configurations with at least one new index, at most one index per table.
+        for atom in itertools.product(*[[None] + columns for columns in table_columns.values()]):
+            atom = frozenset(column for column in atom if column is not None)
+            if len(atom) == 0 or atom <= old_columns:
+                continue
+            if atom not in self.atom_ids:
+                self.atom_ids[atom] = len(self.atoms)
+                self.atoms.append(atom)
+            self._pending.setdefault(self.atom_ids[atom], list()).append(row)
+
+    def _fill(self):
+        for atom_id, rows in sorted(self._pending.items()):
+            atom_indexes = [self.indexes[column] for column in sorted(self.atoms[atom_id])]
+            costs = self.cost_evaluation.calculate_query_costs(Workload([self.queries[row] for row in rows]),
+                                                               atom_indexes, store_size=True)
+            for row, cost in zip(rows, costs):
+                self.atom_costs[(row, atom_id)] = cost
+            self.atom_evaluations += len(rows)
+        self._pending = dict()
+
+    def _build(self):
+        if not self._dirty:
+            return
+
+        self._costs = np.full((len(self.queries), len(self.atoms)), np.inf)
+        for (row, atom_id), cost in self.atom_costs.items():
+            self._costs[row, atom_id] = cost
+        self._masks = np.zeros((len(self.atoms), len(self.indexes)), dtype=np.int32)
+        for atom_id, atom in enumerate(self.atoms):
+            self._masks[atom_id, list(atom)] = 1
+        self._base_costs = np.array(self.base_costs, dtype=float)
+
+        self._dirty = False
+
+    def _prepare(self, queries, configurations):
+        self._add_queries(queries)
+        self._add_indexes(set(itertools.chain.from_iterable(configurations)))
+        self._fill()
+        self._build()
+
+    def query_costs_batch(self, workload, configurations):
+        """
+        The (frequency-weighted) cost of every query of `workload` under every configuration.
+        :param workload:
+        :param configurations: iterables of indexes.
+        :return: a numpy array of shape (len(configurations), len(workload.queries)).
+        """
+        configurations = [list(indexes) for indexes in configurations]
+        self._prepare(workload.queries, configurations)
+        self.requests += len(configurations)
+
+        rows = [self.query_ids[query] for query in workload.queries]
+        selected = np.zeros((len(configurations), len(self.indexes)), dtype=np.int32)
+        for i, indexes in enumerate(configurations):
+            selected[i, [self.index_ids[index] for index in indexes]] = 1
+
+        # An atomic configuration is contained if none of its indexes is outside the configuration.
+        contained = ((1 - selected) @ self._masks.T) == 0
+        costs = np.empty((len(configurations), len(rows)))
+        for j, row in enumerate(rows):
+            if row in self.exact_rows:
+                costs[:, j] = [self.cost_evaluation.calculate_query_costs(Workload([self.queries[row]]), indexes)[0]
+                               for indexes in configurations]
+                continue
+
+            costs[:, j] = self._base_costs[row]
+            if len(self.atoms) != 0:
+                costs[:, j] = np.minimum(np.where(contained, self._costs[row], np.inf).min(axis=1), costs[:, j])
+
+        # The frequencies are read at every request, they may change after the queries were added
+        # (e.g., the reweighted representatives of the workload compression).
+        return costs * np.array([query.frequency for query in workload.queries], dtype=float)
+
+    def calculate_costs(self, workload, configurations, store_size=False):
+        """
+        :param workload:
+        :param configurations:
+        :param store_size:
+        :return: the costs of `workload` in the order of `configurations`.
+        """
+        if store_size:
+            for indexes in configurations:
+                self.store_sizes(indexes)
+
+        return self.query_costs_batch(workload, configurations).sum(axis=1).tolist()
+
+    def calculate_cost(self, workload, indexes, store_size=False):
+        if store_size:
+            self.store_sizes(indexes)
+
+        return float(self.query_costs_batch(workload, [indexes]).sum())
+
+    def store_sizes(self, indexes):
+        for index in indexes:
+            if index.estimated_size is None:
+                index.estimated_size = self.cost_evaluation.index_sizes.get(index, None)
+            if index.estimated_size is None:
+                self.cost_evaluation.estimate_size(index)
@@ -34,7 +34,10 @@ def get_parser():
     parser.add_argument("--varying_frequencies", action="store_true")
 
     parser.add_argument("--cand_gen", type=str, default=None,
-                        choices=["permutation", "dqn_rule", "openGauss"])
+                        choices=["permutation", "permutation_bound", "dqn_rule", "openGauss"])
+    # : newly added. `permutation_bound`: discard the candidates whose benefit bound
+    # is below the fraction of the best bound, see `prune_candidates_by_benefit_bound()`.
+    parser.add_argument("--bound_fraction", type=float, default=0.1)
     parser.add_argument("--is_utilized", action="store_true")  # , default=True
     parser.add_argument("--multi_column", action="store_true")  # , default=True
 
@@ -63,6 +66,49 @@ def get_parser():
     parser.add_argument("--ampl_dat_path", type=str,
                         default="/data1/wz/index/index_eab/eab_olap/bench_result/tpch/"
                                 "work_level/tpch_1gb_template_18_multi_work_index_cophy.txt")
+    # : newly added. solve the program of `cophy` in-process (HiGHS via scipy) instead of with AMPL.
+    parser.add_argument("--cophy_solver", type=str, default="ampl", choices=["ampl", "milp"])
+    parser.add_argument("--solver_time_limit", type=float, default=None)
+    parser.add_argument("--solver_mip_gap", type=float, default=None)
+
+    # : newly added. for the cross-run (disk-backed) cost cache.
+    parser.add_argument("--cost_cache_file", type=str, default=None)
+    parser.add_argument("--cost_cache_max_entries", type=int, default=1000000)
+    # : newly added. for the parallel cost estimation over several what-if sessions.
+    parser.add_argument("--parallel_sessions", type=int, default=None)
+    # : newly added. score the candidates of a greedy step in parallel over the what-if sessions.
+    parser.add_argument("--parallel_scoring", action="store_true")
+    # : newly added. PREPARE the queries once and cost them with `EXPLAIN EXECUTE`.
+    parser.add_argument("--prepared_queries", action="store_true")
+    # : newly added. infer the what-if costs from the indexes utilized by the plans.
+    parser.add_argument("--utilization_inference", action="store_true")
+    # : newly added. derive the costs of the configurations from their atomic sub-configurations.
+    parser.add_argument("--cost_derivation", action="store_true")
+    parser.add_argument("--derivation_max_atomic", type=int, default=32)
+    parser.add_argument("--derivation_validation", action="store_true")
+    # : newly added. the lazy-greedy (CELF) evaluation of Extend.
+    parser.add_argument("--lazy_greedy", action="store_true")
+    # : newly added. Drop re-costs only the queries utilizing the dropped index.
+    parser.add_argument("--incremental_drop", action="store_true")
+    # : newly added. select the indexes for several budgets (in MB, e.g., `100,200,500`) with one run.
+    parser.add_argument("--sweep_budgets", type=str, default=None)
+    # : newly added. compress the workload before the selection, the larger the fewer queries.
+    parser.add_argument("--compression_max_loss", type=float, default=None)
+    # : newly added. warm-start from (and save) the recommendation and the costs, e.g., `warm_start_{}.json`.
+    parser.add_argument("--warm_start_file", type=str, default=None)
+    # : newly added. explore the seeds of Anytime in several processes.
+    parser.add_argument("--parallel_seeds", type=int, default=None)
+    # : newly added. enumerate over the query x atomic-configuration cost matrix.
+    parser.add_argument("--cost_matrix", action="store_true")
+    parser.add_argument("--matrix_max_atoms", type=int, default=64)
+    # : newly added. estimate the index sizes locally (validated on a sample) instead of by hypopg.
+    parser.add_argument("--analytic_size", action="store_true")
+    parser.add_argument("--size_validation_samples", type=int, default=20)
+    # : newly added. share the cost cache and the simulated indexes across the algorithms / configurations.
+    parser.add_argument("--share_cost_cache", action="store_true")
+    # : newly added. record the what-if answers of a live run / replay them without a database.
+    parser.add_argument("--whatif_record", type=str, default=None)
+    parser.add_argument("--whatif_replay", type=str, default=None)
 
     parser.add_argument("--host", type=str, default=None)
     parser.add_argument("--db_name", type=str, default=None)
@@ -343,6 +389,10 @@ def get_utilized_indexes(
 ):
     utilized_indexes_workload = set()
     query_details = {}
+    # : newly added. for the parallel candidate scoring.
+    cost_evaluation.prefetch_utilized_indexes(workload.queries, indexes_per_query)
+    if detailed_query_information:
+        cost_evaluation.prefetch_costs(workload.queries, [[]])
     for query, indexes in zip(workload.queries, indexes_per_query):
         (
             utilized_indexes_query,
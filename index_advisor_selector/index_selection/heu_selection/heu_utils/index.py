@@ -1,20 +1,74 @@
 from functools import total_ordering
 
 
+# : newly added. shared by the slotted models of heu_selection, swirl_selection and mcts_selection.
+def get_slotted_state(obj):
+    # The cached hashes / ids / masks (the underscored slots) are not pickled,
+    # they are only valid within one process.
+    return {slot: getattr(obj, slot) for slot in obj.__slots__ if not slot.startswith("_")}
+
+
+def set_slotted_state(obj, state):
+    """
+    `__setstate__` of the slotted classes, which also accepts
+    the pickles of the former (`__dict__`-based) objects, e.g., the saved MCTS advisors.
+    :param obj:
+    :param state:
+    :return:
+    """
+    if isinstance(state, tuple):
+        state = {**(state[0] or dict()), **state[1]}
+
+    for slot in obj.__slots__:
+        setattr(obj, slot, None)
+    for key, value in state.items():
+        if not key.startswith("_") and hasattr(type(obj), key):
+            setattr(obj, key, value)
+
+
 @total_ordering
 class Index:
+    # : newly modified. slotted, with the hash and the column mask cached.
+    __slots__ = ("columns", "estimated_size", "hypopg_name", "hypopg_oid",
+                 "_hash", "_sort_key", "_column_mask")
+
     def __init__(self, columns, estimated_size=None):
         if len(columns) == 0:
             raise ValueError("Index needs at least 1 column")
         self.columns = tuple(columns)
         self.estimated_size = estimated_size
         self.hypopg_name = None
+        self.hypopg_oid = None
+
+        self._hash = None
+        self._sort_key = None
+        self._column_mask = None
+
+    @property
+    def sort_key(self):
+        # The names (not the integer column ids, which follow the order of creation) define the order,
+        # the candidates are hence enumerated (and the ties broken) as before.
+        if self._sort_key is None:
+            self._sort_key = (tuple(column.name for column in self.columns),
+                              tuple(column.table.name for column in self.columns))
+        return self._sort_key
 
     def __lt__(self, other):
         if len(self.columns) != len(other.columns):
             return len(self.columns) < len(other.columns)
 
-        return self.columns < other.columns
+        # : newly modified. The same order as `self.columns < other.columns`
+        # (the first columns that differ are compared by name), on the precomputed names.
+        names, tables = self._sort_key or self.sort_key
+        other_names, other_tables = other._sort_key or other.sort_key
+        if tables == other_tables or names == other_names:
+            return names < other_names
+        for name, table, other_name, other_table in zip(names, tables, other_names, other_tables):
+            if name != other_name:
+                return name < other_name
+            if table != other_table:
+                return False
+        return False
 
     def __repr__(self):
         columns_string = ",".join(map(str, self.columns))
@@ -23,11 +77,32 @@ class Index:
     def __eq__(self, other):
         if not isinstance(other, Index):
             return False
+        if self is other:
+            return True
 
-        return self.columns == other.columns
+        return hash(self) == hash(other) and self.columns == other.columns
 
     def __hash__(self):
-        return hash(self.columns)
+        if self._hash is None:
+            self._hash = hash(self.columns)
+        return self._hash
+
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
+
+    # : newly added. for the bitmask relevance filter.
+    @property
+    def column_mask(self):
+        if self._column_mask is None:
+            mask = 0
+            for column in self.columns:
+                mask |= 1 << column.column_id
+            self._column_mask = mask
+
+        return self._column_mask
 
     def _column_names(self):
         return [x.name for x in self.columns]
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: index_relations
+# @Author: Wei Zhou
+# @Time: 2024/1/16 15:40
+
+from .index import Index, index_merge, index_split
+
+
+class _TrieNode:
+    __slots__ = ("children", "index")
+
+    def __init__(self):
+        # {column: _TrieNode}
+        self.children = dict()
+        # The index of the column sequence from the root to this node.
+        self.index = None
+
+
+class IndexRelations:
+    """
+    The subsumption (prefix) relations and the merge / split results of the indexes,
+    precomputed / memoized for the algorithms testing them on every pair of candidates
+    (the relaxations of Relaxation, `DB2AdvisAlgorithm._combine_subsumed()`
+    and `AnytimeAlgorithm._add_merged_indexes()`).
+
+    The indexes are kept in a prefix trie per table, every column sequence is represented
+    by one index object (the first one added), i.e., the prefixes / merged / split indexes
+    share the estimated sizes of the candidates they equal.
+    """
+
+    def __init__(self):
+        # {table: _TrieNode}
+        self.tries = dict()
+
+        # {index: [prefix]} (the longest first, as `Index.prefixes()`), {index: frozenset(prefixes)}
+        self._prefixes = dict()
+        self._prefix_sets = dict()
+        # {max_index_width: {index_1: {index_2: merged_index}}}, {index_1: {index_2: split_indexes}}
+        self._merges = dict()
+        self._splits = dict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _node(self, columns):
+        node = self.tries.setdefault(columns[0].table, _TrieNode())
+        for column in columns:
+            if column not in node.children:
+                node.children[column] = _TrieNode()
+            node = node.children[column]
+
+        return node
+
+    def add(self, indexes):
+        """
+        Register `indexes` as the representatives of their column sequences.
+        :param indexes:
+        :return:
+        """
+        for index in indexes:
+            node = self._node(index.columns)
+            if node.index is None:
+                node.index = index
+
+    def index(self, columns):
+        """
+        :param columns:
+        :return: the index object representing `columns`.
+        """
+        node = self._node(columns)
+        if node.index is None:
+            node.index = Index(columns)
+
+        return node.index
+
+    def prefixes(self, index):
+        """
+        `Index.prefixes()` resolved along the trie path of `index`.
+        :param index:
+        :return:
+        """
+        if index in self._prefixes:
+            self.hits += 1
+            return self._prefixes[index]
+        self.misses += 1
+
+        path = list()
+        node = self.tries.setdefault(index.columns[0].table, _TrieNode())
+        for width, column in enumerate(index.columns[:-1], start=1):
+            if column not in node.children:
+                node.children[column] = _TrieNode()
+            node = node.children[column]
+            if node.index is None:
+                node.index = Index(index.columns[:width])
+            path.append(node.index)
+
+        self._prefixes[index] = path[::-1]
+        self._prefix_sets[index] = frozenset(path)
+
+        return self._prefixes[index]
+
+    def subsumes(self, index, other):
+        """
+        `index.subsumes(other)`, i.e., `other` is a prefix of (or equal to) `index`.
+        :param index:
+        :param other:
+        :return:
+        """
+        if not isinstance(other, Index):
+            return False
+        if index not in self._prefix_sets:
+            self.prefixes(index)
+
+        return other == index or other in self._prefix_sets[index]
+
+    def merge(self, index_1, index_2, max_index_width=None):
+        """
+        `index_merge()` truncated to `max_index_width` columns.
+        :param index_1:
+        :param index_2:
+        :param max_index_width:
+        :return:
+        """
+        merges = self._merges.setdefault(max_index_width, dict()).setdefault(index_1, dict())
+        if index_2 in merges:
+            self.hits += 1
+            return merges[index_2]
+        self.misses += 1
+
+        merged_columns = index_merge(index_1, index_2).columns
+        if max_index_width is not None and len(merged_columns) > max_index_width:
+            merged_columns = merged_columns[:max_index_width]
+        merges[index_2] = self.index(merged_columns)
+
+        return merges[index_2]
+
+    def split(self, index_1, index_2):
+        """
+        `index_split()`, the result is shared, i.e., a frozenset (or None if the indexes share no column).
+        :param index_1:
+        :param index_2:
+        :return:
+        """
+        splits = self._splits.setdefault(index_1, dict())
+        if index_2 in splits:
+            self.hits += 1
+            return splits[index_2]
+        self.misses += 1
+
+        split_indexes = index_split(index_1, index_2)
+        if split_indexes is not None:
+            split_indexes = frozenset(self.index(index.columns) for index in split_indexes)
+        splits[index_2] = split_indexes
+
+        return split_indexes
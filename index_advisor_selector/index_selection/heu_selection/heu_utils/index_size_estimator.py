@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: index_size_estimator
+# @Author: Wei Zhou
+# @Time: 2024/1/17 10:25
+
+import random
+import logging
+
+import numpy as np
+
+# The sizes of the B-tree page / tuple headers of PostgreSQL (as assumed by hypopg).
+SIZE_OF_PAGE_HEADER = 24
+SIZE_OF_BT_PAGE_OPAQUE = 16
+SIZE_OF_INDEX_TUPLE = 8
+SIZE_OF_ITEM_ID = 4
+MAXIMUM_ALIGNOF = 8
+
+
+def max_align(length):
+    return (length + MAXIMUM_ALIGNOF - 1) // MAXIMUM_ALIGNOF * MAXIMUM_ALIGNOF
+
+
+class IndexSizeEstimator:
+    """
+    The size of a (hypothetical) B-tree index computed locally with the estimation of hypopg
+    (`hypo_estimate_index()`): the tuples of the table (`pg_class`), the average widths of
+    the key columns (`pg_stats`), the fill factor and the additional bloat, i.e.,
+    without creating, measuring and dropping a hypothetical index per candidate.
+
+    The statistics are fetched once (for the `public` schema), the sizes are served from memory.
+    The size only depends on the set of the key columns, i.e., the permutations of the same columns
+    share one estimate. `validate()` compares the estimates with `hypopg_relation_size` on a sample
+    and calibrates them by the median ratio.
+    """
+
+    def __init__(self, db_connector, fillfactor=90, additional_bloat=20):
+        self.db_connector = db_connector
+        self.fillfactor = fillfactor
+        self.additional_bloat = additional_bloat
+
+        self.block_size = None
+        # {table_name: tuples}, {(table_name, column_name): avg_width}
+        self.table_tuples = None
+        self.column_widths = None
+
+        # {(table_name, frozenset(column_names)): size}
+        self.sizes = dict()
+        # The ratio of the hypopg sizes to the analytic sizes, see `validate()`.
+        self.scale = 1.
+        self.validation = None
+
+        self.estimations = 0
+        self.hits = 0
+
+    def _load_statistics(self):
+        self.block_size = int(self.db_connector.exec_fetch("show block_size")[0])
+
+        # The tuples of the table as estimated by the planner (`estimate_rel_size()`),
+        # i.e., the density of `reltuples / relpages` scaled to the current number of pages.
+        statement = ("select c.relname, c.reltuples, c.relpages, "
+                     "pg_relation_size(c.oid) / current_setting('block_size')::int "
+                     "from pg_class c join pg_namespace n on n.oid = c.relnamespace "
+                     "where n.nspname = 'public' and c.relkind in ('r', 'm', 'p')")
+        self.table_tuples = dict()
+        for table_name, reltuples, relpages, pages in self.db_connector.exec_fetch(statement, one=False):
+            if relpages > 0 and reltuples >= 0:
+                tuples = round(reltuples / relpages * pages)
+            else:
+                tuples = max(reltuples, 0)
+            self.table_tuples[table_name.lower()] = tuples
+
+        statement = ("select tablename, attname, avg_width from pg_stats "
+                     "where schemaname = 'public' and not inherited")
+        self.column_widths = {(table_name.lower(), column_name.lower()): avg_width
+                              for table_name, column_name, avg_width
+                              in self.db_connector.exec_fetch(statement, one=False)}
+
+        logging.info(f"Index size estimator: the statistics of {len(self.table_tuples)} tables "
+                     f"and {len(self.column_widths)} columns loaded.")
+
+    def _estimate(self, table_name, column_names):
+        if self.table_tuples is None:
+            self._load_statistics()
+
+        # The columns without statistics do not count, as `get_attavgwidth()` returns 0.
+        index_width = sum(self.column_widths.get((table_name, column_name), 0) for column_name in column_names)
+        line_size = index_width + SIZE_OF_INDEX_TUPLE * len(column_names) \
+                    + max_align(SIZE_OF_ITEM_ID * len(column_names))
+        usable_page_size = self.block_size - SIZE_OF_PAGE_HEADER - SIZE_OF_BT_PAGE_OPAQUE
+        bloat_factor = (200. - self.fillfactor + self.additional_bloat) / 100
+        pages = int(self.table_tuples.get(table_name, 0) * line_size * bloat_factor / usable_page_size)
+
+        # An index has at least one page (hypopg asserts a positive size).
+        return max(pages, 1) * self.block_size
+
+    def estimate(self, index):
+        """
+        :param index:
+        :return: the estimated size (in bytes) of `index`.
+        """
+        table_name = index.columns[0].table.name.lower()
+        key = (table_name, frozenset(column.name.lower() for column in index.columns))
+        if key in self.sizes:
+            self.hits += 1
+            return self.sizes[key]
+
+        self.estimations += 1
+        self.sizes[key] = int(self._estimate(table_name, key[1]) * self.scale)
+
+        return self.sizes[key]
+
+    def snapshot(self):
+        """
+        The statistics and the calibrated sizes (picklable), e.g., for the worker processes.
+        :return:
+        """
+        return {"block_size": self.block_size, "table_tuples": self.table_tuples,
+                "column_widths": self.column_widths, "sizes": self.sizes,
+                "scale": self.scale, "validation": self.validation}
+
+    def load_snapshot(self, snapshot):
+        """
+        Take over the statistics and the calibration of another estimator, see `snapshot()`.
+        :param snapshot:
+        :return:
+        """
+        self.block_size = snapshot["block_size"]
+        self.table_tuples = snapshot["table_tuples"]
+        self.column_widths = snapshot["column_widths"]
+        self.sizes = dict(snapshot["sizes"])
+        self.scale = snapshot["scale"]
+        self.validation = snapshot["validation"]
+
+    def validate(self, indexes, sample_size=20, seed=0):
+        """
+        Compare the analytic sizes of a sample of `indexes` with their `hypopg_relation_size`
+        (simulated and dropped in two round trips) and calibrate the estimates by the median ratio.
+        :param indexes:
+        :param sample_size:
+        :param seed:
+        :return: {"samples", "mean_error", "max_error", "scale"}, the relative errors before the calibration.
+        """
+        if self.table_tuples is None:
+            self._load_statistics()
+
+        indexes = sorted(set(indexes))
+        sample = random.Random(seed).sample(indexes, min(sample_size, len(indexes)))
+        if len(sample) == 0:
+            return None
+
+        results = self.db_connector.simulate_indexes(sample, list(), store_size=True)
+        self.db_connector.simulate_indexes(list(), [index_oid for index_oid, _, _ in results])
+
+        ratios, errors = list(), list()
+        for index, (_, _, actual_size) in zip(sample, results):
+            analytic_size = self._estimate(index.columns[0].table.name.lower(),
+                                           frozenset(column.name.lower() for column in index.columns))
+            ratios.append(actual_size / analytic_size)
+            errors.append(abs(actual_size - analytic_size) / actual_size)
+
+        # The sizes estimated before are not calibrated.
+        self.scale = float(np.median(ratios))
+        self.sizes = dict()
+        self.validation = {"samples": len(ratios), "mean_error": float(np.mean(errors)),
+                           "max_error": float(np.max(errors)), "scale": self.scale}
+        logging.info(f"Index size estimator validated on {len(ratios)} indexes: "
+                     f"mean error {self.validation['mean_error'] * 100:.2f}%, "
+                     f"max error {self.validation['max_error'] * 100:.2f}%, scale {self.scale:.4f}.")
+
+        return self.validation
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: record_replay
+# @Author: Wei Zhou
+# @Time: 2024/1/12 10:37
+
+import os
+import re
+import glob
+import gzip
+import json
+import pickle
+import logging
+import itertools
+
+from .cost_cache import normalize_query_text
+from .database_connector import DatabaseConnector
+
+# The hypopg names in the recorded plans are replaced by `<hypo>table#col1,col2`,
+# so that they can be renamed to the names of the replaying session.
+HYPO_NAME_MARKER = "<hypo>"
+
+# The read-only statements on the catalog / the settings (e.g., the statistics fingerprint of
+# `PersistentCostCache` and the statistics of `IndexSizeEstimator`), recorded with their results.
+CATALOG_READ_PATTERN = re.compile(r"\s*(select|show)\s", re.IGNORECASE)
+
+
+def is_catalog_read(statement):
+    return CATALOG_READ_PATTERN.match(statement) is not None and "hypopg" not in statement.lower()
+
+
+def index_definition(index):
+    """
+    `table#col1,col2` (the format of `get_ind_cost()`) of an `Index` of any of the selection packages.
+    :param index:
+    :return:
+    """
+    if isinstance(index, str):
+        return index
+    return f"{index.table()}#{index.joined_column_names()}"
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class WhatIfRecording:
+    """
+    The what-if answers of a live run: (query text, hypothetical indexes) -> plan
+    (or only the cost, as answered by `get_ind_costs()`), hypothetical index -> size, the tables / columns of the database and the results
+    of the catalog reads (see `is_catalog_read()`).
+
+    Only the hypothetical indexes that share a column with the query text are part of the key
+    (cf. `CostEvaluation._relevant_indexes`), so that the recording can be replayed
+    regardless of the other indexes simulated in the session.
+    The recording is stored as a gzip-compressed pickle, the entries of an existing file are kept.
+    """
+
+    def __init__(self, recording_file=None, merge_shards=False):
+        self.recording_file = recording_file
+
+        # {(normalized query text, frozenset(index definitions)): plan (json text)}
+        self.plans = dict()
+        # {(normalized query text, frozenset(index definitions)): cost}, kept apart from the plans,
+        # so that a cost-only answer never replaces the plan (tree) of the same key.
+        self.costs = dict()
+        # {index definition: size}
+        self.sizes = dict()
+        # {"tables": [table], "columns": {table: [column]}}
+        self.catalog = {"tables": None, "columns": dict()}
+        # {(normalized statement, one): result}
+        self.statements = dict()
+
+        self.hits = 0
+        self.misses = 0
+
+        # {query text: (normalized query text, identifiers)}
+        self._query_tokens = dict()
+
+        if recording_file is not None:
+            recording_files = [recording_file]
+            if merge_shards:
+                recording_files += sorted(glob.glob(f"{recording_file}.*"))
+            for file in recording_files:
+                if os.path.exists(file):
+                    self.load(file)
+
+    def load(self, recording_file):
+        with gzip.open(recording_file, "rb") as rf:
+            data = pickle.load(rf)
+
+        self.plans.update(data["plans"])
+        self.costs.update(data.get("costs", dict()))
+        self.sizes.update(data["sizes"])
+        if data["catalog"]["tables"] is not None:
+            self.catalog["tables"] = data["catalog"]["tables"]
+        self.catalog["columns"].update(data["catalog"]["columns"])
+        # The recordings saved before the catalog reads were recorded do not hold them.
+        self.statements.update(data.get("statements", dict()))
+
+        logging.info(f"Load {len(data['plans'])} plans and {len(data['sizes'])} index sizes "
+                     f"from the what-if recording `{recording_file}`.")
+
+    def save(self, recording_file=None):
+        if recording_file is None:
+            recording_file = self.recording_file
+
+        # Several recordings (e.g., of the environments evaluated one after another)
+        # may share the file: the entries saved in the meantime are kept.
+        if os.path.exists(recording_file):
+            plans, costs, sizes, catalog, statements = \
+                self.plans, self.costs, self.sizes, self.catalog, self.statements
+            self.plans, self.sizes, self.catalog = dict(), dict(), {"tables": None, "columns": dict()}
+            self.costs, self.statements = dict(), dict()
+            self.load(recording_file)
+            self.plans.update(plans)
+            self.costs.update(costs)
+            self.sizes.update(sizes)
+            self.catalog["tables"] = catalog["tables"] or self.catalog["tables"]
+            self.catalog["columns"].update(catalog["columns"])
+            self.statements.update(statements)
+
+        with gzip.open(recording_file, "wb") as wf:
+            pickle.dump({"plans": self.plans, "costs": self.costs, "sizes": self.sizes, "catalog": self.catalog,
+                         "statements": self.statements},
+                        wf, protocol=pickle.HIGHEST_PROTOCOL)
+
+        logging.info(f"Save {len(self.plans)} plans and {len(self.sizes)} index sizes "
+                     f"to the what-if recording `{recording_file}`.")
+
+    def _key(self, query_text, index_definitions):
+        if query_text not in self._query_tokens:
+            normalized_text = normalize_query_text(query_text)
+            self._query_tokens[query_text] = (normalized_text,
+                                              frozenset(re.findall(r"[a-z_][a-z0-9_$]*", normalized_text.lower())))
+        normalized_text, tokens = self._query_tokens[query_text]
+
+        relevant_definitions = frozenset(
+            definition for definition in index_definitions
+            if any(column in tokens for column in definition.split("#")[1].split(",")))
+
+        return normalized_text, relevant_definitions
+
+    def put_plan(self, query_text, hypo_indexes, plan):
+        """
+        :param query_text:
+        :param hypo_indexes: {index definition: hypopg name} of the session.
+        :param plan:
+        :return:
+        """
+        plan_text = json.dumps(plan)
+        for definition, name in sorted(hypo_indexes.items(), key=lambda item: -len(item[1] or "")):
+            if name:
+                plan_text = plan_text.replace(name, HYPO_NAME_MARKER + definition)
+
+        self.plans[self._key(query_text, hypo_indexes.keys())] = plan_text
+
+    def get_plan(self, query_text, hypo_indexes):
+        key = self._key(query_text, hypo_indexes.keys())
+        if key not in self.plans:
+            self.misses += 1
+            raise ReplayMissError(f"The plan of the query `{key[0][:80]}...` "
+                                  f"under {sorted(key[1])} was not recorded.")
+        self.hits += 1
+
+        plan_text = self.plans[key]
+        if HYPO_NAME_MARKER in plan_text:
+            for definition in sorted(key[1], key=len, reverse=True):
+                plan_text = plan_text.replace(HYPO_NAME_MARKER + definition, hypo_indexes[definition])
+
+        return json.loads(plan_text)
+
+    def put_cost(self, query_text, index_definitions, cost):
+        self.costs[self._key(query_text, index_definitions)] = cost
+
+    def get_cost(self, query_text, index_definitions):
+        """
+        The cost recorded by `put_cost()`, or else the cost of the recorded plan.
+        :param query_text:
+        :param index_definitions:
+        :return:
+        """
+        key = self._key(query_text, index_definitions)
+        if key in self.costs:
+            self.hits += 1
+            return self.costs[key]
+        if key in self.plans:
+            self.hits += 1
+            return json.loads(self.plans[key])["Total Cost"]
+
+        self.misses += 1
+        raise ReplayMissError(f"The cost of the query `{key[0][:80]}...` "
+                              f"under {sorted(key[1])} was not recorded.")
+
+    def put_size(self, definition, size):
+        self.sizes[definition] = size
+
+    def get_size(self, definition):
+        if definition not in self.sizes:
+            raise ReplayMissError(f"The size of the index `{definition}` was not recorded.")
+        return self.sizes[definition]
+
+    def put_result(self, statement, one, result):
+        self.statements[(normalize_query_text(statement), one)] = result
+
+    def get_result(self, statement, one):
+        key = (normalize_query_text(statement), one)
+        if key not in self.statements:
+            raise ReplayMissError(f"The result of the statement `{key[0][:80]}...` was not recorded.")
+        return self.statements[key]
+
+
+class RecordingMixin:
+    """
+    Records the plans, the index sizes and the catalog fetched by a `PostgresDatabaseConnector`
+    (of any of the selection packages) into the class attribute `recording`,
+    see `recording_connector_class()`. The connectors cloned from it share the recording.
+    """
+
+    recording = None
+
+    def __init__(self, *args, **kwargs):
+        # {hypopg_oid: (index definition, hypopg name)} of the session.
+        self._hypo_indexes = dict()
+        # {index definition: hypopg name} of the indexes created by `create_indexes()` (`get_ind_plan()`).
+        self._created_indexes = dict()
+        super().__init__(*args, **kwargs)
+
+    def _session_indexes(self):
+        return {definition: name for definition, name in self._hypo_indexes.values()}
+
+    def _simulate_index(self, index):
+        result = super()._simulate_index(index)
+        self._hypo_indexes[result[0]] = (index_definition(index), result[1])
+
+        return result
+
+    def _simulate_indexes(self, indexes, drop_identifiers, store_size):
+        results = super()._simulate_indexes(indexes, drop_identifiers, store_size)
+        for identifier in drop_identifiers:
+            self._hypo_indexes.pop(identifier, None)
+        for index, (oid, name, size) in zip(indexes, results):
+            self._hypo_indexes[oid] = (index_definition(index), name)
+            if size is not None:
+                self.recording.put_size(index_definition(index), size)
+
+        return results
+
+    def _drop_simulated_index(self, oid):
+        super()._drop_simulated_index(oid)
+        self._hypo_indexes.pop(oid, None)
+
+    def drop_hypo_indexes(self):
+        super().drop_hypo_indexes()
+        self._hypo_indexes = dict()
+
+    def exec_fetch(self, statement, one=True):
+        result = super().exec_fetch(statement, one=one)
+
+        match = re.match(r"select hypopg_relation_size\((\d+)\)", statement)
+        if match is not None and int(match.group(1)) in self._hypo_indexes:
+            self.recording.put_size(self._hypo_indexes[int(match.group(1))][0], result[0])
+        elif is_catalog_read(statement):
+            self.recording.put_result(statement, one, result)
+
+        return result
+
+    def _get_plan(self, query):
+        plan = super()._get_plan(query)
+        self.recording.put_plan(query.text, self._session_indexes(), plan)
+
+        return plan
+
+    def _get_plans(self, queries):
+        plans = super()._get_plans(queries)
+        hypo_indexes = self._session_indexes()
+        for query, plan in zip(queries, plans):
+            self.recording.put_plan(query.text, hypo_indexes, plan)
+
+        return plans
+
+    def create_indexes(self, indexes, mode="hypo"):
+        self._created_indexes = dict()
+        super().create_indexes(indexes, mode)
+        if mode == "hypo":
+            # The hypopg names of the indexes just created (in the order of their oids),
+            # so that they are replaced in the recorded plans as the names of the session.
+            created = sorted(row[:2] for row in self.exec_fetch("select * from hypopg_list_indexes", one=False)
+                             if row[0] not in self._hypo_indexes)
+            self._created_indexes = {index_definition(index): name for index, (_, name) in zip(indexes, created)}
+
+    def get_ind_plan(self, query, indexes, mode="hypo"):
+        plan = super().get_ind_plan(query, indexes, mode=mode)
+        if mode == "hypo":
+            self.recording.put_plan(query, {index_definition(index): self._created_indexes.get(index_definition(index))
+                                            for index in indexes}, plan)
+
+        return plan
+
+    def get_ind_cost(self, query, indexes, mode="hypo"):
+        return self.get_ind_plan(query, indexes, mode=mode)["Total Cost"]
+
+    def get_ind_costs(self, queries, indexes, mode="hypo"):
+        costs = super().get_ind_costs(queries, indexes, mode=mode)
+        if mode == "hypo":
+            index_definitions = [index_definition(index) for index in indexes]
+            for query, cost in zip(queries, costs):
+                self.recording.put_cost(query, index_definitions, cost)
+
+        return costs
+
+    def get_tables(self):
+        tables = super().get_tables()
+        self.recording.catalog["tables"] = tables
+
+        return tables
+
+    def get_cols(self, table):
+        columns = super().get_cols(table)
+        self.recording.catalog["columns"][table] = columns
+
+        return columns
+
+
+def recording_connector_class(connector_class, recording):
+    """
+    :param connector_class: e.g., `PostgresDatabaseConnector` of heu_selection, swirl_selection or mcts_selection.
+    :param recording: `WhatIfRecording`.
+    :return: the subclass of `connector_class` that records into `recording`.
+    """
+    return type(f"Recording{connector_class.__name__}", (RecordingMixin, connector_class),
+                {"recording": recording})
+
+
+class ReplayDatabaseConnector(DatabaseConnector):
+    """
+    Serves the what-if answers of a `WhatIfRecording` without a database,
+    e.g., to profile the selection algorithms in isolation from the planner latency.
+    Requests that were not recorded raise `ReplayMissError`.
+    """
+
+    def __init__(self, recording, config=None, autocommit=True):
+        DatabaseConnector.__init__(self, config, autocommit=autocommit)
+
+        self.db_system = "postgres"
+        self.recording = recording
+
+        self.host, self.port, self.db_name, self.user, self.password = None, None, "replay", None, None
+        self.prepare_queries = False
+
+        # hypopg-like oids and names, {hypopg_oid: (index definition, hypopg name)}.
+        self._oids = itertools.count(1 << 20)
+        self._hypo_indexes = dict()
+
+    def _session_indexes(self):
+        return {definition: name for definition, name in self._hypo_indexes.values()}
+
+    def clone(self):
+        # The sessions of `WhatIfSessionPool` share the recording.
+        return ReplayDatabaseConnector(self.recording, self.config, autocommit=self.autocommit)
+
+    def create_connection(self):
+        pass
+
+    def close(self):
+        logging.debug("Replay connector closed.")
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def set_random_seed(self, value=0.17):
+        pass
+
+    def enable_prepared_queries(self):
+        return False
+
+    def exec_only(self, statement):
+        raise NotImplementedError(f"The replay connector cannot execute `{statement}`.")
+
+    def exec_fetch(self, statement, one=True):
+        match = re.match(r"select hypopg_relation_size\((\d+)\)", statement)
+        if match is not None:
+            return self.recording.get_size(self._hypo_indexes[int(match.group(1))][0]),
+        if "hypopg_list_indexes" in statement:
+            rows = [(oid, name) for oid, (_, name) in self._hypo_indexes.items()]
+            return rows[0] if one else rows
+        if is_catalog_read(statement):
+            return self.recording.get_result(statement, one)
+
+        raise ReplayMissError(f"The replay connector cannot execute `{statement}`.")
+
+    def exec_query(self, query, timeout=None, cost_evaluation=False):
+        raise NotImplementedError("The actual runtimes are not recorded.")
+
+    def _new_hypo_index(self, definition):
+        oid = next(self._oids)
+        return oid, f"<{oid}>btree_{definition.replace('#', '_').replace(',', '_')}"
+
+    def _simulate_index(self, index):
+        definition = index_definition(index)
+        oid, name = self._new_hypo_index(definition)
+        self._hypo_indexes[oid] = (definition, name)
+
+        return oid, name
+
+    def _simulate_indexes(self, indexes, drop_identifiers, store_size):
+        for identifier in drop_identifiers:
+            self._hypo_indexes.pop(identifier)
+
+        results = list()
+        for index in indexes:
+            oid, name = self._simulate_index(index)
+            size = self.recording.get_size(index_definition(index)) if store_size else None
+            results.append((oid, name, size))
+
+        return results
+
+    def _drop_simulated_index(self, oid):
+        self._hypo_indexes.pop(oid)
+
+    def drop_hypo_indexes(self):
+        self._hypo_indexes = dict()
+
+    def drop_indexes(self):
+        pass
+
+    def _get_plan(self, query):
+        return self.recording.get_plan(query.text, self._session_indexes())
+
+    def _get_cost(self, query):
+        return self._get_plan(query)["Total Cost"]
+
+    def get_ind_plan(self, query, indexes, mode="hypo"):
+        hypo_indexes = dict()
+        for index in indexes:
+            definition = index_definition(index)
+            hypo_indexes[definition] = self._new_hypo_index(definition)[1]
+
+        return self.recording.get_plan(query, hypo_indexes)
+
+    def get_ind_cost(self, query, indexes, mode="hypo"):
+        return self.recording.get_cost(query, [index_definition(index) for index in indexes])
+
+    def get_ind_costs(self, queries, indexes, mode="hypo"):
+        index_definitions = [index_definition(index) for index in indexes]
+        return [self.recording.get_cost(query, index_definitions) for query in queries]
+
+    def get_tables(self):
+        if self.recording.catalog["tables"] is None:
+            raise ReplayMissError("The tables were not recorded.")
+        return self.recording.catalog["tables"]
+
+    def get_cols(self, table):
+        if table not in self.recording.catalog["columns"]:
+            raise ReplayMissError(f"The columns of the table `{table}` were not recorded.")
+        return self.recording.catalog["columns"][table]
+
+
+def create_whatif_connector(connector_class, config, whatif_record=None, whatif_replay=None,
+                            merge_shards=False, **kwargs):
+    """
+    :param connector_class: the `PostgresDatabaseConnector` to be recorded / replaced.
+    :param config:
+    :param whatif_record: record the what-if answers of the live run into this file.
+    :param whatif_replay: serve the what-if answers from this file (no database is connected).
+    :param merge_shards: also load the shards `{whatif_replay}.*` (e.g., of the SWIRL environments).
+    :param kwargs: the arguments of `connector_class`.
+    :return:
+    """
+    if whatif_replay is not None:
+        return ReplayDatabaseConnector(WhatIfRecording(whatif_replay, merge_shards=merge_shards), config)
+    if whatif_record is not None:
+        connector_class = recording_connector_class(connector_class, WhatIfRecording(whatif_record))
+
+    return connector_class(config, **kwargs)
+
+
+def save_whatif_recording(connector):
+    if isinstance(connector, RecordingMixin):
+        connector.recording.save()
+    elif isinstance(connector, ReplayDatabaseConnector):
+        logging.info(f"Replay {connector.recording.hits} plans "
+                     f"({connector.recording.misses} not recorded).")
@@ -13,6 +13,10 @@ class WhatIfIndexCreation:
         self.simulated_indexes = {}
         self.db_connector = db_connector
 
+        # : newly added. the sizes estimated locally instead of by `hypopg_relation_size`,
+        # see `index_size_estimator.py`.
+        self.size_estimator = None
+
     def simulate_index(self, potential_index, store_size=False):
         result = self.db_connector.simulate_index(potential_index)
         index_oid = result[0]
@@ -22,13 +26,41 @@ class WhatIfIndexCreation:
         potential_index.hypopg_oid = index_oid
 
         if store_size:
-            potential_index.estimated_size = self.estimate_index_size(index_oid)
+            # : newly modified. for the analytic size estimation.
+            if self.size_estimator is not None:
+                potential_index.estimated_size = self.size_estimator.estimate(potential_index)
+            else:
+                potential_index.estimated_size = self.estimate_index_size(index_oid)
 
     def drop_simulated_index(self, index):
         oid = index.hypopg_oid
         self.db_connector.drop_simulated_index(oid)
         del self.simulated_indexes[oid]
 
+    # : newly added. Simulate `potential_indexes` and drop `dropped_indexes` in one round trip.
+    def simulate_indexes(self, potential_indexes, dropped_indexes=None, store_size=False):
+        if dropped_indexes is None:
+            dropped_indexes = list()
+
+        # : newly modified. the analytic sizes are not fetched from the database.
+        results = self.db_connector.simulate_indexes(potential_indexes,
+                                                     [index.hypopg_oid for index in dropped_indexes],
+                                                     store_size=store_size and self.size_estimator is None)
+        for index in dropped_indexes:
+            del self.simulated_indexes[index.hypopg_oid]
+
+        for potential_index, (index_oid, index_name, index_size) in zip(potential_indexes, results):
+            self.simulated_indexes[index_oid] = index_name
+            potential_index.hypopg_name = index_name
+            potential_index.hypopg_oid = index_oid
+
+            if store_size:
+                if self.size_estimator is not None:
+                    index_size = self.size_estimator.estimate(potential_index)
+                elif index_size is None:
+                    index_size = self.estimate_index_size(index_oid)
+                potential_index.estimated_size = index_size
+
     def all_simulated_indexes(self):
     
         try:
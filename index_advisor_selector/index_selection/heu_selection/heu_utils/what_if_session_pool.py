@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: what_if_session_pool
+# @Author: Wei Zhou
+# @Time: 2024/1/9 15:42
+
+import time
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .record_replay import ReplayDatabaseConnector
+
+
+class WhatIfSessionPool:
+    """
+    A pool of extra database sessions used to cost the queries in parallel.
+
+    Hypothetical indexes of hypopg only exist in the session that created them,
+    therefore every session mirrors the configuration to be evaluated before costing
+    (only the delta to the configuration it currently holds is simulated / dropped).
+    The counters of the sessions are transferred to the primary connector,
+    so that the overhead reported by the algorithms stays comparable.
+    """
+
+    def __init__(self, db_connector, sessions=4):
+        self.db_connector = db_connector
+        self.sessions = [self.clone_connector(db_connector) for _ in range(sessions)]
+        # {index: (hypopg_oid, hypopg_name)} of every session.
+        self.simulated_indexes = [dict() for _ in range(sessions)]
+
+        self.executor = ThreadPoolExecutor(max_workers=sessions)
+
+        logging.info(f"Create {sessions} what-if sessions for the parallel cost estimation.")
+
+    @staticmethod
+    def clone_connector(db_connector):
+        if isinstance(db_connector, ReplayDatabaseConnector):
+            return db_connector.clone()
+
+        session = db_connector.__class__(db_connector.config, autocommit=True,
+                                         host=db_connector.host, port=db_connector.port,
+                                         db_name=db_connector.db_name, user=db_connector.user,
+                                         password=db_connector.password)
+        if getattr(db_connector, "prepare_queries", False):
+            session.enable_prepared_queries()
+
+        return session
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _mirror_configuration(self, session_id, indexes, store_size=False):
+        session = self.sessions[session_id]
+        simulated = self.simulated_indexes[session_id]
+
+        dropped_indexes = [index for index in simulated.keys() if index not in indexes]
+        added_indexes = [index for index in set(indexes) if index not in simulated]
+        if len(dropped_indexes) != 0 or len(added_indexes) != 0:
+            result = session.simulate_indexes(added_indexes, [simulated[index][0] for index in dropped_indexes],
+                                              store_size=store_size)
+            for index in dropped_indexes:
+                simulated.pop(index)
+            for index, (oid, name, size) in zip(added_indexes, result):
+                simulated[index] = (oid, name, size)
+
+        if not store_size:
+            return None
+
+        # : newly added. for the parallel candidate scoring, the sizes are reported as well.
+        sizes = dict()
+        for index in set(indexes):
+            oid, name, size = simulated[index]
+            if size is None:
+                size = session.exec_fetch(f"select hypopg_relation_size({oid})")[0]
+                simulated[index] = (oid, name, size)
+            sizes[index] = size
+
+        return sizes
+
+    def _plan_results(self, session_id, plans, with_utilization=False):
+        if not with_utilization:
+            return [plan["Total Cost"] for plan in plans]
+
+        # The hypopg names differ from session to session,
+        # the utilized indexes are therefore resolved here.
+        simulated = self.simulated_indexes[session_id]
+        results = list()
+        for plan in plans:
+            plan_str = str(plan)
+            utilized_indexes = frozenset(index for index, (_, name, _) in simulated.items()
+                                         if name in plan_str)
+            results.append((plan["Total Cost"], utilized_indexes))
+
+        return results
+
+    def _cost_shard(self, session_id, indexes, queries, with_utilization=False):
+        self._mirror_configuration(session_id, indexes)
+
+        plans = self.sessions[session_id].get_plans(queries)
+
+        return self._plan_results(session_id, plans, with_utilization)
+
+    def _cost_tasks(self, session_id, tasks, with_utilization=False, store_size=False):
+        results = list()
+        for indexes, queries in tasks:
+            sizes = self._mirror_configuration(session_id, indexes, store_size=store_size)
+            plans = self.sessions[session_id].get_plans(queries) if len(queries) != 0 else list()
+            results.append((self._plan_results(session_id, plans, with_utilization), sizes))
+
+        return results
+
+    def cost_queries(self, indexes, queries, with_utilization=False):
+        """
+        Cost `queries` under the hypothetical configuration `indexes`.
+        The queries are sharded into contiguous chunks, one per session.
+        :param indexes:
+        :param queries:
+        :param with_utilization: return `(cost, utilized_indexes)` instead of `cost`.
+        :return: the costs in the order of `queries`.
+        """
+        if len(queries) == 0:
+            return list()
+
+        shard_num = min(len(self.sessions), len(queries))
+        shard_size = -(-len(queries) // shard_num)
+
+        start_time = time.time()
+        futures = [self.executor.submit(self._cost_shard, session_id, indexes,
+                                        queries[session_id * shard_size:(session_id + 1) * shard_size],
+                                        with_utilization)
+                   for session_id in range(shard_num)]
+        costs = list()
+        for future in futures:
+            costs.extend(future.result())
+        end_time = time.time()
+
+        self._transfer_counters(end_time - start_time)
+
+        return costs
+
+    def cost_configurations(self, tasks, with_utilization=False, store_size=False):
+        """
+        Cost several hypothetical configurations at once, e.g., the candidates scored in one step
+        of a greedy heuristic. Task i is assigned to session i % len(self), the tasks of a session
+        are processed in order, so the assignment (and the result) does not depend on the timing.
+        :param tasks: [(indexes, queries)].
+        :param with_utilization: return `(cost, utilized_indexes)` instead of `cost`.
+        :param store_size: return the estimated sizes of the indexes as well.
+        :return: [(costs, sizes)] in the order of `tasks`, `sizes` is None if not `store_size`.
+        """
+        if len(tasks) == 0:
+            return list()
+        if len(tasks) == 1 and not store_size:
+            indexes, queries = tasks[0]
+            return [(self.cost_queries(indexes, queries, with_utilization), None)]
+
+        session_num = min(len(self.sessions), len(tasks))
+
+        start_time = time.time()
+        futures = [self.executor.submit(self._cost_tasks, session_id, tasks[session_id::session_num],
+                                        with_utilization, store_size)
+                   for session_id in range(session_num)]
+        session_results = [future.result() for future in futures]
+        end_time = time.time()
+
+        self._transfer_counters(end_time - start_time)
+
+        return [session_results[task_id % session_num][task_id // session_num]
+                for task_id in range(len(tasks))]
+
+    def get_ind_costs(self, queries, indexes, mode="hypo"):
+        """
+        The sharded version of `get_ind_cost()`, see `PostgresDatabaseConnector.get_ind_costs()`.
+        :param queries: the query texts.
+        :param indexes: table#col1,col2#col1,col2,col3
+        :param mode:
+        :return: the costs in the order of `queries`.
+        """
+        if len(queries) == 0:
+            return list()
+
+        shard_num = min(len(self.sessions), len(queries))
+        shard_size = -(-len(queries) // shard_num)
+
+        futures = [self.executor.submit(self.sessions[session_id].get_ind_costs,
+                                        queries[session_id * shard_size:(session_id + 1) * shard_size],
+                                        indexes, mode)
+                   for session_id in range(shard_num)]
+        costs = list()
+        for future in futures:
+            costs.extend(future.result())
+
+        return costs
+
+    def _transfer_counters(self, duration):
+        # The wall-clock time of the parallel costing (the mirroring included)
+        # instead of the summed time of the sessions is accounted.
+        for session in self.sessions:
+            self.db_connector.cost_estimations += session.cost_estimations
+            self.db_connector.simulated_indexes += session.simulated_indexes
+            session.cost_estimations, session.simulated_indexes = 0, 0
+            session.cost_estimation_duration, session.index_simulation_duration = 0, 0
+        self.db_connector.cost_estimation_duration += duration
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for session in self.sessions:
+            session.drop_hypo_indexes()
+            session.close()
+        self.sessions = list()
+        self.simulated_indexes = list()
@@ -1,4 +1,18 @@
-from .index import Index
+import sys
+
+from .index import Index, get_slotted_state, set_slotted_state
+
+# : newly added. for the bitmask relevance filter.
+# {(table_name, column_name): column_id}, equal columns share one id (and one bit).
+COLUMN_IDS = dict()
+
+
+def columns_mask(columns):
+    mask = 0
+    for column in columns:
+        mask |= 1 << column.column_id
+
+    return mask
 
 
 class Workload:
@@ -17,9 +31,26 @@ class Workload:
 
 
 class Column:
+    # : newly modified. slotted, with the hash and the id cached.
+    __slots__ = ("name", "_table", "_hash", "_column_id")
+
     def __init__(self, name):
-        self.name = name.lower()
-        self.table = None
+        self.name = sys.intern(name.lower())
+        self._table = None
+
+        self._hash = None
+        self._column_id = None
+
+    # The cached hash / id depend on the table, hence are reset once it is (re)assigned.
+    @property
+    def table(self):
+        return self._table
+
+    @table.setter
+    def table(self, table):
+        self._table = table
+        self._hash = None
+        self._column_id = None
 
     def __lt__(self, other):
         return self.name < other.name
@@ -34,22 +65,48 @@ class Column:
     def __eq__(self, other):
         if not isinstance(other, Column):
             return False
+        if self is other:
+            return True
 
         assert (
-            self.table is not None and other.table is not None
+            self._table is not None and other._table is not None
         ), "Table objects should not be None for Column.__eq__()"
 
-        return self.table.name == other.table.name and self.name == other.name
+        return self.name == other.name and self._table.name == other._table.name
 
     def __hash__(self):
-        return hash((self.name, self.table.name))
+        if self._hash is None:
+            self._hash = hash((self.name, self._table.name))
+        return self._hash
+
+    def __getstate__(self):
+        state = get_slotted_state(self)
+        state["table"] = self._table
+
+        return state
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
+
+    # : newly added. for the bitmask relevance filter.
+    @property
+    def column_id(self):
+        if self._column_id is None:
+            self._column_id = COLUMN_IDS.setdefault((self.table.name, self.name), len(COLUMN_IDS))
+
+        return self._column_id
 
 
 class Table:
+    # : newly modified. slotted, with the hash cached (as long as no column is added).
+    __slots__ = ("name", "columns", "_hash")
+
     def __init__(self, name):
-        self.name = name.lower()
+        self.name = sys.intern(name.lower())
         self.columns = []
 
+        self._hash = None
+
     def __lt__(self, other):
         return self.name < other.name
 
@@ -67,14 +124,27 @@ class Table:
     def __eq__(self, other):
         if not isinstance(other, Table):
             return False
+        if self is other:
+            return True
 
         return self.name == other.name and tuple(self.columns) == tuple(other.columns)
 
     def __hash__(self):
-        return hash((self.name, tuple(self.columns)))
+        if self._hash is None or self._hash[0] != len(self.columns):
+            self._hash = (len(self.columns), hash((self.name, tuple(self.columns))))
+        return self._hash[1]
+
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
 
 
 class Query:
+    # : newly modified. slotted.
+    __slots__ = ("nr", "text", "frequency", "columns", "_column_mask")
+
     def __init__(self, query_id, query_text, columns=None, frequency=1):
         self.nr = query_id
         self.text = query_text
@@ -86,5 +156,24 @@ class Query:
         else:
             self.columns = columns
 
+        self._column_mask = None
+
     def __repr__(self):
         return f"Q{self.nr}"
+
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
+
+    # : newly added. for the bitmask relevance filter.
+    # The mask is recomputed once `columns` is replaced or extended.
+    @property
+    def column_mask(self):
+        cached = self._column_mask
+        if cached is None or cached[0] is not self.columns or cached[1] != len(self.columns):
+            cached = (self.columns, len(self.columns), columns_mask(self.columns))
+            self._column_mask = cached
+
+        return cached[2]
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# @Project: index_eab
+# @Module: workload_compression
+# @Author: Wei Zhou
+# @Time: 2024/1/14 10:12
+
+import logging
+
+import numpy as np
+
+from .workload import Workload, Query
+from .cost_cache import normalize_query_text
+
+
+def query_signature(query):
+    """
+    The indexable columns of `query`, the queries with the same signature
+    share the relevant indexes (of every configuration).
+    :param query:
+    :return:
+    """
+    return frozenset(query.columns)
+
+
+def cost_profiles(workload, cost_evaluation):
+    """
+    The cost of every query relative to its cost without indexes under
+    every single-column index on its indexable columns (the probe configurations).
+    The costs are cached by `cost_evaluation`, e.g., for the first step of Extend.
+    :param workload:
+    :param cost_evaluation:
+    :return: ({query: cost without indexes}, {query: {index: relative cost}}).
+    """
+    base_costs = dict(zip(workload.queries, cost_evaluation.calculate_query_costs(workload, [])))
+    profiles = {query: dict() for query in workload.queries}
+    for index in workload.potential_indexes():
+        queries = [query for query in workload.queries if index.columns[0] in query.columns]
+        costs = cost_evaluation.calculate_query_costs(Workload(queries), [index], store_size=True)
+        for query, cost in zip(queries, costs):
+            profiles[query][index] = cost / base_costs[query] if base_costs[query] > 0 else 1.
+
+    return base_costs, profiles
+
+
+def embed_workload(workload, embedder, db_connector=None):
+    """
+    Embed the queries with an embedder of `swirl_utils/workload_embedder.py`,
+    the plan embedders embed the plans (without indexes) retrieved by `db_connector`.
+    :param workload:
+    :param embedder:
+    :param db_connector:
+    :return: [embedding] in the order of `workload.queries`.
+    """
+    if hasattr(embedder, "plan_embedding_cache"):
+        return embedder.get_embeddings(db_connector.get_plans(workload.queries))
+
+    return embedder.get_embeddings(workload)
+
+
+def compress_workload(workload, max_loss=0.05, cost_evaluation=None, embeddings=None):
+    """
+    Replace the clusters of similar queries by a weighted representative.
+    Only the queries with the same indexable columns (see `query_signature()`) are clustered,
+    the heaviest query of a cluster is its representative (leader clustering).
+    The queries are similar if
+    1) `cost_evaluation`: their relative costs under the probe configurations (see `cost_profiles()`)
+       deviate by at most `max_loss`. The frequency of the representative preserves the cost
+       (without indexes) of its cluster, the benefit of every probe configuration then deviates
+       from the one on `workload` by at most `loss_bound` (relative to the cost of `workload`);
+    2) `embeddings`: the cosine distance of their embeddings (see `embed_workload()`)
+       is at most `max_loss`, the frequencies of the cluster are summed up, the loss is not bounded;
+    3) otherwise: their normalized texts are identical (lossless).
+    :param workload:
+    :param max_loss: the knob trading the compression ratio against the recommendation quality.
+    :param cost_evaluation:
+    :param embeddings:
+    :return: (the compressed workload, {"clusters": {representative: [query]}, "ratio", "loss_bound"}).
+    """
+    base_costs, profiles = None, None
+    if cost_evaluation is not None:
+        base_costs, profiles = cost_profiles(workload, cost_evaluation)
+    if embeddings is not None:
+        embeddings = {query: np.asarray(embedding, dtype=float) / (np.linalg.norm(embedding) or 1.)
+                      for query, embedding in zip(workload.queries, embeddings)}
+    texts = {query: normalize_query_text(query.text) for query in workload.queries}
+
+    def weight(query):
+        return query.frequency * (base_costs[query] if base_costs is not None else 1.)
+
+    def distance(query, leader):
+        if texts[query] == texts[leader]:
+            return 0.
+        if profiles is not None:
+            return max([abs(relative_cost - profiles[leader][index])
+                        for index, relative_cost in profiles[query].items()], default=0.)
+        if embeddings is not None:
+            return 1. - float(embeddings[query] @ embeddings[leader])
+        return float("inf")
+
+    # {signature: [leader]}, {leader: [(query, distance)]}
+    leaders, clusters = dict(), dict()
+    order = {query: position for position, query in enumerate(workload.queries)}
+    for query in sorted(workload.queries, key=lambda q: (-weight(q), order[q])):
+        signature_leaders = leaders.setdefault(query_signature(query), list())
+        for leader in signature_leaders:
+            query_distance = distance(query, leader)
+            if query_distance <= max_loss:
+                clusters[leader].append((query, query_distance))
+                break
+        else:
+            signature_leaders.append(query)
+            clusters[query] = [(query, 0.)]
+
+    compressed_queries, representatives = list(), dict()
+    loss = 0
+    for leader in sorted(clusters.keys(), key=lambda q: order[q]):
+        members = clusters[leader]
+        if base_costs is not None and base_costs[leader] > 0:
+            frequency = sum(weight(query) for query, _ in members) / base_costs[leader]
+        else:
+            frequency = sum(query.frequency for query, _ in members)
+        representative = Query(leader.nr, leader.text, leader.columns, frequency=frequency)
+        compressed_queries.append(representative)
+        representatives[representative] = [query for query, _ in members]
+        loss += sum(weight(query) * query_distance for query, query_distance in members)
+
+    loss_bound = None
+    if base_costs is not None:
+        total_cost = sum(weight(query) for query in workload.queries)
+        loss_bound = loss / total_cost if total_cost > 0 else 0.
+
+    ratio = len(compressed_queries) / len(workload.queries) if len(workload.queries) != 0 else 1.
+    logging.info(f"Compress the workload from {len(workload.queries)} to {len(compressed_queries)} queries "
+                 f"(loss bound: {loss_bound}).")
+
+    return Workload(compressed_queries), {"clusters": representatives, "ratio": ratio, "loss_bound": loss_bound}
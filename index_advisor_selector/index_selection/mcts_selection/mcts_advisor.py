@@ -12,9 +12,10 @@ import logging
 import configparser
 
 from index_advisor_selector.index_selection.heu_selection.heu_utils.heu_com import get_utilized_indexes, get_columns_from_schema
+from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_cache import PersistentCostCache
 from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import candidates_per_query, \
     syntactically_relevant_indexes_dqn_rule, \
-    syntactically_relevant_indexes_openGauss
+    syntactically_relevant_indexes_openGauss, prune_candidates_by_benefit_bound
 
 from .mcts_model import State, Node, MCTS
 
@@ -33,6 +34,10 @@ class MCTSAdvisor:
         self.database_connector = database_connector
         self.database_connector.drop_indexes()
         self.cost_evaluation = CostEvaluation(database_connector)
+        # : newly added. for the cross-run (disk-backed) cost cache.
+        if getattr(self.parameters, "cost_cache_file", None) is not None:
+            self.cost_evaluation.persistent_cache = PersistentCostCache(database_connector,
+                                                                        self.parameters.cost_cache_file)
 
         self.mcts_tree = None
 
@@ -99,12 +104,17 @@ class MCTSAdvisor:
 
         # Generate syntactically relevant candidates
         # (0917): newly added.
-        if self.parameters.cand_gen is None or self.parameters.cand_gen == "permutation":
+        # : newly modified. `permutation_bound`: prune the permutations by their benefit bound.
+        if self.parameters.cand_gen is None or self.parameters.cand_gen in ["permutation", "permutation_bound"]:
             potential_index = candidates_per_query(
                 Workload(workload),
                 self.parameters.max_index_width,
                 candidate_generator=syntactically_relevant_indexes,
             )
+            if self.parameters.cand_gen == "permutation_bound":
+                potential_index = prune_candidates_by_benefit_bound(
+                    Workload(workload), potential_index, self.cost_evaluation,
+                    getattr(self.parameters, "bound_fraction", 0.1))
 
         elif self.parameters.cand_gen == "dqn_rule":
             db_conf = configparser.ConfigParser()
@@ -15,6 +15,8 @@ from index_advisor_selector.index_selection.mcts_selection.mcts_utils.mcts_com i
 from index_advisor_selector.index_selection.mcts_selection.mcts_utils.cost_evaluation import CostEvaluation
 from index_advisor_selector.index_selection.mcts_selection.mcts_utils.postgres_dbms import PostgresDatabaseConnector
 from index_advisor_selector.index_selection.mcts_selection.mcts_utils.mcts_workload import Index
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import create_whatif_connector, \
+    save_whatif_recording
 
 
 class MCTSEncoder(json.JSONEncoder):
@@ -47,7 +49,14 @@ def get_mcts_res(args, work_list):
     if args.db_name is not None:
         db_conf["postgresql"]["database"] = args.db_name
 
-    database_connector = PostgresDatabaseConnector(db_conf, autocommit=True)
+    # : newly modified. for the what-if record / replay.
+    database_connector = create_whatif_connector(PostgresDatabaseConnector, db_conf,
+                                                 whatif_record=getattr(args, "whatif_record", None),
+                                                 whatif_replay=getattr(args, "whatif_replay", None),
+                                                 autocommit=True)
+    # : newly added. PREPARE the queries once and cost them with `EXPLAIN EXECUTE`.
+    if "prepared_queries" in args and args.prepared_queries:
+        database_connector.enable_prepared_queries()
 
     # (0818): newly added.
     if os.path.exists(args.model_load):
@@ -82,18 +91,26 @@ def get_mcts_res(args, work_list):
     no_cost, ind_cost = list(), list()
     total_no_cost, total_ind_cost = 0, 0
 
+    # : newly modified. batched, each configuration is created once.
+    query_texts = [query.text for query in workload]
+    baseline_costs = database_connector.get_ind_costs(query_texts, "", mode="hypo")
+    selected_costs = database_connector.get_ind_costs(query_texts, indexes_pre, mode="hypo")
+
     freq_list = list()
-    for query in workload:
-        cost = database_connector.get_ind_cost(query.text, "", mode="hypo") * query.frequency
+    for query, baseline_cost, selected_cost in zip(workload, baseline_costs, selected_costs):
+        cost = baseline_cost * query.frequency
         total_no_cost += cost
         no_cost.append(cost)
 
-        cost = database_connector.get_ind_cost(query.text, indexes_pre, mode="hypo") * query.frequency
+        cost = selected_cost * query.frequency
         total_ind_cost += cost
         ind_cost.append(cost)
 
         freq_list.append(query.frequency)
 
+    # : newly added. for the what-if record / replay.
+    save_whatif_recording(database_connector)
+
     data = {"config": vars(args),
             "workload": [work_list, freq_list],
             "indexes": indexes_pre,
@@ -22,6 +22,11 @@ class CostEvaluation:
 
         self.relevant_indexes_cache = {}
 
+        # : newly added. for the cross-run (disk-backed) cost cache,
+        # see `heu_selection/heu_utils/cost_cache.py`.
+        self.persistent_cache = None
+        self.persistent_cache_hits = 0
+
     def estimate_size(self, index):
         # : Refactor: It is currently too complicated to compute
         # We must search in current indexes to get an index object with .hypopg_oid
@@ -71,12 +76,20 @@ class CostEvaluation:
         self._prepare_cost_calculation(indexes, store_size=store_size)
         total_cost = 0
 
+        # : newly added. The cache misses are costed with batched EXPLAINs beforehand.
+        prefetched_costs = dict()
+        if self.cost_estimation == "whatif":
+            prefetched_costs = self._request_cache_batch(workload.queries, indexes)
+
         # : Make query cost higher for queries which are running often
         for query in workload.queries:
             self.cost_requests += 1
             # total_cost += self._request_cache(query, indexes)
             # (0824): newly modified.
-            total_cost += self._request_cache(query, indexes) * query.frequency
+            if query in prefetched_costs:
+                total_cost += prefetched_costs.pop(query) * query.frequency
+            else:
+                total_cost += self._request_cache(query, indexes) * query.frequency
         return total_cost
 
     # def calculate_cost(self, workload, indexes, store_size=False):
@@ -112,10 +125,19 @@ class CostEvaluation:
     # missing indexes and unsimulating/dropping indexes
     # that exist but are not in the combination.
     def _prepare_cost_calculation(self, indexes, store_size=False):
-        for index in set(indexes) - self.current_indexes:
-            self._simulate_or_create_index(index, store_size=store_size)
-        for index in self.current_indexes - set(indexes):
-            self._unsimulate_or_drop_index(index)
+        # : newly modified. The whole delta is simulated / dropped in one round trip.
+        if self.cost_estimation == "whatif":
+            added_indexes = list(set(indexes) - self.current_indexes)
+            dropped_indexes = list(self.current_indexes - set(indexes))
+            if len(added_indexes) != 0 or len(dropped_indexes) != 0:
+                self.what_if.simulate_indexes(added_indexes, dropped_indexes, store_size=store_size)
+                self.current_indexes -= set(dropped_indexes)
+                self.current_indexes |= set(added_indexes)
+        else:
+            for index in set(indexes) - self.current_indexes:
+                self._simulate_or_create_index(index, store_size=store_size)
+            for index in self.current_indexes - set(indexes):
+                self._unsimulate_or_drop_index(index)
 
         assert self.current_indexes == set(indexes)
 
@@ -148,7 +170,11 @@ class CostEvaluation:
 
         assert self.current_indexes == set()
 
-    def _request_cache(self, query, indexes):
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+            self.persistent_cache = None
+
+    def _lookup_relevant_indexes(self, query, indexes):
         q_i_hash = (query, frozenset(indexes))
         if q_i_hash in self.relevant_indexes_cache:
             relevant_indexes = self.relevant_indexes_cache[q_i_hash]
@@ -156,16 +182,75 @@ class CostEvaluation:
             relevant_indexes = self._relevant_indexes(query, indexes)
             self.relevant_indexes_cache[q_i_hash] = relevant_indexes
 
+        return relevant_indexes
+
+    def _request_cache(self, query, indexes):
+        relevant_indexes = self._lookup_relevant_indexes(query, indexes)
+
         # Check if query and corresponding relevant indexes in cache
         if (query, relevant_indexes) in self.cache:
             self.cache_hits += 1
             return self.cache[(query, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost = self._get_cost(query)
+            cost = self._request_persistent_cache(query, relevant_indexes)
             self.cache[(query, relevant_indexes)] = cost
             return cost
 
+    # : newly added.
+    def _request_cache_batch(self, queries, indexes):
+        """
+        Cost all the cache misses of `queries` under `indexes` with batched EXPLAINs.
+        Queries with views are left to the (serial) `_request_cache`.
+        :param queries:
+        :param indexes:
+        :return: {query: cost} of the queries that were not cached before.
+        """
+        costs, missed_queries, missed_keys = dict(), list(), list()
+        for query in queries:
+            relevant_indexes = self._lookup_relevant_indexes(query, indexes)
+            if (query, relevant_indexes) in self.cache or query in costs \
+                    or query in missed_queries or "create view" in query.text:
+                continue
+
+            if self.persistent_cache is not None:
+                cost = self.persistent_cache.get(query.text, relevant_indexes)
+                if cost is not None:
+                    self.persistent_cache_hits += 1
+                    self.cache[(query, relevant_indexes)] = cost
+                    costs[query] = cost
+                    continue
+
+            missed_queries.append(query)
+            missed_keys.append((query, relevant_indexes))
+
+        if len(missed_queries) == 0:
+            return costs
+
+        missed_plans = self.db_connector.get_plans(missed_queries)
+        for (query, relevant_indexes), plan in zip(missed_keys, missed_plans):
+            cost = plan["Total Cost"]
+            self.cache[(query, relevant_indexes)] = cost
+            if self.persistent_cache is not None:
+                self.persistent_cache.put(query.text, relevant_indexes, cost)
+            costs[query] = cost
+
+        return costs
+
+    def _request_persistent_cache(self, query, relevant_indexes):
+        # The persistent cache is only valid for the what-if costs.
+        if self.persistent_cache is None or self.cost_estimation != "whatif":
+            return self._get_cost(query)
+
+        cost = self.persistent_cache.get(query.text, relevant_indexes)
+        if cost is not None:
+            self.persistent_cache_hits += 1
+            return cost
+
+        cost = self._get_cost(query)
+        self.persistent_cache.put(query.text, relevant_indexes, cost)
+        return cost
+
     @staticmethod
     def _relevant_indexes(query, indexes):
         relevant_indexes = [
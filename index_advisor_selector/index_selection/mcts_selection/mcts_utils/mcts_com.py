@@ -29,6 +29,8 @@ def get_parser():
     # (1118): newly added.
     parser.add_argument("--is_utilized", action="store_true")
     parser.add_argument("--cand_gen", default=None)
+    # : newly added. `permutation_bound`: the benefit upper-bound candidate pruning.
+    parser.add_argument("--bound_fraction", type=float, default=0.1)
 
     # 1. MCTS configuration.
     parser.add_argument("--mcts_seed", type=int, default=666)
@@ -64,6 +66,14 @@ def get_parser():
     parser.add_argument("--res_save", type=str,
                         default="/data/wz/index/index_eab/eab_olap/bench_temp/tpch/tpch_work_temp_multi_w18_n10_eval.json")
 
+    # : newly added. for the cross-run (disk-backed) cost cache.
+    parser.add_argument("--cost_cache_file", type=str, default=None)
+    # : newly added. PREPARE the queries once and cost them with `EXPLAIN EXECUTE`.
+    parser.add_argument("--prepared_queries", action="store_true")
+    # : newly added. record the what-if answers of a live run / replay them without a database.
+    parser.add_argument("--whatif_record", type=str, default=None)
+    parser.add_argument("--whatif_replay", type=str, default=None)
+
     parser.add_argument("--host", type=str, default=None)
     parser.add_argument("--db_name", type=str, default=None)
     parser.add_argument("--port", type=str, default=None)
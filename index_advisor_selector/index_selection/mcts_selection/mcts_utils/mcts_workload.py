@@ -4,14 +4,22 @@
 # @Author: Wei Zhou
 # @Time: 2022/11/2 19:54
 
+import sys
 from functools import total_ordering
 
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index import get_slotted_state, set_slotted_state
+
 
 class Table:
+    # : newly modified. slotted, with the hash cached (as long as no column is added).
+    __slots__ = ("name", "columns", "_hash")
+
     def __init__(self, name):
-        self.name = name.lower()
+        self.name = sys.intern(name.lower())
         self.columns = []
 
+        self._hash = None
+
     def add_column(self, column):
         column.table = self
         self.columns.append(column)
@@ -26,21 +34,45 @@ class Table:
     def __eq__(self, other):
         if not isinstance(other, Table):
             return False
+        if self is other:
+            return True
 
         return self.name == other.name and tuple(self.columns) == tuple(other.columns)
 
     def __hash__(self):
-        return hash((self.name, tuple(self.columns)))
+        if self._hash is None or self._hash[0] != len(self.columns):
+            self._hash = (len(self.columns), hash((self.name, tuple(self.columns))))
+        return self._hash[1]
+
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
 
 
 class Column:
+    # : newly modified. slotted, with the hash cached.
+    __slots__ = ("name", "_table", "_hash")
+
     def __init__(self, name, table=None):
-        self.name = name.lower()
+        self.name = sys.intern(name.lower())
 
-        self.table = None
+        self._table = None
+        self._hash = None
         if table is not None:
             self.table = table
 
+    # The cached hash depends on the table, hence is reset once it is (re)assigned.
+    @property
+    def table(self):
+        return self._table
+
+    @table.setter
+    def table(self, table):
+        self._table = table
+        self._hash = None
+
     def __lt__(self, other):
         return self.name < other.name
 
@@ -53,18 +85,34 @@ class Column:
     def __eq__(self, other):
         if not isinstance(other, Column):
             return False
+        if self is other:
+            return True
 
         assert (
-                self.table is not None and other.table is not None
+                self._table is not None and other._table is not None
         ), "Table objects should not be None for Column.__eq__()"
 
-        return self.table.name == other.table.name and self.name == other.name
+        return self.name == other.name and self._table.name == other._table.name
 
     def __hash__(self):
-        return hash((self.name, self.table.name))
+        if self._hash is None:
+            self._hash = hash((self.name, self._table.name))
+        return self._hash
+
+    def __getstate__(self):
+        state = get_slotted_state(self)
+        state["table"] = self._table
+
+        return state
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
 
 
 class Query:
+    # : newly modified. slotted.
+    __slots__ = ("nr", "text", "frequency", "columns")
+
     def __init__(self, query_id, query_text, columns=None, frequency=1):
         self.nr = query_id
         self.text = query_text
@@ -79,6 +127,12 @@ class Query:
     def __repr__(self):
         return f"Q{self.nr}"
 
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
+
 
 class Workload:
     def __init__(self, queries):
@@ -97,18 +151,44 @@ class Workload:
 
 @total_ordering
 class Index:
+    # : newly modified. slotted, with the hash and the sort key cached.
+    __slots__ = ("columns", "estimated_size", "hypopg_name", "hypopg_oid", "_hash", "_sort_key")
+
     def __init__(self, columns, estimated_size=None):
         if len(columns) == 0:
             raise ValueError("Index needs at least 1 column")
         self.columns = tuple(columns)
         self.estimated_size = estimated_size
         self.hypopg_name = None
+        self.hypopg_oid = None
+
+        self._hash = None
+        self._sort_key = None
+
+    @property
+    def sort_key(self):
+        # The names define the order, the candidates are hence enumerated (and the ties broken) as before.
+        if self._sort_key is None:
+            self._sort_key = (tuple(column.name for column in self.columns),
+                              tuple(column.table.name for column in self.columns))
+        return self._sort_key
 
     def __lt__(self, other):
         if len(self.columns) != len(other.columns):
             return len(self.columns) < len(other.columns)
 
-        return self.columns < other.columns
+        # : newly modified. The same order as `self.columns < other.columns`
+        # (the first columns that differ are compared by name), on the precomputed names.
+        names, tables = self._sort_key or self.sort_key
+        other_names, other_tables = other._sort_key or other.sort_key
+        if tables == other_tables or names == other_names:
+            return names < other_names
+        for name, table, other_name, other_table in zip(names, tables, other_names, other_tables):
+            if name != other_name:
+                return name < other_name
+            if table != other_table:
+                return False
+        return False
 
     def __repr__(self):
         columns_string = ",".join(map(str, self.columns))
@@ -117,11 +197,21 @@ class Index:
     def __eq__(self, other):
         if not isinstance(other, Index):
             return False
+        if self is other:
+            return True
 
-        return self.columns == other.columns
+        return hash(self) == hash(other) and self.columns == other.columns
 
     def __hash__(self):
-        return hash(self.columns)
+        if self._hash is None:
+            self._hash = hash(self.columns)
+        return self._hash
+
+    def __getstate__(self):
+        return get_slotted_state(self)
+
+    def __setstate__(self, state):
+        set_slotted_state(self, state)
 
     def _column_names(self):
         return [x.name for x in self.columns]
@@ -29,6 +29,27 @@ class WhatIfIndexCreation:
         self.db_connector.drop_simulated_index(oid)
         del self.simulated_indexes[oid]
 
+    # : newly added. Simulate `potential_indexes` and drop `dropped_indexes` in one round trip.
+    def simulate_indexes(self, potential_indexes, dropped_indexes=None, store_size=False):
+        if dropped_indexes is None:
+            dropped_indexes = list()
+
+        results = self.db_connector.simulate_indexes(potential_indexes,
+                                                     [index.hypopg_oid for index in dropped_indexes],
+                                                     store_size=store_size)
+        for index in dropped_indexes:
+            del self.simulated_indexes[index.hypopg_oid]
+
+        for potential_index, (index_oid, index_name, index_size) in zip(potential_indexes, results):
+            self.simulated_indexes[index_oid] = index_name
+            potential_index.hypopg_name = index_name
+            potential_index.hypopg_oid = index_oid
+
+            if store_size:
+                if index_size is None:
+                    index_size = self.estimate_index_size(index_oid)
+                potential_index.estimated_size = index_size
+
     @property
     def all_simulated_indexes(self):
         
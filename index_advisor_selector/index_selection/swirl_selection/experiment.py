@@ -150,6 +150,22 @@ class Experiment(object):
         if "reward_calculator" in self.args and self.args.reward_calculator is not None:
             self.exp_config["reward_calculator"] = self.args.reward_calculator
 
+        # : newly added. for the cross-run (disk-backed) cost cache.
+        if "cost_cache_file" in self.args and self.args.cost_cache_file is not None:
+            self.exp_config["cost_cache_file"] = self.args.cost_cache_file
+        # : newly added. for the memory-bounded cost / plan cache.
+        if "cache_max_entries" in self.args and self.args.cache_max_entries is not None:
+            self.exp_config["cache_max_entries"] = self.args.cache_max_entries
+        if "cache_max_mb" in self.args and self.args.cache_max_mb is not None:
+            self.exp_config["cache_max_bytes"] = int(self.args.cache_max_mb * 1024 * 1024)
+        if "cache_compress_plans" in self.args and self.args.cache_compress_plans:
+            self.exp_config["cache_compress_plans"] = True
+        # : newly added. for the what-if record / replay.
+        if "whatif_record" in self.args and self.args.whatif_record is not None:
+            self.exp_config["whatif_record"] = self.args.whatif_record
+        if "whatif_replay" in self.args and self.args.whatif_replay is not None:
+            self.exp_config["whatif_replay"] = self.args.whatif_replay
+
     def _init_times(self):
         """
         Record the experiment start/end time
@@ -291,6 +307,14 @@ class Experiment(object):
             self.globally_index_candidates = swirl_com.create_column_permutation_indexes(
                 globally_indexable_columns, self.exp_config["max_index_width"])
 
+        # : newly added. for the benefit upper-bound candidate pruning.
+        elif self.args.cand_gen == "permutation_bound":
+            self.globally_index_candidates = swirl_com.create_column_permutation_indexes(
+                globally_indexable_columns, self.exp_config["max_index_width"])
+            self.globally_index_candidates = swirl_com.prune_column_permutation_indexes(
+                self.globally_index_candidates, self.workload_generator.representative_queries(),
+                self.schema.db_config, getattr(self.args, "bound_fraction", 0.1))
+
         elif self.args.cand_gen == "dqn_rule":
             if self.args.temp_expand:
                 temp_load = self.args.temp_load
@@ -332,10 +356,14 @@ class Experiment(object):
         # (0820): newly added. `args.algo`
         if self.args.algo != "swirl" or "NonMasking" in self.exp_config["action_manager"]:
             self.action_storage_consumptions = swirl_com.predict_index_sizes(
-                self.globally_index_candidates_flat, self.schema.db_config, is_precond=False)
+                self.globally_index_candidates_flat, self.schema.db_config, is_precond=False,
+                analytic_size=getattr(self.args, "analytic_size", False),
+                validation_samples=getattr(self.args, "size_validation_samples", 20))
         else:  # `swirl` or `masking`
             self.action_storage_consumptions = swirl_com.predict_index_sizes(
-                self.globally_index_candidates_flat, self.schema.db_config, is_precond=True)
+                self.globally_index_candidates_flat, self.schema.db_config, is_precond=True,
+                analytic_size=getattr(self.args, "analytic_size", False),
+                validation_samples=getattr(self.args, "size_validation_samples", 20))
 
         # 4) Workload embedding / representation.
         if (self.args.algo == "swirl" or self.args.algo == "dqn") \
@@ -532,6 +560,12 @@ class Experiment(object):
                     "env_id": env_id,
                     "constraint": self.exp_config["constraint"],
                     "similar_workloads": self.exp_config["workload"]["similar_workloads"],
+                    "cost_cache_file": self.exp_config.get("cost_cache_file", None),
+                    "cache_max_entries": self.exp_config.get("cache_max_entries", None),
+                    "cache_max_bytes": self.exp_config.get("cache_max_bytes", None),
+                    "cache_compress_plans": self.exp_config.get("cache_compress_plans", False),
+                    "whatif_record": self.exp_config.get("whatif_record", None),
+                    "whatif_replay": self.exp_config.get("whatif_replay", None),
                 },
                 db_config=db_config
             )
@@ -650,10 +684,14 @@ class Experiment(object):
         self.cache_hits = 0
         self.cost_requests = 0
         self.costing_time = datetime.timedelta(0)
+        # : newly added. the statistics of the (bounded) caches, summed over the environments.
+        self.cache_stats = dict()
         for cache_info in training_env.env_method("get_cost_eval_cache_info"):
             self.cache_hits += cache_info[1]
             self.cost_requests += cache_info[0]
             self.costing_time += cache_info[2]
+            for key, value in cache_info[3].items():
+                self.cache_stats[key] = self.cache_stats.get(key, 0) + value
         self.costing_time /= self.exp_config["parallel_environments"]
 
         self.cache_hit_ratio = self.cache_hits / self.cost_requests * 100
@@ -690,7 +728,8 @@ class Experiment(object):
                            "estimation_duration": estimation_duration,
                            "estimation_num": estimation_num,
                            "simulation_num": simulation_num,
-                           "simulation_duration": simulation_duration}, wf, indent=2)
+                           "simulation_duration": simulation_duration,
+                           "cache_stats": self.cache_stats}, wf, indent=2)
 
     def finish_evaluation(self):
         """
@@ -984,6 +1023,7 @@ class Experiment(object):
                     f"{self.cache_hit_ratio:.2f} ({self.cache_hits} of {self.cost_requests})\n"
                 )
             )
+            f.write(f"CostEval cache statistics:     {self.cache_stats}\n")
             training_time = self.training_end_time - self.training_start_time
             f.write(
                 f"Cost eval time (% of total):   {self.costing_time} ({self.costing_time / training_time * 100:.2f}%)\n"
@@ -10,6 +10,9 @@ from index_advisor_selector.index_selection.swirl_selection.swirl_utils.swirl_co
 from index_advisor_selector.index_selection.swirl_selection.swirl_utils.index import Index
 from index_advisor_selector.index_selection.swirl_selection.swirl_utils.cost_evaluation import CostEvaluation
 from index_advisor_selector.index_selection.swirl_selection.swirl_utils.postgres_dbms import PostgresDatabaseConnector
+from index_advisor_selector.index_selection.heu_selection.heu_utils.cost_cache import PersistentCostCache, BoundedCostCache
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import create_whatif_connector, \
+    save_whatif_recording
 
 # (0805): newly added. for `number`.
 MAX_INDEX_NUM = 5
@@ -40,9 +43,25 @@ class DBEnvV1(gym.Env):
         # db_config["postgresql"]["user"] = "postgres"
         # db_config["postgresql"]["password"] = "ai4db2021"
 
-        self.connector = PostgresDatabaseConnector(db_config, autocommit=True)
+        # : newly modified. for the what-if record / replay (one recording shard per environment).
+        whatif_record = config.get("whatif_record", None)
+        if whatif_record is not None:
+            whatif_record = f"{whatif_record}.{environment_type.name.lower()}{self.env_id}"
+        self.connector = create_whatif_connector(PostgresDatabaseConnector, db_config,
+                                                 whatif_record=whatif_record,
+                                                 whatif_replay=config.get("whatif_replay", None),
+                                                 merge_shards=True, autocommit=True)
         self.connector.drop_indexes()
         self.cost_evaluation = CostEvaluation(self.connector)
+        # : newly added. for the cross-run (disk-backed) cost cache.
+        if config.get("cost_cache_file", None) is not None:
+            self.cost_evaluation.persistent_cache = PersistentCostCache(self.connector, config["cost_cache_file"])
+        # : newly added. for the memory-bounded cost / plan cache.
+        if config.get("cache_max_entries", None) is not None or config.get("cache_max_bytes", None) is not None \
+                or config.get("cache_compress_plans", False):
+            self.cost_evaluation.cache = BoundedCostCache(max_entries=config.get("cache_max_entries", None),
+                                                          max_bytes=config.get("cache_max_bytes", None),
+                                                          compress_plans=config.get("cache_compress_plans", False))
 
         self.globally_index_candidates = config["globally_index_candidates"]
 
@@ -285,7 +304,15 @@ class DBEnvV1(gym.Env):
         return environment_state
 
     def get_cost_eval_cache_info(self):
-        return self.cost_evaluation.cost_requests, self.cost_evaluation.cache_hits, self.cost_evaluation.costing_time
+        # : newly modified. The statistics of the (bounded) cache are returned as well.
+        cache = self.cost_evaluation.cache
+        if isinstance(cache, BoundedCostCache):
+            cache_stats = cache.stats()
+        else:
+            cache_stats = {"entries": len(cache)}
+
+        return self.cost_evaluation.cost_requests, self.cost_evaluation.cache_hits, \
+            self.cost_evaluation.costing_time, cache_stats
 
     def get_cost_eval_cache(self):
         return self.cost_evaluation.cache
@@ -297,6 +324,12 @@ class DBEnvV1(gym.Env):
         pass
 
     def close(self):
+        # : newly added. for the what-if record / replay.
+        save_whatif_recording(self.connector)
+        # : newly added. for the cross-run (disk-backed) cost cache.
+        if self.cost_evaluation.persistent_cache is not None:
+            self.cost_evaluation.persistent_cache.close()
+            self.cost_evaluation.persistent_cache = None
         print("close() was called")
 
     # END OF NOT IMPLEMENTED ##########
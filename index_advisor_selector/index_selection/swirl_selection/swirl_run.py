@@ -22,6 +22,8 @@ from index_eab.eab_algo.swirl_selection.swirl_utils.workload import Query, Workl
 from index_eab.eab_algo.swirl_selection.swirl_utils.cost_evaluation import CostEvaluation
 from index_eab.eab_algo.swirl_selection.swirl_utils.postgres_dbms import PostgresDatabaseConnector
 from index_eab.eab_algo.swirl_selection.stable_baselines.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
+from index_advisor_selector.index_selection.heu_selection.heu_utils.record_replay import create_whatif_connector, \
+    save_whatif_recording
 
 
 # https://github.com/hill-a/stable-baselines/issues/599
@@ -37,10 +39,14 @@ def pre_infer_obj(exp_load, model_load, env_load, db_conf=None):
     if db_conf is not None and db_conf["postgresql"]["database"] != swirl_exp.schema.db_config["postgresql"]["database"]:
         if swirl_exp.args.algo != "swirl" or "NonMasking" in swirl_exp.exp_config["action_manager"]:
             swirl_exp.action_storage_consumptions = swirl_com.predict_index_sizes(
-                swirl_exp.globally_index_candidates_flat, db_conf, is_precond=False)
+                swirl_exp.globally_index_candidates_flat, db_conf, is_precond=False,
+                analytic_size=getattr(swirl_exp.args, "analytic_size", False),
+                validation_samples=getattr(swirl_exp.args, "size_validation_samples", 20))
         else:  # `swirl` or `masking`
             swirl_exp.action_storage_consumptions = swirl_com.predict_index_sizes(
-                swirl_exp.globally_index_candidates_flat, db_conf, is_precond=True)
+                swirl_exp.globally_index_candidates_flat, db_conf, is_precond=True,
+                analytic_size=getattr(swirl_exp.args, "analytic_size", False),
+                validation_samples=getattr(swirl_exp.args, "size_validation_samples", 20))
 
     if "max_indexes" not in swirl_exp.exp_config.keys():
         swirl_exp.exp_config["max_indexes"] = 5
@@ -153,13 +159,20 @@ def get_swirl_res(args, work_list, swirl_exp=None, swirl_model=None):
     # np.mean([item["achieved_cost"] for item in performances])
 
     performances[0]["time_duration"] = time_end - time_start
+    # : newly added. save the what-if recording (shard) of the evaluation environment.
+    evaluation_env.close()
 
     no_cost, ind_cost = list(), list()
     total_no_cost, total_ind_cost = 0, 0
 
     # (0926): newly modified.
     # swirl_exp.schema.db_config → swirl_exp.workload_generator.db_config
-    connector = PostgresDatabaseConnector(swirl_exp.schema.db_config, autocommit=True)
+    # : newly modified. for the what-if record / replay.
+    whatif_record = swirl_exp.exp_config.get("whatif_record", None)
+    connector = create_whatif_connector(PostgresDatabaseConnector, swirl_exp.schema.db_config,
+                                        whatif_record=f"{whatif_record}.run" if whatif_record else None,
+                                        whatif_replay=swirl_exp.exp_config.get("whatif_replay", None),
+                                        merge_shards=True, autocommit=True)
     connector.drop_indexes()
     cost_evaluation = CostEvaluation(connector)
 
@@ -181,6 +194,8 @@ def get_swirl_res(args, work_list, swirl_exp=None, swirl_model=None):
         indexes_pre.append(index_pre)
     indexes_pre.sort()
 
+    save_whatif_recording(connector)
+
     data = {"workload": work_list,
             "indexes": indexes_pre,
             "no_cost": no_cost,
@@ -36,10 +36,13 @@ class CostEvaluation:
         # It is not necessary to drop hypothetical indexes during __init__().
         # These are only created per connection. Hence, non should be present.
 
-        self.relevant_indexes_cache = {}
-
         self.costing_time = datetime.timedelta(0)
 
+        # : newly added. for the cross-run (disk-backed) cost cache,
+        # see `heu_selection/heu_utils/cost_cache.py`.
+        self.persistent_cache = None
+        self.persistent_cache_hits = 0
+
         # self.model = load_model_tree()
         # self.model = load_model_lib()
         # self.model = load_model_former()
@@ -93,14 +96,23 @@ class CostEvaluation:
         return recommended_indexes, cost
 
     def _prepare_cost_calculation(self, indexes, store_size=False):
-        # Creates the current index combination by
-        # simulating / creating missing indexes.
-        for index in set(indexes) - self.current_indexes:
-            self._simulate_or_create_index(index, store_size=store_size)
-        # Unsimulating / dropping indexes
-        # that exist but are not in the combination.
-        for index in self.current_indexes - set(indexes):
-            self._unsimulate_or_drop_index(index)
+        # : newly modified. The whole delta is simulated / dropped in one round trip.
+        if self.cost_estimation == "whatif":
+            added_indexes = list(set(indexes) - self.current_indexes)
+            dropped_indexes = list(self.current_indexes - set(indexes))
+            if len(added_indexes) != 0 or len(dropped_indexes) != 0:
+                self.what_if.simulate_indexes(added_indexes, dropped_indexes, store_size=store_size)
+                self.current_indexes -= set(dropped_indexes)
+                self.current_indexes |= set(added_indexes)
+        else:
+            # Creates the current index combination by
+            # simulating / creating missing indexes.
+            for index in set(indexes) - self.current_indexes:
+                self._simulate_or_create_index(index, store_size=store_size)
+            # Unsimulating / dropping indexes
+            # that exist but are not in the combination.
+            for index in self.current_indexes - set(indexes):
+                self._unsimulate_or_drop_index(index)
 
         assert self.current_indexes == set(indexes)
 
@@ -125,12 +137,20 @@ class CostEvaluation:
         self._prepare_cost_calculation(indexes, store_size=store_size)
         total_cost = 0
 
+        # : newly added. The cache misses are costed with batched EXPLAINs beforehand.
+        prefetched_costs = dict()
+        if self.cost_estimation == "whatif":
+            prefetched_costs = self._request_cache_batch_by_qtext(workload.queries, indexes)
+
         # : Make query cost higher for queries which are running often
         for query in workload.queries:
             self.cost_requests += 1
             # (0822): newly modified.
             # total_cost += self._request(query, indexes) * query.frequency
-            total_cost += self._request_cache_by_qtext(query, indexes) * query.frequency
+            if query.text in prefetched_costs:
+                total_cost += prefetched_costs.pop(query.text) * query.frequency
+            else:
+                total_cost += self._request_cache_by_qtext(query, indexes) * query.frequency
             # total_cost += self._request_cache(query, indexes) * query.frequency
         return total_cost
 
@@ -177,12 +197,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -214,12 +229,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -257,12 +267,7 @@ class CostEvaluation:
         for query in workload.queries:
             self.cost_requests += 1
 
-            q_i_hash = (query, frozenset(indexes))
-            if q_i_hash in self.relevant_indexes_cache:
-                relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-            else:
-                relevant_indexes = self._relevant_indexes(query, indexes)
-                self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+            relevant_indexes = self._relevant_indexes(query, indexes)
 
             # Check if query and corresponding relevant indexes in cache
             if (query, relevant_indexes) in self.cache:
@@ -291,11 +296,17 @@ class CostEvaluation:
         plans = []
         costs = []
 
+        # : newly added. The cache misses are costed with batched EXPLAINs beforehand.
+        prefetched_plans = self._request_cache_batch_by_qtext(workload.queries, indexes, with_plans=True)
+
         for query in workload.queries:
             self.cost_requests += 1
             # (0822): newly modified.
             # cost, plan = self._request_plans(query, indexes)
-            cost, plan = self._request_cache_plans_by_qtext(query, indexes)
+            if query.text in prefetched_plans:
+                cost, plan = prefetched_plans.pop(query.text)
+            else:
+                cost, plan = self._request_cache_plans_by_qtext(query, indexes)
             # cost, plan = self._request_cache_plans(query, indexes)
             total_cost += cost * query.frequency
             plans.append(plan)
@@ -325,13 +336,12 @@ class CostEvaluation:
 
         assert self.current_indexes == set()
 
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+            self.persistent_cache = None
+
     def _request_cache(self, query, indexes):
-        q_i_hash = (query, frozenset(indexes))
-        if q_i_hash in self.relevant_indexes_cache:
-            relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-        else:
-            relevant_indexes = self._relevant_indexes(query, indexes)
-            self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+        relevant_indexes = self._relevant_indexes(query, indexes)
 
         # Check if query and corresponding relevant indexes in cache
         if (query, relevant_indexes) in self.cache:
@@ -339,17 +349,12 @@ class CostEvaluation:
             return self.cache[(query, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost = self._get_cost(query)
+            cost = self._request_persistent_cache(query, relevant_indexes)
             self.cache[(query, relevant_indexes)] = cost
             return cost
 
     def _request_cache_by_qtext(self, query, indexes):
-        q_i_hash = (query.text, frozenset(indexes))
-        if q_i_hash in self.relevant_indexes_cache:
-            relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-        else:
-            relevant_indexes = self._relevant_indexes(query, indexes)
-            self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+        relevant_indexes = self._relevant_indexes(query, indexes)
 
         # Check if query and corresponding relevant indexes in cache
         if (query.text, relevant_indexes) in self.cache:
@@ -357,7 +362,7 @@ class CostEvaluation:
             return self.cache[(query.text, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost = self._get_cost(query)
+            cost = self._request_persistent_cache(query, relevant_indexes)
             self.cache[(query.text, relevant_indexes)] = cost
             return cost
 
@@ -367,12 +372,7 @@ class CostEvaluation:
         return cost
 
     def _request_cache_plans(self, query, indexes):
-        q_i_hash = (query, frozenset(indexes))
-        if q_i_hash in self.relevant_indexes_cache:
-            relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-        else:
-            relevant_indexes = self._relevant_indexes(query, indexes)
-            self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+        relevant_indexes = self._relevant_indexes(query, indexes)
 
         # Check if query and corresponding relevant indexes in cache
         if (query, relevant_indexes) in self.cache:
@@ -380,19 +380,14 @@ class CostEvaluation:
             return self.cache[(query, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost, plan = self._get_cost_plan(query)
+            cost, plan = self._request_persistent_cache_plans(query, relevant_indexes)
             self.cache[(query, relevant_indexes)] = (cost, plan)
 
             return cost, plan
 
     # (0822): newly added.
     def _request_cache_plans_by_qtext(self, query, indexes):
-        q_i_hash = (query.text, frozenset(indexes))
-        if q_i_hash in self.relevant_indexes_cache:
-            relevant_indexes = self.relevant_indexes_cache[q_i_hash]
-        else:
-            relevant_indexes = self._relevant_indexes(query, indexes)
-            self.relevant_indexes_cache[q_i_hash] = relevant_indexes
+        relevant_indexes = self._relevant_indexes(query, indexes)
 
         # Check if query and corresponding relevant indexes in cache
         if (query.text, relevant_indexes) in self.cache:
@@ -400,11 +395,82 @@ class CostEvaluation:
             return self.cache[(query.text, relevant_indexes)]
         # If no cache hit request cost from database system
         else:
-            cost, plan = self._get_cost_plan(query)
+            cost, plan = self._request_persistent_cache_plans(query, relevant_indexes)
             self.cache[(query.text, relevant_indexes)] = (cost, plan)
 
             return cost, plan
 
+    # : newly added.
+    def _request_cache_batch_by_qtext(self, queries, indexes, with_plans=False):
+        """
+        Cost all the cache misses of `queries` under `indexes` with batched EXPLAINs.
+        Queries with views are left to the (serial) `_request_cache(_plans)_by_qtext`.
+        :param queries:
+        :param indexes:
+        :param with_plans: cache and return `(cost, plan)` instead of `cost`.
+        :return: {query_text: cost or (cost, plan)} of the queries that were not cached before.
+        """
+        costs, missed_queries, missed_keys = dict(), list(), list()
+        for query in queries:
+            relevant_indexes = self._relevant_indexes(query, indexes)
+
+            if (query.text, relevant_indexes) in self.cache or query.text in costs \
+                    or (query.text, relevant_indexes) in missed_keys or "create view" in query.text:
+                continue
+
+            if self.persistent_cache is not None:
+                cost = self.persistent_cache.get(query.text, relevant_indexes, with_plan=with_plans)
+                if cost is not None:
+                    self.persistent_cache_hits += 1
+                    self.cache[(query.text, relevant_indexes)] = cost
+                    costs[query.text] = cost
+                    continue
+
+            missed_queries.append(query)
+            missed_keys.append((query.text, relevant_indexes))
+
+        if len(missed_queries) == 0:
+            return costs
+
+        missed_plans = self.db_connector.get_plans(missed_queries)
+        for (query_text, relevant_indexes), plan in zip(missed_keys, missed_plans):
+            cost = plan["Total Cost"]
+            if self.persistent_cache is not None:
+                self.persistent_cache.put(query_text, relevant_indexes, cost, plan if with_plans else None)
+            if with_plans:
+                cost = (cost, plan)
+            self.cache[(query_text, relevant_indexes)] = cost
+            costs[query_text] = cost
+
+        return costs
+
+    def _request_persistent_cache(self, query, relevant_indexes):
+        # The persistent cache is only valid for the what-if costs.
+        if self.persistent_cache is None or self.cost_estimation != "whatif":
+            return self._get_cost(query)
+
+        cost = self.persistent_cache.get(query.text, relevant_indexes)
+        if cost is not None:
+            self.persistent_cache_hits += 1
+            return cost
+
+        cost = self._get_cost(query)
+        self.persistent_cache.put(query.text, relevant_indexes, cost)
+        return cost
+
+    def _request_persistent_cache_plans(self, query, relevant_indexes):
+        if self.persistent_cache is None:
+            return self._get_cost_plan(query)
+
+        cost_plan = self.persistent_cache.get(query.text, relevant_indexes, with_plan=True)
+        if cost_plan is not None:
+            self.persistent_cache_hits += 1
+            return cost_plan
+
+        cost, plan = self._get_cost_plan(query)
+        self.persistent_cache.put(query.text, relevant_indexes, cost, plan)
+        return cost, plan
+
     # (0822): newly added.
     def _request_plans(self, query, indexes):
         cost, plan = self._get_cost_plan(query)
@@ -413,7 +479,9 @@ class CostEvaluation:
 
     @staticmethod
     def _relevant_indexes(query, indexes):
+        # : newly modified. A bitwise AND of the column masks, see `workload.py`.
+        query_mask = query.column_mask
         relevant_indexes = [
-            x for x in indexes if any(c in query.columns for c in x.columns)
+            x for x in indexes if x.column_mask & query_mask
         ]
         return frozenset(relevant_indexes)
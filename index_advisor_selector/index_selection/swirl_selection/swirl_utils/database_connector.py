@@ -17,6 +17,9 @@ class DatabaseConnector:
         self.cost_estimation_duration = 0
         self.index_simulation_duration = 0
 
+        # : newly added. {query_text: (view_statements, query_statement, cleanup_statements)}
+        self._query_statements = dict()
+
     def exec_only(self, statement):
         self._cursor.execute(statement)
 
@@ -48,21 +51,44 @@ class DatabaseConnector:
         statement = f"drop index {index.index_idx()}"
         self.exec_only(statement)
 
+    def _split_query(self, query_text):
+        """
+        Split the query text into the `create view` statements to be executed beforehand,
+        the statement to be costed and the `drop view` statements to be executed afterwards.
+        The result is memoized since the same query is costed many times.
+        :param query_text:
+        :return:
+        """
+        if query_text in self._query_statements:
+            return self._query_statements[query_text]
+
+        view_statements, query_statement = list(), None
+        if "create view" in query_text:
+            for query_statement_ in query_text.split(";"):
+                if "create view" in query_statement_:
+                    view_statements.append(query_statement_)
+                elif "select" in query_statement_ or "SELECT" in query_statement_:
+                    query_statement = query_statement_
+                    break
+        else:
+            query_statement = query_text
+        cleanup_statements = [query_statement_ for query_statement_ in query_text.split(";")
+                              if "drop view" in query_statement_]
+
+        self._query_statements[query_text] = (view_statements, query_statement, cleanup_statements)
+
+        return self._query_statements[query_text]
+
     def _prepare_query(self, query):
         try:
-            if "create view" in query.text:
-                for query_statement in query.text.split(";"):
-                    if "create view" in query_statement:
-                        try:
-                            self.exec_only(query_statement)
-                        except Exception as e:
-                            logging.error(e)
-                            logging.error(traceback.format_exc())
-                    elif "select" in query_statement or "SELECT" in query_statement:
-                        return query_statement
-                        # queries.append(query_statement)
-            else:
-                return query.text
+            view_statements, query_statement, _ = self._split_query(query.text)
+            for view_statement in view_statements:
+                try:
+                    self.exec_only(view_statement)
+                except Exception as e:
+                    logging.error(e)
+                    logging.error(traceback.format_exc())
+            return query_statement
         except:
             print(1)
 
@@ -82,6 +108,20 @@ class DatabaseConnector:
         end_time = time.time()
         self.index_simulation_duration += end_time - start_time
 
+    # : newly added. Simulate the `indexes` and drop the simulated indexes
+    # with `drop_identifiers` at once (one round trip for the whole configuration delta).
+    def simulate_indexes(self, indexes, drop_identifiers=None, store_size=False):
+        if drop_identifiers is None:
+            drop_identifiers = list()
+        self.simulated_indexes += len(indexes)
+
+        start_time = time.time()
+        result = self._simulate_indexes(indexes, drop_identifiers, store_size)
+        end_time = time.time()
+        self.index_simulation_duration += end_time - start_time
+
+        return result
+
     def get_cost(self, query):
         self.cost_estimations += 1
 
@@ -104,6 +144,17 @@ class DatabaseConnector:
 
         return plan
 
+    # : newly added. The batched version of get_plan(), the plans are returned in order.
+    def get_plans(self, queries):
+        self.cost_estimations += len(queries)
+
+        start_time = time.time()
+        plans = self._get_plans(queries)
+        end_time = time.time()
+        self.cost_estimation_duration += end_time - start_time
+
+        return plans
+
     def table_exists(self, table_name):
         raise NotImplementedError
 
@@ -125,8 +176,17 @@ class DatabaseConnector:
     def _get_plan(self, query):
         raise NotImplementedError
 
+    def _get_plans(self, queries):
+        return [self._get_plan(query) for query in queries]
+
     def _simulate_index(self, index):
         raise NotImplementedError
 
     def _drop_simulated_index(self, identifier):
         raise NotImplementedError
+
+    def _simulate_indexes(self, indexes, drop_identifiers, store_size):
+        # The size is left to be estimated separately, see `WhatIfIndexCreation`.
+        for identifier in drop_identifiers:
+            self._drop_simulated_index(identifier)
+        return [tuple(self._simulate_index(index)[:2]) + (None,) for index in indexes]
@@ -5,6 +5,19 @@ import psycopg2
 
 from .database_connector import DatabaseConnector
 
+# : newly added. EXPLAIN a batch of statements within one round trip,
+# the hypothetical indexes of the session are visible to the nested EXPLAIN.
+EXPLAIN_FUNCTION = """
+create or replace function pg_temp.eab_explain(statement text) returns json as $$
+declare
+    plan json;
+begin
+    execute 'explain (format json) ' || statement into plan;
+    return plan;
+end
+$$ language plpgsql
+"""
+
 
 class PostgresDatabaseConnector(DatabaseConnector):
     def __init__(self, config, autocommit=False, host=None,
@@ -14,6 +27,12 @@ class PostgresDatabaseConnector(DatabaseConnector):
         self.db_system = "postgres"
         self._connection = None
 
+        # : newly added. the number of EXPLAINs sent in one round trip by get_plans().
+        self.plan_batch_size = 64
+        # : newly added. PREPARE each query once per session and
+        # cost it with `EXPLAIN EXECUTE`, see `enable_prepared_queries()`.
+        self.prepare_queries = False
+
         if host is not None:
             self.host = host
         else:
@@ -56,6 +75,10 @@ class PostgresDatabaseConnector(DatabaseConnector):
                                             password=self.password)
         self._connection.autocommit = self.autocommit
         self._cursor = self._connection.cursor()
+        # The temporary function only lives as long as the session.
+        self._explain_function_created = False
+        # {query_text: statement_name or None (not preparable)}, also per session.
+        self._prepared_statements = dict()
         logging.debug("Database connector created: {} on {}".format(self.db_name, self.host))
 
     def set_random_seed(self, value=0.17):
@@ -105,6 +128,51 @@ class PostgresDatabaseConnector(DatabaseConnector):
 
         return query_text
 
+    def enable_prepared_queries(self):
+        """
+        Parse and analyze every query only once per session (PREPARE) and
+        cost it with `EXPLAIN (FORMAT JSON) EXECUTE` afterwards.
+        The statements are prepared with a dummy parameter and `plan_cache_mode = force_custom_plan`,
+        so that they are re-planned against the current hypothetical indexes at every EXPLAIN
+        (hypopg does not invalidate cached generic plans).
+        :return: whether the mode is enabled (requires PostgreSQL 12+).
+        """
+        try:
+            self.exec_only("set plan_cache_mode = force_custom_plan")
+        except Exception as e:
+            logging.warning(f"Prepared queries are not supported: {e}")
+            if not self.autocommit:
+                self.rollback()
+            return False
+
+        self.prepare_queries = True
+        return True
+
+    def _prepared_statement(self, query):
+        """
+        :param query:
+        :return: the name of the prepared statement of the query,
+                 None for queries with views or queries that can not be prepared.
+        """
+        if query.text in self._prepared_statements:
+            return self._prepared_statements[query.text]
+
+        view_statements, query_statement, cleanup_statements = self._split_query(query.text)
+        statement_name = None
+        if len(view_statements) == 0 and len(cleanup_statements) == 0:
+            statement_name = f"eab_query_{len(self._prepared_statements)}"
+            try:
+                self.exec_only(f"prepare {statement_name}(int) as {query_statement.strip().rstrip(';')}")
+            except Exception as e:
+                logging.warning(f"Query {query.nr} can not be prepared: {e}")
+                if not self.autocommit:
+                    self.rollback()
+                statement_name = None
+
+        self._prepared_statements[query.text] = statement_name
+
+        return statement_name
+
     def create_database(self, database_name):
         self.exec_only("create database {}".format(database_name))
         logging.info("Database {} created".format(database_name))
@@ -143,13 +211,10 @@ class PostgresDatabaseConnector(DatabaseConnector):
             return True
         return False
 
-    def _simulate_index(self, index):
+    @staticmethod
+    def _hypo_index_statement(index):
         table_name = index.table()
-        statement = (
-            "select * from hypopg_create_index("
-            f"'create index on {table_name} "
-            f"({index.joined_column_names()})')"
-        )
+        statement = f"create index on {table_name} ({index.joined_column_names()})"
 
         # (0415): newly added. for column_name = keyword
         if "group" in statement:
@@ -158,10 +223,49 @@ class PostgresDatabaseConnector(DatabaseConnector):
             statement = statement.replace(",group,", ",\"group\",")
             statement = statement.replace(",group)", "\"group\")")
 
+        return statement
+
+    def _simulate_index(self, index):
+        statement = f"select * from hypopg_create_index('{self._hypo_index_statement(index)}')"
         result = self.exec_fetch(statement)
 
         return result
 
+    def _simulate_indexes(self, indexes, drop_identifiers, store_size):
+        """
+        Drop and create the hypothetical indexes (and fetch their sizes) in a single statement.
+        :param indexes:
+        :param drop_identifiers: the oids of the hypothetical indexes to be dropped.
+        :param store_size:
+        :return: [(oid, name, size or None)] in the order of `indexes`.
+        """
+        drop_identifiers = [int(identifier) for identifier in drop_identifiers]
+        if len(indexes) == 0:
+            if len(drop_identifiers) != 0:
+                self._cursor.execute("select count(*) from unnest(%s::oid[]) as d(oid) "
+                                     "where hypopg_drop_index(d.oid)", (drop_identifiers,))
+                dropped = self._cursor.fetchone()[0]
+                assert dropped == len(drop_identifiers), \
+                    f"Could not drop simulated indexes with oid in {drop_identifiers}."
+            return list()
+
+        size = "hypopg_relation_size(h.indexrelid)" if store_size else "null::bigint"
+        statement = ("with dropped as (select count(*) as num from unnest(%s::oid[]) as d(oid) "
+                     "where hypopg_drop_index(d.oid)) "
+                     f"select dropped.num, h.indexrelid, h.indexname, {size} "
+                     "from dropped, unnest(%s::text[]) with ordinality as s(statement, no), "
+                     "lateral hypopg_create_index(s.statement) as h "
+                     "order by s.no")
+        self._cursor.execute(statement, (drop_identifiers,
+                                         [self._hypo_index_statement(index) for index in indexes]))
+        rows = self._cursor.fetchall()
+
+        assert rows[0][0] == len(drop_identifiers), \
+            f"Could not drop simulated indexes with oid in {drop_identifiers}."
+        assert len(rows) == len(indexes), "Could not simulate all the indexes."
+
+        return [(row[1], row[2], row[3]) for row in rows]
+
     def _drop_simulated_index(self, oid):
         statement = f"select * from hypopg_drop_index({oid})"
         result = self.exec_fetch(statement)
@@ -217,6 +321,47 @@ class PostgresDatabaseConnector(DatabaseConnector):
 
         return total_cost
 
+    # : newly added. The batched version of get_ind_cost(): the indexes are created once
+    # and the queries are explained in batches of `plan_batch_size` (one round trip each).
+    def get_ind_costs(self, queries, indexes, mode="hypo"):
+        """
+        :param queries: the query texts.
+        :param indexes: table#col1,col2#col1,col2,col3
+        :param mode: 'hypo' or not
+        :return: the costs in the order of `queries`.
+        """
+        self.create_indexes(indexes, mode)
+
+        costs = [None for _ in queries]
+        batch = list()
+        for no, query in enumerate(queries):
+            # Multi-statement queries (e.g., with views) are explained as in get_ind_cost().
+            if query.strip().rstrip(";").count(";") != 0:
+                costs[no] = self.exec_fetch(f"explain (format json) {query}")[0][0]["Plan"]["Total Cost"]
+            else:
+                batch.append((no, query))
+
+        for start in range(0, len(batch), self.plan_batch_size):
+            chunk = batch[start:start + self.plan_batch_size]
+            try:
+                chunk_plans = self._explain_batch([query for _, query in chunk])
+            except Exception as e:
+                logging.error(f"Batched EXPLAIN failed, fall back to single EXPLAINs: {e}")
+                if not self.autocommit:
+                    self.rollback()
+                chunk_plans = [self.exec_fetch(f"explain (format json) {query}")[0][0]["Plan"]
+                               for _, query in chunk]
+
+            for (no, _), plan in zip(chunk, chunk_plans):
+                costs[no] = plan["Total Cost"]
+
+        if mode == "hypo":
+            self.drop_hypo_indexes()
+        else:
+            self.drop_indexes()
+
+        return costs
+
     def get_ind_plan(self, query, indexes, mode="hypo"):
         self.create_indexes(indexes, mode)
 
@@ -281,10 +426,9 @@ class PostgresDatabaseConnector(DatabaseConnector):
         :param query:
         :return:
         """
-        for query_statement in query.text.split(";"):
-            if "drop view" in query_statement:
-                self.exec_only(query_statement)
-                self.commit()
+        for query_statement in self._split_query(query.text)[2]:
+            self.exec_only(query_statement)
+            self.commit()
 
     def _get_cost(self, query):
         query_plan = self._get_plan(query)
@@ -293,6 +437,13 @@ class PostgresDatabaseConnector(DatabaseConnector):
         return total_cost
 
     def _get_plan(self, query):
+        # : newly added. for the prepared queries.
+        if self.prepare_queries:
+            statement_name = self._prepared_statement(query)
+            if statement_name is not None:
+                statement = f"explain (format json) execute {statement_name}(0)"
+                return self.exec_fetch(statement)[0][0]["Plan"]
+
         # create view and return the next sql.
         query_text = self._prepare_query(query)
         statement = f"explain (format json) {query_text}"
@@ -302,6 +453,49 @@ class PostgresDatabaseConnector(DatabaseConnector):
 
         return query_plan
 
+    def _get_plans(self, queries):
+        plans = [None for _ in queries]
+
+        # Queries with views are prepared and explained one by one.
+        batch = list()
+        for no, query in enumerate(queries):
+            view_statements, query_statement, cleanup_statements = self._split_query(query.text)
+            if len(view_statements) != 0 or len(cleanup_statements) != 0:
+                plans[no] = self._get_plan(query)
+            elif self.prepare_queries and self._prepared_statement(query) is not None:
+                batch.append((no, query, f"execute {self._prepared_statement(query)}(0)"))
+            else:
+                batch.append((no, query, query_statement))
+
+        for start in range(0, len(batch), self.plan_batch_size):
+            chunk = batch[start:start + self.plan_batch_size]
+            try:
+                chunk_plans = self._explain_batch([query_statement for _, _, query_statement in chunk])
+            except Exception as e:
+                logging.error(f"Batched EXPLAIN failed, fall back to single EXPLAINs: {e}")
+                if not self.autocommit:
+                    self.rollback()
+                chunk_plans = [self._get_plan(query) for _, query, _ in chunk]
+
+            for (no, _, _), plan in zip(chunk, chunk_plans):
+                plans[no] = plan
+
+        return plans
+
+    def _explain_batch(self, statements):
+        if not self._explain_function_created:
+            self.exec_only(EXPLAIN_FUNCTION)
+            if not self.autocommit:
+                self.commit()
+            self._explain_function_created = True
+
+        statements = [statement.strip().rstrip(";") for statement in statements]
+        self._cursor.execute("select pg_temp.eab_explain(s.statement) "
+                             "from unnest(%s::text[]) with ordinality as s(statement, no) "
+                             "order by s.no", (statements,))
+
+        return [row[0][0]["Plan"] for row in self._cursor.fetchall()]
+
     def number_of_indexes(self):
         statement = """select count(*) from pg_indexes
                        where schemaname = 'public'"""
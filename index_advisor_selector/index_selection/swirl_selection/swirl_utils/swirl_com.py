@@ -15,6 +15,10 @@ from .constants import tpch_tables, tpcds_tables, job_table_alias
 
 from .cost_evaluation import CostEvaluation
 
+from index_advisor_selector.index_selection.heu_selection.heu_utils.candidate_generation import \
+    prune_candidates_by_benefit_bound
+from index_advisor_selector.index_selection.heu_selection.heu_utils.index_size_estimator import IndexSizeEstimator
+
 import index_advisor_selector.index_selection.dqn_selection.dqn_utils.Encoding as en
 import index_advisor_selector.index_selection.dqn_selection.dqn_utils.ParserForIndex as pi
 
@@ -42,6 +46,15 @@ def get_parser():
     parser.add_argument("--max_indexes", type=int, default=5)
 
     parser.add_argument("--is_query_cache", action="store_true")
+    # : newly added. for the cross-run (disk-backed) cost cache.
+    parser.add_argument("--cost_cache_file", type=str, default=None)
+    # : newly added. for the memory-bounded cost / plan cache (LRU eviction).
+    parser.add_argument("--cache_max_entries", type=int, default=None)
+    parser.add_argument("--cache_max_mb", type=float, default=None)
+    parser.add_argument("--cache_compress_plans", action="store_true")
+    # : newly added. record the what-if answers of a live run / replay them without a database.
+    parser.add_argument("--whatif_record", type=str, default=None)
+    parser.add_argument("--whatif_replay", type=str, default=None)
     parser.add_argument("--training_instances", type=int, default=None)
     parser.add_argument("--validation_testing_instances", type=int, default=None)
     parser.add_argument("--varying_frequencies", action="store_true")
@@ -76,7 +89,12 @@ def get_parser():
     # (0918): newly added.
     parser.add_argument("--max_index_width", type=int, default=None)
     parser.add_argument("--cand_gen", type=str, default=None,
-                        choices=["permutation", "dqn_rule", "openGauss"])
+                        choices=["permutation", "permutation_bound", "dqn_rule", "openGauss"])
+    # : newly added. for `permutation_bound`, see `prune_column_permutation_indexes()`.
+    parser.add_argument("--bound_fraction", type=float, default=0.1)
+    # : newly added. estimate the index sizes locally (validated on a sample) instead of by hypopg.
+    parser.add_argument("--analytic_size", action="store_true")
+    parser.add_argument("--size_validation_samples", type=int, default=20)
     parser.add_argument("--action_manager", type=str, default=None)
 
     parser.add_argument("--workload_embedder", type=str, default=None,
@@ -140,17 +158,38 @@ def set_logger(log_file):
 
 
 # : This could be improved by passing index candidates as input.
-def predict_index_sizes(column_combinations, db_config, is_precond=True):
+def predict_index_sizes(column_combinations, db_config, is_precond=True,
+                        analytic_size=False, validation_samples=20):
+    """
+    :param column_combinations:
+    :param db_config:
+    :param is_precond: the size delta to the index on the leading columns (the prefix).
+    :param analytic_size: estimate the sizes locally instead of simulating every index,
+                          see `heu_utils/index_size_estimator.py`.
+    :param validation_samples: the sizes of hypopg the analytic ones are validated against.
+    :return:
+    """
     connector = PostgresDatabaseConnector(db_config, autocommit=True)
     connector.drop_indexes()
 
     cost_evaluation = CostEvaluation(connector)
 
+    # : newly added. for the analytic size estimation.
+    size_estimator = None
+    if analytic_size:
+        size_estimator = IndexSizeEstimator(connector)
+        size_estimator.validate([Index(column_combination) for column_combination in column_combinations],
+                                validation_samples)
+
     predicted_index_sizes = []
     parent_index_size_map = {}
     for column_combination in column_combinations:
         potential_index = Index(column_combination)
-        cost_evaluation.what_if.simulate_index(potential_index, store_size=True)
+        # : newly modified.
+        if size_estimator is not None:
+            potential_index.estimated_size = size_estimator.estimate(potential_index)
+        else:
+            cost_evaluation.what_if.simulate_index(potential_index, store_size=True)
 
         full_index_size = potential_index.estimated_size
         index_delta_size = full_index_size
@@ -161,7 +200,8 @@ def predict_index_sizes(column_combinations, db_config, is_precond=True):
                 index_delta_size -= parent_index_size_map[column_combination[:-1]]
 
         predicted_index_sizes.append(index_delta_size)
-        cost_evaluation.what_if.drop_simulated_index(potential_index)
+        if size_estimator is None:
+            cost_evaluation.what_if.drop_simulated_index(potential_index)
 
         parent_index_size_map[column_combination] = full_index_size
 
@@ -611,6 +651,37 @@ def create_column_permutation_indexes(columns, max_index_width):
     return result_column_combinations
 
 
+# : newly added. for the benefit upper-bound candidate pruning (`permutation_bound`).
+def prune_column_permutation_indexes(index_candidates, queries, db_config, min_bound_fraction=0.1):
+    """
+    Discard the multi-column candidates of `create_column_permutation_indexes()`
+    whose benefit bound on `queries` is below `min_bound_fraction` of the best bound,
+    see `heu_utils/candidate_generation.prune_candidates_by_benefit_bound()`.
+    The single-column candidates are kept (the action space is built upon them).
+    :param index_candidates: [[column combination] per width].
+    :param queries: one query per query class with the indexable columns.
+    :param db_config:
+    :param min_bound_fraction:
+    :return:
+    """
+    connector = PostgresDatabaseConnector(db_config, autocommit=True)
+    cost_evaluation = CostEvaluation(connector)
+
+    candidates = [[Index(combination) for width_candidates in index_candidates[1:]
+                   for combination in width_candidates if set(combination) <= set(query.columns)]
+                  for query in queries]
+    candidates = prune_candidates_by_benefit_bound(Workload(queries), candidates,
+                                                   cost_evaluation, min_bound_fraction)
+    kept_combinations = set(index.columns for query_candidates in candidates for index in query_candidates)
+
+    cost_evaluation.complete_cost_estimation()
+    connector.close()
+
+    return index_candidates[:1] + [[combination for combination in width_candidates
+                                    if tuple(combination) in kept_combinations]
+                                   for width_candidates in index_candidates[1:]]
+
+
 def get_columns_from_schema(schema_file):
     tables, columns = list(), list()
     with open(schema_file, "r") as rf:
@@ -615,6 +615,21 @@ class WorkloadGenerator(object):
 
         return workloads
 
+    # : newly added. for the benefit upper-bound candidate pruning (`permutation_bound`).
+    def representative_queries(self):
+        """
+        One query (the first instance) per available query class, with its indexable columns.
+        :return:
+        """
+        queries = list()
+        for query_class in sorted(self.available_query_classes):
+            query = Query(query_class, self.query_texts[query_class - 1][0])
+            self._store_indexable_columns(query)
+            if len(query.columns) > 0:
+                queries.append(query)
+
+        return queries
+
     def _store_indexable_columns(self, query):
         """
         Determine the indexable columns given the query.